@@ -0,0 +1,145 @@
+"""Audio output profiles negotiated per session.
+
+Commentary and onboarding audio used to be MP3 at 44.1 kHz / 128 kbps for
+every client. A client can now pick a profile when it connects:
+
+* ``mp3``     -- MP3 44.1 kHz / 128 kbps from Cartesia (the old behaviour)
+* ``mp3_low`` -- MP3 22.05 kHz / 32 kbps, for constrained networks
+* ``pcm``     -- raw 16-bit PCM from Cartesia, sent as WAV (no encode step;
+  the only profile the persistent TTS websocket can produce directly)
+* ``opus``    -- the same PCM encoded to Ogg/Opus with PyAV (smallest clips)
+
+Clips carry the profile's ``format`` ("mp3", "wav" or "ogg") so clients can
+pick a mime type. Bytes and synthesis / encode time per profile are reported
+under the ``audio`` metrics provider.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+import av
+import numpy as np
+
+from agent import metrics
+from agent.config import config
+from agent.tts_stream import pcm_to_wav
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AudioProfile:
+    """How one session's TTS audio is requested from Cartesia and delivered."""
+
+    name: str
+    format: str  # delivered container: "mp3", "wav" or "ogg"
+    mime: str
+    sample_rate: int
+    bit_rate: int | None = None  # MP3 bit rate at Cartesia, or the Opus encoder's
+
+    @property
+    def pcm_source(self) -> bool:
+        """Whether Cartesia is asked for raw PCM (encoded or wrapped locally)."""
+        return self.format != "mp3"
+
+    def output_format(self) -> dict[str, Any]:
+        """Cartesia ``output_format`` for this profile."""
+        if not self.pcm_source:
+            return {"container": "mp3", "sample_rate": self.sample_rate, "bit_rate": self.bit_rate}
+        return {"container": "raw", "encoding": "pcm_s16le", "sample_rate": self.sample_rate}
+
+    async def encode(self, audio: bytes) -> bytes:
+        """Turn Cartesia's output for this profile into the delivered clip."""
+        if self.format == "wav":
+            return pcm_to_wav(audio, self.sample_rate)
+        if self.format == "ogg":
+            return await asyncio.to_thread(encode_opus, audio, self.sample_rate, self.bit_rate)
+        return audio
+
+
+PROFILES: dict[str, AudioProfile] = {
+    "mp3": AudioProfile("mp3", "mp3", "audio/mpeg", 44100, 128000),
+    "mp3_low": AudioProfile("mp3_low", "mp3", "audio/mpeg", 22050, 32000),
+    "pcm": AudioProfile("pcm", "wav", "audio/wav", 24000),
+    "opus": AudioProfile("opus", "ogg", "audio/ogg", 24000, 32000),
+}
+
+
+def default_profile() -> AudioProfile:
+    """Profile for sessions that don't negotiate one (``AUDIO_PROFILE``).
+
+    Unset means PCM when the persistent TTS websocket is enabled (so it is
+    actually used) and MP3 otherwise.
+    """
+    name = config.audio_profile or ("pcm" if config.tts_websocket else "mp3")
+    profile = PROFILES.get(name)
+    if profile is None:
+        logger.warning("Unknown AUDIO_PROFILE %r, using mp3", name)
+        return PROFILES["mp3"]
+    return profile
+
+
+def resolve_profile(name: str | None) -> AudioProfile:
+    """Profile requested by a client, or the default for unknown / missing names."""
+    if name and name in PROFILES:
+        return PROFILES[name]
+    if name:
+        logger.warning("Client asked for unknown audio profile %r", name)
+    return default_profile()
+
+
+def encode_opus(pcm: bytes, sample_rate: int, bit_rate: int | None = None) -> bytes:
+    """Encode mono 16-bit PCM as Ogg/Opus (CPU-bound; run off the event loop)."""
+    buf = io.BytesIO()
+    with av.open(buf, "w", format="ogg") as container:
+        stream = container.add_stream("libopus", rate=sample_rate, layout="mono")
+        if bit_rate:
+            stream.bit_rate = bit_rate
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(1, -1)
+        frame = av.AudioFrame.from_ndarray(samples, format="s16", layout="mono")
+        frame.sample_rate = sample_rate
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buf.getvalue()
+
+
+# ---- Stats ----
+
+
+class AudioProfileStats:
+    """Clips, bytes and synthesis / encode time per profile."""
+
+    def __init__(self) -> None:
+        self._clips: dict[str, int] = {}
+        self._bytes: dict[str, int] = {}
+        self._synth_ms: dict[str, float] = {}
+        self._encode_ms: dict[str, float] = {}
+
+    def record(self, profile: str, nbytes: int, synth_ms: float, encode_ms: float) -> None:
+        self._clips[profile] = self._clips.get(profile, 0) + 1
+        self._bytes[profile] = self._bytes.get(profile, 0) + nbytes
+        self._synth_ms[profile] = self._synth_ms.get(profile, 0.0) + synth_ms
+        self._encode_ms[profile] = self._encode_ms.get(profile, 0.0) + encode_ms
+
+    def stats(self) -> dict[str, Any]:
+        out: dict[str, Any] = {}
+        for profile, clips in self._clips.items():
+            out[profile] = {
+                "clips": clips,
+                "bytes": self._bytes[profile],
+                "avg_bytes": round(self._bytes[profile] / clips),
+                "avg_synth_ms": round(self._synth_ms[profile] / clips, 1),
+                "avg_encode_ms": round(self._encode_ms[profile] / clips, 1),
+            }
+        return out
+
+
+audio_stats = AudioProfileStats()
+metrics.register_provider("audio", audio_stats.stats)
@@ -3,14 +3,34 @@ Cartesia Ink Speech-to-Text plugin for Vision Agents SDK.
 
 Uses Cartesia's Ink WebSocket STT API (ink-whisper model) for real-time
 streaming transcription with built-in voice activity detection (VAD).
+
+Incoming audio goes through one stateful PyAV resampler (16 kHz mono s16)
+into a preallocated ring buffer; a sender task drains it in fixed-size
+packets (20-100 ms). When the buffer is full, ``process_audio`` waits
+briefly for the sender (backpressure) and then drops the oldest audio.
+
+With ``vad=True`` a local energy gate sits in front of the WebSocket: only
+speech (plus a short pre-roll and hangover) is forwarded, and "finalize" is
+sent as soon as the speaker stops, instead of streaming hours of silence.
+
+If the Ink WebSocket drops, the listener reconnects with exponential
+backoff; the backoff only resets once a connection has produced a transcript
+or stayed up for ``_STABLE_CONNECTION_SECS``, so a server that accepts and
+immediately closes (bad key, quota) is not hammered. Audio sent since the
+last final transcript (and everything captured during the outage) is kept in
+a replay ring of ``replay_ms`` and re-sent on the new connection; partials
+that repeat what was already emitted are dropped.
 """
 
 import asyncio
 import logging
 import os
 import time
+from collections import deque
 from typing import Any, Optional
 
+import av
+import numpy as np
 from cartesia import AsyncCartesia
 from cartesia.stt._async_websocket import AsyncSttWebsocket
 from getstream.video.rtc.track_util import PcmData
@@ -19,8 +39,72 @@ from vision_agents.core.edge.types import Participant
 from vision_agents.core.stt import TranscriptResponse
 from vision_agents.core.utils.utils import cancel_and_wait
 
+from agent import metrics
+
 logger = logging.getLogger(__name__)
 
+# A connection that lasts this long (or yields a transcript) resets the backoff
+_STABLE_CONNECTION_SECS = 5.0
+
+
+class _PcmRingBuffer:
+    """
+    Fixed-capacity ring of int16 samples, allocated once.
+
+    ``write`` never grows the buffer (callers make room first); ``read_into``
+    moves the oldest samples into a caller-owned array.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.size = 0
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self._start = 0
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.size
+
+    def write(self, samples: np.ndarray) -> None:
+        n = len(samples)
+        if n > self.free:
+            raise ValueError(f"Ring buffer overflow ({n} > {self.free} free samples)")
+        end = (self._start + self.size) % self.capacity
+        first = min(n, self.capacity - end)
+        self._buf[end : end + first] = samples[:first]
+        self._buf[: n - first] = samples[first:]
+        self.size += n
+
+    def read_into(self, out: np.ndarray) -> int:
+        n = min(len(out), self.size)
+        first = min(n, self.capacity - self._start)
+        out[:first] = self._buf[self._start : self._start + first]
+        out[first:n] = self._buf[: n - first]
+        self.discard(n)
+        return n
+
+    def discard(self, n: int) -> None:
+        n = max(0, min(n, self.size))
+        self._start = (self._start + n) % self.capacity
+        self.size -= n
+
+    def push(self, samples: np.ndarray) -> None:
+        """Write, discarding the oldest samples to make room."""
+        samples = samples[-self.capacity :]
+        self.discard(len(samples) - self.free)
+        self.write(samples)
+
+    def peek(self) -> np.ndarray:
+        """Copy of the buffered samples, oldest first (nothing is consumed)."""
+        end = self._start + self.size
+        if end <= self.capacity:
+            return self._buf[self._start : end].copy()
+        return np.concatenate((self._buf[self._start :], self._buf[: end - self.capacity]))
+
+    def clear(self) -> None:
+        self._start = 0
+        self.size = 0
+
 
 class CartesiaSTT(stt.STT):
     """
@@ -44,6 +128,15 @@ class CartesiaSTT(stt.STT):
         min_volume: Optional[float] = None,
         max_silence_duration_secs: Optional[float] = None,
         client: Optional[AsyncCartesia] = None,
+        packet_ms: int = 40,
+        max_buffer_ms: int = 1000,
+        metrics_name: str = "stt",
+        vad: bool = False,
+        vad_threshold_db: float = -45.0,
+        vad_hangover_ms: int = 600,
+        vad_pre_roll_ms: int = 300,
+        replay_ms: int = 3000,
+        max_backoff_secs: float = 10.0,
     ):
         """
         Initialize Cartesia STT.
@@ -56,6 +149,15 @@ class CartesiaSTT(stt.STT):
             min_volume: Volume threshold for VAD (0.0-1.0). None uses server default.
             max_silence_duration_secs: Max silence before endpointing. None uses server default.
             client: Optional pre-configured AsyncCartesia instance.
+            packet_ms: Audio per WebSocket send, clamped to 20-100 ms.
+            max_buffer_ms: Ring buffer size; older audio is dropped beyond it.
+            metrics_name: Metrics provider name for ``stats()``.
+            vad: Forward only speech, gated by local frame energy.
+            vad_threshold_db: Frame energy (dBFS) that counts as speech.
+            vad_hangover_ms: Silence after speech before the gate closes.
+            vad_pre_roll_ms: Audio before speech onset forwarded with it.
+            replay_ms: Recent audio re-sent after a reconnect.
+            max_backoff_secs: Cap on the wait between reconnect attempts.
         """
         super().__init__(provider_name="cartesia")
 
@@ -87,6 +189,53 @@ class CartesiaSTT(stt.STT):
         # Track whether we are currently inside a speech turn
         self._in_turn: bool = False
 
+        # Streaming resampler (rebuilt if the input format changes) feeding a
+        # ring buffer that the sender task drains in fixed-size packets
+        self.packet_ms = min(100, max(20, packet_ms))
+        self._resampler: Optional[av.AudioResampler] = None
+        self._resampler_input: Optional[tuple[int, str, str]] = None
+        self._buffer = _PcmRingBuffer(sample_rate * max(max_buffer_ms, 2 * self.packet_ms) // 1000)
+        self._packet = np.zeros(sample_rate * self.packet_ms // 1000, dtype=np.int16)
+        self._data_ready = asyncio.Event()
+        self._space_ready = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+        self._send_task: Optional[asyncio.Task[None]] = None
+
+        # Stats
+        self._metrics_name = metrics_name
+        self._packets_sent = 0
+        self._bytes_sent = 0
+        self._recent_sends: deque[tuple[float, int]] = deque()
+        self._peak_fill = 0
+        self._dropped_samples = 0
+        self._backpressure_waits = 0
+
+        # Local VAD gate: packets are speech when most of their 10 ms frames
+        # exceed the energy threshold; silent packets are kept as pre-roll
+        self.vad = vad
+        self.vad_threshold_db = vad_threshold_db
+        self._vad_frame = sample_rate // 100
+        self._hangover_samples = sample_rate * vad_hangover_ms // 1000
+        self._pre_roll: deque[bytes] = deque(maxlen=max(1, -(-vad_pre_roll_ms // self.packet_ms)))
+        self._speaking = False
+        self._silence_samples = 0
+        self._speech_segments = 0
+        self._gated_samples = 0
+
+        # Reconnect: audio since the last final transcript, replayed into a new
+        # connection; the last partial emitted, to drop repeats after a replay
+        self.max_backoff_secs = max_backoff_secs
+        self._history = _PcmRingBuffer(sample_rate * replay_ms // 1000)
+        self._last_partial = ""
+        self._catching_up = False
+        self._reconnects = 0
+        self._backoff_attempt = 0
+        self._connected_at = 0.0
+        self._connection_productive = False
+        self._last_outage_ms: Optional[float] = None
+        self._replayed_samples = 0
+        self._deduped_partials = 0
+
     async def start(self) -> None:
         """
         Start the Cartesia STT WebSocket connection and begin listening.
@@ -103,20 +252,16 @@ class CartesiaSTT(stt.STT):
             self._owns_client = True
 
         # Open WebSocket connection via the Cartesia SDK
-        self._ws = await self._client.stt.websocket(
-            model=self.model,
-            language=self.language,
-            encoding="pcm_s16le",
-            sample_rate=self.sample_rate,
-            min_volume=self.min_volume,
-            max_silence_duration_secs=self.max_silence_duration_secs,
-        )
+        self._ws = await self._open_websocket()
+        self._connected_at = time.monotonic()
 
-        # Start background listener
+        # Start background listener and packet sender
         self._listen_task = asyncio.create_task(
             self._listen_for_transcripts(),
             name="cartesia-stt-listener",
         )
+        self._send_task = asyncio.create_task(self._send_loop(), name="cartesia-stt-sender")
+        metrics.register_provider(self._metrics_name, self.stats)
 
         self._connection_ready.set()
         logger.info(
@@ -124,15 +269,27 @@ class CartesiaSTT(stt.STT):
             extra={"model": self.model, "language": self.language},
         )
 
+    async def _open_websocket(self) -> AsyncSttWebsocket:
+        assert self._client is not None
+        return await self._client.stt.websocket(
+            model=self.model,
+            language=self.language,
+            encoding="pcm_s16le",
+            sample_rate=self.sample_rate,
+            min_volume=self.min_volume,
+            max_silence_duration_secs=self.max_silence_duration_secs,
+        )
+
     async def process_audio(
         self,
         pcm_data: PcmData,
         participant: Optional[Participant] = None,
     ) -> None:
         """
-        Send audio data to the Cartesia WebSocket for transcription.
+        Queue audio for the Cartesia WebSocket.
 
-        Audio is resampled to 16 kHz mono before sending.
+        Audio is resampled to 16 kHz mono (keeping resampler state across
+        chunks) and buffered; the sender task forwards it in fixed-size packets.
 
         Args:
             pcm_data: The PCM audio data to process.
@@ -150,24 +307,194 @@ class CartesiaSTT(stt.STT):
             return
 
         # Resample to 16 kHz mono (required by Cartesia Ink)
-        resampled_pcm = pcm_data.resample(self.sample_rate, 1)
-
-        # Convert int16 samples to raw bytes
-        audio_bytes = resampled_pcm.samples.tobytes()
+        samples = self._resample(pcm_data)
+        if samples.size == 0:
+            return
 
         self._current_participant = participant
 
         # Track start time for the first audio chunk of a new utterance
-        if self._audio_start_time is None:
+        # (with the VAD gate, the utterance starts at speech onset instead)
+        if self._audio_start_time is None and not self.vad:
             self._audio_start_time = time.perf_counter()
 
-        if self._ws is not None:
-            await self._ws.send(audio_bytes)
+        await self._enqueue(samples)
+
+    def _resample(self, pcm_data: PcmData) -> np.ndarray:
+        """Resample one chunk to ``sample_rate`` mono int16 with a persistent resampler."""
+        frame = pcm_data.to_av_frame()
+        frame.pts = None
+        source = (frame.sample_rate, frame.layout.name, frame.format.name)
+        if self._resampler is None or source != self._resampler_input:
+            self._resampler = av.AudioResampler(format="s16", layout="mono", rate=self.sample_rate)
+            self._resampler_input = source
+        chunks = [f.to_ndarray().reshape(-1) for f in self._resampler.resample(frame)]
+        if not chunks:
+            return np.zeros(0, dtype=np.int16)
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+    async def _enqueue(self, samples: np.ndarray) -> None:
+        """
+        Add samples to the ring buffer.
+
+        If there is no room, wait up to two packet durations for the sender
+        to drain it, then drop the oldest buffered audio.
+        """
+        if len(samples) > self._buffer.capacity:
+            self._dropped_samples += len(samples) - self._buffer.capacity
+            samples = samples[-self._buffer.capacity :]
+
+        if len(samples) > self._buffer.free:
+            self._backpressure_waits += 1
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + 2 * self.packet_ms / 1000
+            while len(samples) > self._buffer.free and (remaining := deadline - loop.time()) > 0:
+                self._space_ready.clear()
+                try:
+                    await asyncio.wait_for(self._space_ready.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            overflow = len(samples) - self._buffer.free
+            if overflow > 0:
+                self._buffer.discard(overflow)
+                self._dropped_samples += overflow
+                metrics.incr("stt.dropped_packets")
+
+        self._buffer.write(samples)
+        self._peak_fill = max(self._peak_fill, self._buffer.size)
+        if self._buffer.size >= len(self._packet):
+            self._data_ready.set()
+
+    # ---- Sending ----
+
+    async def _send_loop(self) -> None:
+        """Background task: forward full packets as the ring buffer fills."""
+        while True:
+            await self._data_ready.wait()
+            self._data_ready.clear()
+            try:
+                while await self._send_from_buffer(len(self._packet)):
+                    pass
+            except Exception as exc:
+                logger.warning("Cartesia STT send failed: %s", exc)
+
+    async def _send_from_buffer(self, min_samples: int) -> bool:
+        """Send one packet if at least ``min_samples`` are buffered; False if not."""
+        async with self._send_lock:
+            if self._buffer.size == 0 or self._buffer.size < min_samples:
+                return False
+            n = self._buffer.read_into(self._packet)
+            self._space_ready.set()
+            if self.vad:
+                await self._send_gated(self._packet[:n])
+            else:
+                await self._send_packet(self._packet[:n].tobytes())
+            return True
+
+    def _is_speech(self, samples: np.ndarray) -> bool:
+        """Whether most 10 ms frames of ``samples`` are above the energy threshold."""
+        frames = max(1, len(samples) // self._vad_frame)
+        usable = samples[: frames * self._vad_frame] if len(samples) >= self._vad_frame else samples
+        x = usable.astype(np.float32).reshape(frames, -1)
+        rms = np.sqrt(np.mean(x * x, axis=1))
+        energy_db = 20 * np.log10(np.maximum(rms, 1.0) / 32768)
+        return np.count_nonzero(energy_db > self.vad_threshold_db) * 2 >= frames
+
+    async def _send_gated(self, samples: np.ndarray) -> None:
+        """
+        Forward ``samples`` only while the VAD gate is open.
+
+        Speech onset opens the gate (sending the pre-roll first and starting
+        the latency clock); ``vad_hangover_ms`` of silence closes it and
+        sends "finalize" so Cartesia ends the turn right away.
+        """
+        speech = self._is_speech(samples)
+        data = samples.tobytes()
+        if not self._speaking:
+            if not speech:
+                if len(self._pre_roll) == self._pre_roll.maxlen:
+                    self._gated_samples += len(self._pre_roll[0]) // 2
+                self._pre_roll.append(data)
+                return
+            self._speaking = True
+            self._speech_segments += 1
+            self._silence_samples = 0
+            while self._pre_roll:
+                await self._send_packet(self._pre_roll.popleft())
+
+        if speech:
+            self._silence_samples = 0
+            if self._audio_start_time is None:
+                self._audio_start_time = time.perf_counter()
+        else:
+            self._silence_samples += len(samples)
+        await self._send_packet(data)
+
+        if self._silence_samples >= self._hangover_samples:
+            self._speaking = False
+            if self._ws is not None:
+                await self._ws.send("finalize")
+                logger.debug("Cartesia STT finalize sent (end of speech)")
+
+    async def _send_packet(self, data: bytes) -> None:
+        """Send one packet, keeping it in the replay ring (also while disconnected)."""
+        self._history.push(np.frombuffer(data, dtype=np.int16))
+        if self._ws is None:
+            return
+        try:
+            await self._ws.send(data)
+        except Exception as exc:
+            # The listener notices the drop and reconnects; this audio is replayed
+            logger.debug("Cartesia STT send failed: %s", exc)
+            return
+        now = time.monotonic()
+        self._packets_sent += 1
+        self._bytes_sent += len(data)
+        self._recent_sends.append((now, len(data)))
+        while self._recent_sends and self._recent_sends[0][0] < now - 5.0:
+            self._recent_sends.popleft()
+
+    async def _flush_buffer(self) -> None:
+        """Send whatever is buffered, including a final short packet."""
+        while await self._send_from_buffer(1):
+            pass
+
+    def stats(self) -> dict[str, Any]:
+        """Send rate, buffer fill and drops (served as a metrics provider)."""
+        now = time.monotonic()
+        recent = [n for t, n in self._recent_sends if t >= now - 5.0]
+        ms_per_sample = 1000 / self.sample_rate
+        return {
+            "packet_ms": self.packet_ms,
+            "packets_sent": self._packets_sent,
+            "bytes_sent": self._bytes_sent,
+            "send_rate_pps": round(len(recent) / 5.0, 1),
+            "send_rate_kbps": round(sum(recent) * 8 / 5.0 / 1000, 1),
+            "buffer_fill_ms": round(self._buffer.size * ms_per_sample),
+            "buffer_peak_ms": round(self._peak_fill * ms_per_sample),
+            "buffer_capacity_ms": round(self._buffer.capacity * ms_per_sample),
+            "backpressure_waits": self._backpressure_waits,
+            "dropped_ms": round(self._dropped_samples * ms_per_sample),
+            "connected": self._ws is not None,
+            "reconnects": self._reconnects,
+            "last_outage_ms": self._last_outage_ms,
+            "replayed_ms": round(self._replayed_samples * ms_per_sample),
+            "deduped_partials": self._deduped_partials,
+            "vad": (
+                {
+                    "speaking": self._speaking,
+                    "speech_segments": self._speech_segments,
+                    "gated_ms": round(self._gated_samples * ms_per_sample),
+                }
+                if self.vad
+                else None
+            ),
+        }
 
     async def _listen_for_transcripts(self) -> None:
         """
         Background task that consumes messages from the Cartesia WebSocket
-        and emits the appropriate STT events.
+        and emits the appropriate STT events, reconnecting when it drops.
 
         Message types from Cartesia:
             - "transcript" with is_final=False  -> partial transcript
@@ -176,42 +503,114 @@ class CartesiaSTT(stt.STT):
             - "flush_done"                      -> acknowledgement of finalize
             - "done"                            -> session closed
         """
-        if self._ws is None:
-            logger.error("WebSocket is None in listener task")
-            return
+        while not self.closed:
+            if self._ws is None:
+                logger.error("WebSocket is None in listener task")
+                return
 
-        try:
-            async for message in self._ws.receive():
-                msg_type: str = message.get("type", "")
-
-                if msg_type == "transcript":
-                    await self._handle_transcript(message)
-                elif msg_type == "error":
-                    error_text = message.get("message", "Unknown Cartesia STT error")
-                    logger.error("Cartesia STT error: %s", error_text)
-                    self._emit_error_event(
-                        error=RuntimeError(error_text),
-                        context="cartesia_stt_websocket",
-                        participant=self._current_participant,
-                    )
-                elif msg_type == "flush_done":
-                    logger.debug("Cartesia STT flush acknowledged")
-                elif msg_type == "done":
-                    logger.debug("Cartesia STT session done")
-                    break
-                else:
-                    logger.debug("Cartesia STT unknown message type: %s", msg_type)
+            try:
+                async for message in self._ws.receive():
+                    msg_type: str = message.get("type", "")
+
+                    if msg_type == "transcript":
+                        await self._handle_transcript(message)
+                    elif msg_type == "error":
+                        error_text = message.get("message", "Unknown Cartesia STT error")
+                        logger.error("Cartesia STT error: %s", error_text)
+                        self._emit_error_event(
+                            error=RuntimeError(error_text),
+                            context="cartesia_stt_websocket",
+                            participant=self._current_participant,
+                        )
+                    elif msg_type == "flush_done":
+                        logger.debug("Cartesia STT flush acknowledged")
+                    elif msg_type == "done":
+                        logger.debug("Cartesia STT session done")
+                        return
+                    else:
+                        logger.debug("Cartesia STT unknown message type: %s", msg_type)
+
+                if self.closed:
+                    return
+                logger.warning("Cartesia STT stream ended unexpectedly")
+
+            except asyncio.CancelledError:
+                logger.debug("Cartesia STT listener task cancelled")
+                raise
+            except Exception as exc:
+                if self.closed:
+                    return
+                logger.error("Cartesia STT listener error: %s", exc, exc_info=True)
+                self._emit_error_event(
+                    error=exc,
+                    context="cartesia_stt_listener",
+                    participant=self._current_participant,
+                )
 
-        except asyncio.CancelledError:
-            logger.debug("Cartesia STT listener task cancelled")
-            raise
-        except Exception as exc:
-            logger.error("Cartesia STT listener error: %s", exc, exc_info=True)
-            self._emit_error_event(
-                error=exc,
-                context="cartesia_stt_listener",
-                participant=self._current_participant,
+            await self._reconnect()
+
+    async def _reconnect(self) -> None:
+        """
+        Replace a dropped WebSocket, retrying with exponential backoff.
+
+        The first attempt is immediate only if the dropped connection was
+        healthy (produced a transcript or lasted ``_STABLE_CONNECTION_SECS``);
+        otherwise the backoff continues from where the last reconnect left it.
+
+        While disconnected, the sender keeps moving audio into the replay
+        ring; once connected, the ring (audio since the last final transcript,
+        up to ``replay_ms``) is re-sent before live packets resume.
+        """
+        outage_start = time.perf_counter()
+        old_ws, self._ws = self._ws, None
+        if old_ws is not None:
+            try:
+                await old_ws.close()
+            except Exception:
+                pass
+
+        healthy = self._connection_productive or (
+            time.monotonic() - self._connected_at >= _STABLE_CONNECTION_SECS
+        )
+        attempt = 0 if healthy else self._backoff_attempt
+        while not self.closed:
+            if attempt:
+                await asyncio.sleep(min(self.max_backoff_secs, 0.1 * 2**attempt))
+            try:
+                ws = await self._open_websocket()
+            except Exception as exc:
+                attempt += 1
+                metrics.incr("stt.reconnect_failures")
+                logger.warning("Cartesia STT reconnect attempt %d failed: %s", attempt, exc)
+                continue
+
+            async with self._send_lock:
+                replay = self._history.peek()
+                try:
+                    for offset in range(0, len(replay), len(self._packet)):
+                        await ws.send(replay[offset : offset + len(self._packet)].tobytes())
+                except Exception as exc:
+                    attempt += 1
+                    logger.warning("Cartesia STT replay failed: %s", exc)
+                    await ws.close()
+                    continue
+                self._ws = ws
+
+            # Until this connection proves itself, the next drop backs off further
+            self._backoff_attempt = attempt + 1
+            self._connected_at = time.monotonic()
+            self._connection_productive = False
+            self._reconnects += 1
+            self._replayed_samples += len(replay)
+            self._catching_up = bool(self._last_partial)
+            self._last_outage_ms = round((time.perf_counter() - outage_start) * 1000, 1)
+            metrics.incr("stt.reconnects")
+            logger.info(
+                "Cartesia STT reconnected after %.0f ms (replayed %.0f ms of audio)",
+                self._last_outage_ms,
+                len(replay) * 1000 / self.sample_rate,
             )
+            return
 
     async def _handle_transcript(self, message: dict[str, Any]) -> None:
         """
@@ -226,6 +625,7 @@ class CartesiaSTT(stt.STT):
 
         if not text:
             return
+        self._connection_productive = True
 
         participant = self._current_participant
         if participant is None:
@@ -270,10 +670,23 @@ class CartesiaSTT(stt.STT):
                 eager_end_of_turn=False,
                 confidence=avg_confidence,
             )
-            # Reset state for next utterance
+            # Reset state for next utterance; its audio no longer needs replaying
             self._audio_start_time = None
             self._in_turn = False
+            self._history.clear()
+            self._last_partial = ""
+            self._catching_up = False
         else:
+            # Drop repeats, including the replay re-transcribing what was
+            # already emitted before a reconnect
+            if text == self._last_partial or (
+                self._catching_up and self._last_partial.startswith(text)
+            ):
+                self._deduped_partials += 1
+                return
+            self._catching_up = False
+            self._last_partial = text
+
             # If this is the first partial in a new turn, emit turn started
             if not self._in_turn:
                 self._in_turn = True
@@ -288,11 +701,13 @@ class CartesiaSTT(stt.STT):
         """
         Flush any pending audio in the Cartesia pipeline.
 
-        Sends the "finalize" command which causes Cartesia to process
-        any buffered audio and emit a final transcript if applicable.
+        Sends any locally buffered audio, then the "finalize" command which
+        causes Cartesia to process its buffered audio and emit a final
+        transcript if applicable.
         """
         if self._ws is not None:
             try:
+                await self._flush_buffer()
                 await self._ws.send("finalize")
                 logger.debug("Cartesia STT finalize sent")
             except Exception as exc:
@@ -309,10 +724,15 @@ class CartesiaSTT(stt.STT):
         await super().close()
 
         self._connection_ready.clear()
+        metrics.unregister_provider(self._metrics_name)
 
-        # Send "done" to signal session end
+        # Stop the packet sender, then send what is left and "done"
+        if self._send_task is not None:
+            await cancel_and_wait(self._send_task)
+            self._send_task = None
         if self._ws is not None:
             try:
+                await self._flush_buffer()
                 await self._ws.send("done")
             except Exception as exc:
                 logger.warning("Error sending done to Cartesia STT: %s", exc)
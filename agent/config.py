@@ -14,12 +14,81 @@ class Config:
 
     # LLM (Claude direct)
     anthropic_api_key: str = os.getenv("ANTHROPIC_API_KEY", "")
+    # Per-task model routing ("task=model,fallback;..."), merged over the defaults in
+    # agent.model_router; a model is skipped while its p95 latency exceeds the task
+    # budget ("task=ms;..."), measured over the last model_latency_window_s seconds.
+    model_routes: str = os.getenv("MODEL_ROUTES", "")
+    model_latency_budgets_ms: str = os.getenv("MODEL_LATENCY_BUDGETS_MS", "")
+    model_latency_window_s: float = float(os.getenv("MODEL_LATENCY_WINDOW_S", "300"))
+    # Hedge live commentary calls: if no first token arrives within the
+    # llm_hedge_percentile of recent time-to-first-token, fire a second request
+    # ("same" model or the route's "fallback") and keep whichever streams first
+    llm_hedging: bool = os.getenv("LLM_HEDGING", "false").lower() == "true"
+    llm_hedge_percentile: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "90"))
+    llm_hedge_model: str = os.getenv("LLM_HEDGE_MODEL", "same")
+    llm_hedge_min_delay_ms: float = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "300"))
+    llm_hedge_default_ms: float = float(os.getenv("LLM_HEDGE_DEFAULT_MS", "1500"))
 
     # Cartesia (TTS + STT)
     cartesia_api_key: str = os.getenv("CARTESIA_API_KEY", "")
+    # Viewer speech goes to Cartesia Ink in fixed packets (20-100 ms) from a
+    # ring buffer of at most stt_max_buffer_ms; older audio is dropped beyond it.
+    stt_packet_ms: int = int(os.getenv("STT_PACKET_MS", "40"))
+    stt_max_buffer_ms: int = int(os.getenv("STT_MAX_BUFFER_MS", "1000"))
+    # Optional local VAD gate: only speech (frame energy above the threshold, plus
+    # pre-roll and hangover) is streamed, and the turn is finalized when it ends
+    stt_vad: bool = os.getenv("STT_VAD", "false").lower() == "true"
+    stt_vad_threshold_db: float = float(os.getenv("STT_VAD_THRESHOLD_DB", "-45"))
+    stt_vad_hangover_ms: int = int(os.getenv("STT_VAD_HANGOVER_MS", "600"))
+    stt_vad_pre_roll_ms: int = int(os.getenv("STT_VAD_PRE_ROLL_MS", "300"))
+    # A dropped Ink connection is reopened with backoff and the audio since the
+    # last final transcript (up to stt_replay_ms) is re-sent
+    stt_replay_ms: int = int(os.getenv("STT_REPLAY_MS", "3000"))
+    # Viewer audio on /ws/live: start answering once a partial transcript has been
+    # stable for speculative_stable_ms; the answer is held until the final
+    # transcript confirms it (or for at most speculative_hold_ms)
+    speculative_answers: bool = os.getenv("SPECULATIVE_ANSWERS", "true").lower() == "true"
+    speculative_stable_ms: float = float(os.getenv("SPECULATIVE_STABLE_MS", "400"))
+    speculative_hold_ms: float = float(os.getenv("SPECULATIVE_HOLD_MS", "4000"))
 
     # RF-DETR (local model, no API key needed)
+    # "rfdetr-base" / "rfdetr-large" run through PyTorch; "rfdetr-base-onnx",
+    # "rfdetr-base-onnx-int8" or a path to an .onnx file run through ONNX Runtime.
     rfdetr_model_id: str = os.getenv("RFDETR_MODEL_ID", "rfdetr-base")
+    model_cache_dir: str = os.getenv("MODEL_CACHE_DIR", "./models")
+    onnx_intra_op_threads: int = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+    # Persist the traced (optimized) PyTorch model under model_cache_dir for fast cold starts
+    model_disk_cache: bool = os.getenv("MODEL_DISK_CACHE", "true").lower() == "true"
+    torch_num_threads: int = int(os.getenv("TORCH_NUM_THREADS", "0"))  # 0 = torch default
+    model_warmup_runs: int = int(os.getenv("MODEL_WARMUP_RUNS", "2"))
+    # Resolution variants kept loaded per model (least recently used evicted beyond it)
+    detector_max_variants: int = int(os.getenv("DETECTOR_MAX_VARIANTS", "3"))
+    # "inprocess" loads the model in every worker; "sidecar" sends frames to one
+    # shared `python -m agent.detector_sidecar` process over detector_socket.
+    detector_backend: str = os.getenv("DETECTOR_BACKEND", "inprocess")
+    detector_socket: str = os.getenv("DETECTOR_SOCKET", "/tmp/commentator-detector.sock")
+    sidecar_max_batch: int = int(os.getenv("SIDECAR_MAX_BATCH", "8"))
+    sidecar_max_wait_ms: float = float(os.getenv("SIDECAR_MAX_WAIT_MS", "5"))
+
+    # Outbound limits shared by every session in this process: requests/second
+    # (0 = unlimited), burst, and in-flight cap per provider. When commentary
+    # requests queue, pipelines stretch their cooldown by up to outbound_stretch_max
+    # (1 + mean queue wait / outbound_stretch_wait_s).
+    anthropic_rate_per_s: float = float(os.getenv("ANTHROPIC_RATE_PER_S", "5"))
+    anthropic_burst: int = int(os.getenv("ANTHROPIC_BURST", "10"))
+    anthropic_max_concurrency: int = int(os.getenv("ANTHROPIC_MAX_CONCURRENCY", "8"))
+    cartesia_rate_per_s: float = float(os.getenv("CARTESIA_RATE_PER_S", "5"))
+    cartesia_burst: int = int(os.getenv("CARTESIA_BURST", "10"))
+    cartesia_max_concurrency: int = int(os.getenv("CARTESIA_MAX_CONCURRENCY", "8"))
+    outbound_stretch_wait_s: float = float(os.getenv("OUTBOUND_STRETCH_WAIT_S", "1.0"))
+    outbound_stretch_max: float = float(os.getenv("OUTBOUND_STRETCH_MAX", "3.0"))
+
+    # Live sessions keep one Cartesia TTS websocket open (PCM, sent as WAV) and
+    # fall back to the per-utterance HTTP MP3 request when it is unavailable.
+    tts_websocket: bool = os.getenv("TTS_WEBSOCKET", "false").lower() == "true"
+    # Audio profile for sessions that don't negotiate one: mp3, mp3_low, pcm or
+    # opus (see agent/audio_profiles.py). Empty = pcm with TTS_WEBSOCKET, else mp3.
+    audio_profile: str = os.getenv("AUDIO_PROFILE", "")
 
     # Voice IDs
     voice_id_danny: str = os.getenv("VOICE_ID_DANNY", "")
@@ -30,12 +99,67 @@ class Config:
     detection_fps: int = 5
     detection_confidence: float = 0.5
     commentary_cooldown: float = 8.0
+    # Live clips must reach the client within its playback delay (the extension's
+    # PIPELINE_DELAY_MS; clients may override per session) minus a delivery margin.
+    # Late jobs are retried on a fresher frame before TTS, or dropped. 0 disables.
+    pipeline_delay_ms: float = float(os.getenv("PIPELINE_DELAY_MS", "5000"))
+    commentary_deadline_margin_ms: float = float(os.getenv("COMMENTARY_DEADLINE_MARGIN_MS", "500"))
+    commentary_stale_retries: int = int(os.getenv("COMMENTARY_STALE_RETRIES", "1"))
     skip_detection: bool = os.getenv("SKIP_DETECTION", "true").lower() == "true"
 
+    # File-mode decode: frames are scaled to this width on the decode thread, which
+    # may run up to decode_buffer_frames ahead; analysis_lead_s lets analysis run
+    # that many seconds ahead of the (estimated) playback position.
+    analysis_max_width: int = int(os.getenv("ANALYSIS_MAX_WIDTH", "960"))
+    decode_buffer_frames: int = int(os.getenv("DECODE_BUFFER_FRAMES", "32"))
+    analysis_lead_s: float = float(os.getenv("ANALYSIS_LEAD_S", "0"))
+    # Save file-mode detections next to the MP4 and reuse them on later sessions
+    detection_timeline_cache: bool = os.getenv("DETECTION_TIMELINE_CACHE", "true").lower() == "true"
+
+    # Adaptive detection resolution: step the RF-DETR input size down this ladder
+    # when inference exceeds the per-frame budget (1000 / detection_fps ms).
+    # Scope is "session" (one controller per pipeline) or "global" (shared).
+    adaptive_resolution: bool = os.getenv("ADAPTIVE_RESOLUTION", "true").lower() == "true"
+    detection_resolutions: str = os.getenv("DETECTION_RESOLUTIONS", "448,336")
+    adaptive_resolution_scope: str = os.getenv("ADAPTIVE_RESOLUTION_SCOPE", "session")
+
+    # Precompute mode for downloaded videos: generate the whole commentary script
+    # (text + audio) right after download, in parallel chunks of precompute_chunk_s,
+    # and stream it in sync with playback. Clients can override per /api/start.
+    precompute_mode: bool = os.getenv("PRECOMPUTE_MODE", "false").lower() == "true"
+    precompute_chunk_s: float = float(os.getenv("PRECOMPUTE_CHUNK_S", "60"))
+    precompute_concurrency: int = int(os.getenv("PRECOMPUTE_CONCURRENCY", "3"))
+    # Process-wide cap on precompute pipelines across all jobs (0 = unlimited)
+    max_precompute_pipelines: int = int(os.getenv("MAX_PRECOMPUTE_PIPELINES", "4"))
+    precompute_send_ahead_s: float = float(os.getenv("PRECOMPUTE_SEND_AHEAD_S", "0.5"))
+
+    # Session limits: idle /api/start sessions are evicted after session_ttl_s; at most
+    # max_*_pipelines run per kind (0 = unlimited). At capacity new sessions are
+    # rejected with a retry hint ("reject") or run without detection ("degrade").
+    session_ttl_s: float = float(os.getenv("SESSION_TTL_S", "1800"))
+    max_file_pipelines: int = int(os.getenv("MAX_FILE_PIPELINES", "4"))
+    max_live_pipelines: int = int(os.getenv("MAX_LIVE_PIPELINES", "4"))
+    admission_overflow: str = os.getenv("ADMISSION_OVERFLOW", "reject")
+    admission_retry_after_s: int = int(os.getenv("ADMISSION_RETRY_AFTER_S", "30"))
+    # Where /api/start sessions live: "memory" (single worker) or "redis" (any RESP
+    # server at session_store_url, shared by all workers)
+    session_store: str = os.getenv("SESSION_STORE", "memory")
+    session_store_url: str = os.getenv("SESSION_STORE_URL", "redis://localhost:6379/0")
+
     # Server settings
     server_port: int = int(os.getenv("SERVER_PORT", "8000"))
     videos_dir: str = os.getenv("VIDEOS_DIR", "./videos")
     max_video_duration: int = int(os.getenv("MAX_VIDEO_DURATION", "700"))
+    # Return from /api/start once the first fragments of a (fragmented MP4) download
+    # are on disk instead of waiting for the whole file; needs ffmpeg on PATH
+    progressive_download: bool = os.getenv("PROGRESSIVE_DOWNLOAD", "true").lower() == "true"
+    progressive_min_bytes: int = int(os.getenv("PROGRESSIVE_MIN_BYTES", "2000000"))
+    # Fetch a low-res, <=30 fps video-only proxy (this tall) for analysis next to the
+    # playback video; 0 analyzes the playback stream itself
+    analysis_proxy_height: int = int(os.getenv("ANALYSIS_PROXY_HEIGHT", "480"))
+    proxy_fragment_downloads: int = int(os.getenv("PROXY_FRAGMENT_DOWNLOADS", "4"))
+    # Evict least recently used videos (and their scripts/caches) above this size; 0 = no limit
+    videos_quota_bytes: int = int(os.getenv("VIDEOS_QUOTA_BYTES", str(5 * 1024**3)))
 
 
 config = Config()
@@ -0,0 +1,248 @@
+"""On-disk RF-DETR detection timeline for downloaded videos.
+
+Detections for a file-mode session depend only on the pixels, the sampling
+rate, the model, its input resolution and the confidence threshold -- not on
+sport, persona or the viewer -- so they are saved after the first pass and
+reused by every later session of the same video. Timelines are keyed by video
+id (not file name), so sessions decoding the analysis proxy and the full
+video share them.
+
+A timeline is a directory next to the MP4 in ``videos_dir``::
+
+    <video_id>.det-<model>-<res>px-<fps>fps-c<conf>/
+        meta.json       key, class names, row counts
+        offsets.npy     int64 [n_slots + 1]  rows of slot i are offsets[i]:offsets[i+1]
+        covered.npy     bool  [n_slots]      slot was analyzed (may have 0 rows)
+        xyxy.npy        float32 [rows, 4]    boxes, normalized to 0-1
+        class_id.npy    int16 [rows]
+        confidence.npy  float32 [rows]
+
+Slots are ``SampledFrame.index`` values (``round(pts * fps)``). Boxes are
+stored normalized so the cache is independent of the analysis scale. Arrays
+are opened with ``mmap_mode="r"``, so a hit costs a page-in, not a load.
+``flush`` holds an exclusive ``flock`` on ``<dir>.lock`` while it merges, so
+sessions (or workers) flushing the same timeline don't drop each other's slots.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import supervision as sv
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_FORMAT_VERSION = 1
+
+_COLUMNS = ("offsets", "covered", "xyxy", "class_id", "confidence")
+
+
+def timeline_dir(
+    videos_dir: Path,
+    video_id: str,
+    fps: float,
+    model_id: str,
+    threshold: float,
+    resolution: int | None = None,
+) -> Path:
+    """Cache directory for a video / sample rate / model / resolution / threshold."""
+    model = Path(model_id).stem if model_id.endswith(".onnx") else model_id
+    res = f"{resolution}px" if resolution else "native"
+    return videos_dir / f"{video_id}.det-{model}-{res}-{fps:g}fps-c{threshold:g}"
+
+
+class DetectionTimeline:
+    """Read-through, write-back detection cache for one video.
+
+    ``lookup`` serves slots from the memory-mapped arrays on disk; ``record``
+    collects newly computed slots, and ``flush`` merges them into the on-disk
+    timeline (a partial first pass is kept and completed by later passes).
+
+    Args:
+        videos_dir: Directory holding the video (and its timelines).
+        video_id: Id of the downloaded video.
+        fps: Sample rate the slots were taken at.
+        model_id: RF-DETR model id that produced the detections.
+        threshold: Confidence threshold passed to ``predict``.
+        resolution: Model input resolution (None = the model's native one).
+    """
+
+    def __init__(
+        self,
+        videos_dir: Path,
+        video_id: str,
+        fps: float,
+        model_id: str,
+        threshold: float,
+        resolution: int | None = None,
+    ) -> None:
+        self.path = timeline_dir(videos_dir, video_id, fps, model_id, threshold, resolution)
+        self.resolution = resolution
+        self._key = {
+            "version": TIMELINE_FORMAT_VERSION,
+            "video_id": video_id,
+            "fps": fps,
+            "model_id": model_id,
+            "threshold": threshold,
+            "resolution": resolution,
+        }
+        self._columns: dict[str, np.ndarray] | None = None
+        self.class_names: dict[int, str] = {}
+        self._pending: dict[int, tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._open()
+
+    def _open(self) -> None:
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            return
+        try:
+            meta = json.loads(meta_path.read_text())
+            if meta.get("key") != self._key:
+                logger.info("Detection timeline key mismatch, ignoring: %s", self.path)
+                return
+            columns = {name: np.load(self.path / f"{name}.npy", mmap_mode="r") for name in _COLUMNS}
+            if len(columns["xyxy"]) != meta["rows"] or len(columns["covered"]) != meta["slots"]:
+                logger.warning("Incomplete detection timeline, ignoring: %s", self.path)
+                return
+        except (OSError, ValueError, KeyError):
+            logger.exception("Unreadable detection timeline, ignoring: %s", self.path)
+            return
+
+        self._columns = columns
+        self.class_names = {int(k): v for k, v in meta["class_names"].items()}
+        logger.info(
+            "Detection timeline loaded: %s (%d/%d slots)",
+            self.path.name,
+            int(columns["covered"].sum()),
+            meta["slots"],
+        )
+
+    @property
+    def slots_covered(self) -> int:
+        disk = int(self._columns["covered"].sum()) if self._columns is not None else 0
+        return disk + len(self._pending)
+
+    def lookup(self, index: int, width: int, height: int) -> sv.Detections | None:
+        """Cached detections for a slot in ``width`` x ``height`` pixels, or None on a miss."""
+        cols = self._columns
+        if cols is None or index >= len(cols["covered"]) or not cols["covered"][index]:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        start, end = int(cols["offsets"][index]), int(cols["offsets"][index + 1])
+        xyxy = np.array(cols["xyxy"][start:end], dtype=np.float32)
+        xyxy *= np.array([width, height, width, height], dtype=np.float32)
+        return sv.Detections(
+            xyxy=xyxy,
+            class_id=np.array(cols["class_id"][start:end], dtype=int),
+            confidence=np.array(cols["confidence"][start:end], dtype=np.float32),
+        )
+
+    def record(
+        self,
+        index: int,
+        detections: sv.Detections,
+        width: int,
+        height: int,
+        class_names: dict[int, str],
+    ) -> None:
+        """Queue freshly computed detections for a slot (written by ``flush``)."""
+        n = len(detections)
+        xyxy = np.asarray(detections.xyxy, dtype=np.float32).reshape(n, 4)
+        xyxy = xyxy / np.array([width, height, width, height], dtype=np.float32)
+        class_id = (
+            np.asarray(detections.class_id, dtype=np.int16)
+            if detections.class_id is not None
+            else np.zeros(n, dtype=np.int16)
+        )
+        confidence = (
+            np.asarray(detections.confidence, dtype=np.float32)
+            if detections.confidence is not None
+            else np.ones(n, dtype=np.float32)
+        )
+        self._pending[index] = (xyxy, class_id, confidence)
+        self.class_names = self.class_names or dict(class_names)
+
+    def flush(self) -> None:
+        """Merge pending slots with the on-disk timeline and rewrite it atomically."""
+        if not self._pending:
+            return
+
+        lock_path = self.path.with_name(f"{self.path.name}.lock")
+        with open(lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._merge_and_write()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _merge_and_write(self) -> None:
+        # Re-read the disk state so slots flushed by another session are kept
+        self._columns = None
+        self._open()
+
+        slots: dict[int, tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        cols = self._columns
+        if cols is not None:
+            for index in np.flatnonzero(cols["covered"]):
+                start, end = int(cols["offsets"][index]), int(cols["offsets"][index + 1])
+                slots[int(index)] = (
+                    np.array(cols["xyxy"][start:end]),
+                    np.array(cols["class_id"][start:end]),
+                    np.array(cols["confidence"][start:end]),
+                )
+        slots.update(self._pending)
+
+        n_slots = max(slots) + 1
+        covered = np.zeros(n_slots, dtype=bool)
+        counts = np.zeros(n_slots, dtype=np.int64)
+        for index, (xyxy, _, _) in slots.items():
+            covered[index] = True
+            counts[index] = len(xyxy)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        ordered = [slots[i] for i in sorted(slots)]
+        columns: dict[str, Any] = {
+            "offsets": offsets,
+            "covered": covered,
+            "xyxy": np.concatenate([s[0] for s in ordered]).astype(np.float32).reshape(-1, 4),
+            "class_id": np.concatenate([s[1] for s in ordered]).astype(np.int16),
+            "confidence": np.concatenate([s[2] for s in ordered]).astype(np.float32),
+        }
+        meta = {
+            "key": self._key,
+            "class_names": {str(k): v for k, v in self.class_names.items()},
+            "slots": n_slots,
+            "rows": int(offsets[-1]),
+        }
+
+        # Drop our own mmaps before replacing the files underneath them
+        self._columns = None
+        self.path.mkdir(parents=True, exist_ok=True)
+        # meta.json goes last and its counts are checked on open, so a crash
+        # mid-write leaves a timeline that is ignored rather than misread
+        (self.path / "meta.json").unlink(missing_ok=True)
+        for name, array in columns.items():
+            tmp = self.path / f"{name}.tmp.npy"
+            np.save(tmp, array)
+            os.replace(tmp, self.path / f"{name}.npy")
+        (self.path / "meta.json").write_text(json.dumps(meta, indent=2))
+
+        logger.info(
+            "Detection timeline saved: %s (%d/%d slots, %d new)",
+            self.path.name,
+            int(covered.sum()),
+            n_slots,
+            len(self._pending),
+        )
+        self._pending.clear()
+        self._open()
@@ -0,0 +1,263 @@
+"""RF-DETR detector sidecar: one model per host, shared by every server worker.
+
+Usage:
+    python -m agent.detector_sidecar --socket /tmp/commentator-detector.sock
+
+Then run the server with ``DETECTOR_BACKEND=sidecar`` (and the same
+``DETECTOR_SOCKET``). The sidecar owns the ``DetectorService`` (model
+loading, ONNX / TorchScript / PyTorch backends, adaptive resolutions) and
+serves it over a Unix domain socket:
+
+* requests/replies are length-prefixed JSON (see ``sidecar_client``);
+* frames arrive in shared-memory segments created by the client, and are
+  read in place -- only the segment name and shape cross the socket;
+* requests from all connections are collected for up to ``--max-wait-ms``
+  (or ``--max-batch`` frames) and run as one batch per
+  ``(resolution, threshold)`` group.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any
+
+import numpy as np
+
+from agent.config import config
+from agent.processors.adaptive_resolution import parse_resolutions
+from agent.processors.detector_service import DetectorService
+from agent.processors.sidecar_client import detections_to_wire, read_message, write_message
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PredictRequest:
+    image: np.ndarray  # view into the client's shared-memory segment
+    threshold: float
+    resolution: int | None
+    future: asyncio.Future
+
+
+class DetectorSidecar:
+    """Unix-socket inference server with cross-client batching.
+
+    Args:
+        service: In-process detector that runs the model.
+        socket_path: Where to listen.
+        max_batch: Largest batch handed to the model.
+        max_wait_ms: How long the first request in a batch waits for company.
+    """
+
+    def __init__(
+        self, service: DetectorService, socket_path: str, max_batch: int, max_wait_ms: float
+    ) -> None:
+        self.service = service
+        self.socket_path = socket_path
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000
+        self._queue: asyncio.Queue[_PredictRequest] = asyncio.Queue()
+        self._segments: OrderedDict[str, shared_memory.SharedMemory] = OrderedDict()
+        self._clients = 0
+        self._batches = 0
+        self._batched_frames = 0
+        self._started = time.monotonic()
+
+    # ---- Shared memory ----
+
+    def _attach(self, name: str) -> shared_memory.SharedMemory:
+        """Open (and cache) a client's segment without taking ownership of it."""
+        segment = self._segments.get(name)
+        if segment is not None:
+            self._segments.move_to_end(name)
+            return segment
+        segment = shared_memory.SharedMemory(name=name)
+        # The client created (and will unlink) the segment; stop our resource
+        # tracker from unlinking it when the sidecar exits.
+        resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore[attr-defined]
+        self._segments[name] = segment
+        while len(self._segments) > 256:
+            _, old = self._segments.popitem(last=False)
+            old.close()
+        return segment
+
+    # ---- Connections ----
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._clients += 1
+        logger.info("Client connected (%d total)", self._clients)
+        write_lock = asyncio.Lock()
+        tasks: set[asyncio.Task] = set()
+
+        async def _reply(message: dict[str, Any]) -> None:
+            async with write_lock:
+                write_message(writer, message)
+                await writer.drain()
+
+        async def _serve(message: dict[str, Any]) -> None:
+            request_id = message.get("id", 0)
+            try:
+                reply = await self._dispatch(message)
+            except Exception as e:
+                logger.exception("Request failed: %s", message.get("op"))
+                reply = {"error": str(e)}
+            await _reply({**reply, "id": request_id})
+
+        try:
+            while True:
+                message = await read_message(reader)
+                task = asyncio.create_task(_serve(message))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients -= 1
+            for task in tasks:
+                task.cancel()
+            writer.close()
+            logger.info("Client disconnected (%d left)", self._clients)
+
+    async def _dispatch(self, message: dict[str, Any]) -> dict[str, Any]:
+        op = message.get("op")
+        if op == "load":
+            cached = await self.service.load(message.get("resolution"))
+            return {"class_name_map": {str(k): v for k, v in cached["class_name_map"].items()}}
+        if op == "predict":
+            segment = self._attach(message["shm"])
+            shape = tuple(message["shape"])
+            image = np.ndarray(shape, dtype=np.uint8, buffer=segment.buf)
+            threshold = message.get("threshold")
+            request = _PredictRequest(
+                image=image,
+                threshold=config.detection_confidence if threshold is None else threshold,
+                resolution=message.get("resolution"),
+                future=asyncio.get_running_loop().create_future(),
+            )
+            await self._queue.put(request)
+            return await request.future
+        if op == "stats":
+            return {"stats": self.stats()}
+        raise ValueError(f"Unknown op: {op}")
+
+    # ---- Batching ----
+
+    async def _collect_batch(self) -> list[_PredictRequest]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _batch_loop(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            groups: dict[tuple[int | None, float], list[_PredictRequest]] = {}
+            for request in batch:
+                if not request.future.cancelled():
+                    groups.setdefault((request.resolution, request.threshold), []).append(request)
+
+            for (resolution, threshold), requests in groups.items():
+                try:
+                    detections, inference_ms = await self.service.predict_batch(
+                        [r.image for r in requests], threshold=threshold, resolution=resolution
+                    )
+                except Exception as e:
+                    for r in requests:
+                        if not r.future.done():
+                            r.future.set_exception(e)
+                    continue
+
+                self._batches += 1
+                self._batched_frames += len(requests)
+                for r, det in zip(requests, detections):
+                    if not r.future.done():
+                        r.future.set_result(
+                            {
+                                "detections": detections_to_wire(det),
+                                "inference_ms": inference_ms,
+                                "batch_size": len(requests),
+                            }
+                        )
+
+    # ---- Lifecycle ----
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            **self.service.stats(),
+            "clients": self._clients,
+            "batches": self._batches,
+            "avg_batch_size": (
+                round(self._batched_frames / self._batches, 2) if self._batches else None
+            ),
+            "queued": self._queue.qsize(),
+            "uptime_s": round(time.monotonic() - self._started, 1),
+        }
+
+    async def serve(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        await self.service.load()
+        preload = None
+        if config.adaptive_resolution:
+            ladder = [None, *parse_resolutions(config.detection_resolutions)]
+            preload = asyncio.create_task(self.service.preload(ladder))
+        batcher = asyncio.create_task(self._batch_loop())
+        server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        logger.info(
+            "Detector sidecar serving %s on %s (batch <= %d, wait <= %.0f ms)",
+            self.service.model_id,
+            self.socket_path,
+            self.max_batch,
+            self.max_wait_s * 1000,
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            if preload is not None:
+                preload.cancel()
+            for segment in self._segments.values():
+                segment.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="RF-DETR detector sidecar")
+    parser.add_argument("--socket", default=config.detector_socket, help="Unix socket path")
+    parser.add_argument("--model", default=config.rfdetr_model_id, help="RF-DETR model id")
+    parser.add_argument("--max-batch", type=int, default=config.sidecar_max_batch)
+    parser.add_argument("--max-wait-ms", type=float, default=config.sidecar_max_wait_ms)
+    args = parser.parse_args()
+
+    sidecar = DetectorSidecar(
+        DetectorService(args.model), args.socket, args.max_batch, args.max_wait_ms
+    )
+    try:
+        asyncio.run(sidecar.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)-8s | %(message)s")
+    main()
@@ -0,0 +1,51 @@
+"""One-shot RF-DETR → ONNX export for CPU-only hosts.
+
+Usage:
+    python -m agent.export_onnx --model rfdetr-base --int8
+
+Writes ``model.onnx`` (and ``model.int8.onnx`` with ``--int8``) plus a
+``metadata.json`` with the class names to ``<MODEL_CACHE_DIR>/<model>/``.
+Each ``--resolution`` adds graphs for that input size (``model.448.onnx``),
+used by adaptive resolution when inference falls behind.
+Afterwards set ``RFDETR_MODEL_ID=rfdetr-base-onnx`` (or ``rfdetr-base-onnx-int8``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+
+from agent.config import config
+from agent.processors.onnx_detector import export_onnx
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export RF-DETR to ONNX")
+    parser.add_argument(
+        "--model",
+        default="rfdetr-base",
+        choices=["rfdetr-base", "rfdetr-large"],
+        help="RF-DETR checkpoint to export",
+    )
+    parser.add_argument("--cache-dir", default=config.model_cache_dir, help="Model cache directory")
+    parser.add_argument("--int8", action="store_true", help="Also write an INT8-quantized graph")
+    parser.add_argument("--force", action="store_true", help="Overwrite existing artifacts")
+    parser.add_argument(
+        "--resolution",
+        type=int,
+        action="append",
+        help="Also export at this input resolution (repeatable, e.g. 448 336)",
+    )
+    args = parser.parse_args()
+
+    for resolution in [None, *(args.resolution or [])]:
+        written = export_onnx(
+            args.model, args.cache_dir, quantize=args.int8, force=args.force, resolution=resolution
+        )
+        for kind, path in written.items():
+            print(f"{kind}: {path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)-8s | %(message)s")
+    main()
@@ -0,0 +1,373 @@
+"""File-mode frame source: sampled, pre-scaled decode on a dedicated thread.
+
+``FileFrameSource`` decodes an MP4 with PyAV on its own thread and hands the
+event loop only the frames it will actually analyze (``fps`` samples per
+second of video), already converted to RGB24 and scaled for the detector.
+Decoding runs ahead of playback into a bounded buffer; ``PlaybackPacer``
+decides when each sampled frame is due, so pacing never stalls the decoder.
+
+Skipping work:
+
+* Non-reference frames are dropped inside the codec when the source frame
+  rate is at least twice the sample rate (``skip_frame = "NONREF"``).
+* When the sample interval is long (``seek_threshold_s``), the decoder seeks
+  to the keyframe before the next sample instead of decoding the gap.
+* When the viewer seeks, ``seek`` moves the decoder to the new position, so
+  the gap is not decoded either.
+
+Files that are still being downloaded (fragmented MP4, see
+``video_download``) are read up to the current watermark; at EOF the decoder
+waits, reopens and resumes until the download completes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import math
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import av
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SampledFrame:
+    """One decoded, scaled frame selected for analysis."""
+
+    index: int  # global sample slot: round(sample time * fps), stable across chunks
+    pts: float  # presentation time in seconds
+    image: np.ndarray  # RGB24, HxWx3
+
+
+class FileFrameSource:
+    """Decode sampled frames from a video file on a background thread.
+
+    Args:
+        path: Video file to decode.
+        fps: Samples per second of video time.
+        max_width: Scale frames down (keeping aspect) to at most this width.
+        buffer_size: Maximum number of decoded frames held ahead of the consumer.
+        seek_threshold_s: Seek instead of decoding through gaps at least this long.
+        start_s: Video time to start sampling at (seeks there first).
+        end_s: Video time to stop at (exclusive). None decodes to the end.
+        growing: Returns True while the file is still being downloaded; at EOF
+            the source then waits ``growth_poll_s``, reopens the file and
+            resumes from the next sample instead of ending.
+        growth_poll_s: How long to wait for more data at the watermark.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        fps: float,
+        max_width: int | None = None,
+        buffer_size: int = 32,
+        seek_threshold_s: float = 2.0,
+        start_s: float = 0.0,
+        end_s: float | None = None,
+        growing: Callable[[], bool] | None = None,
+        growth_poll_s: float = 1.0,
+    ) -> None:
+        self.path = Path(path)
+        self.start_s = start_s
+        self.end_s = end_s
+        self.fps = fps
+        self.max_width = max_width
+        self.seek_threshold_s = seek_threshold_s
+        self.growing = growing
+        self.growth_poll_s = growth_poll_s
+        # Frames are queued with the seek generation they were decoded in
+        self._queue: asyncio.Queue[tuple[int, SampledFrame] | None] = asyncio.Queue(
+            maxsize=buffer_size
+        )
+        self._stop = threading.Event()
+        self._seek_lock = threading.Lock()
+        self._seek_to: float | None = None
+        self._generation = 0  # bumped by seek (event loop)
+        self._decode_generation = 0  # generation being decoded (decode thread)
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.frames_decoded = 0
+        self.frames_sampled = 0
+        self.reopens = 0
+        self.seeks = 0
+
+    def start(self) -> None:
+        """Start the decode thread (must be called from the event loop)."""
+        self._loop = asyncio.get_running_loop()
+        self._thread = threading.Thread(
+            target=self._decode_loop, name=f"decode-{self.path.stem}", daemon=True
+        )
+        self._thread.start()
+
+    async def get(self) -> SampledFrame | None:
+        """Next sampled frame, or None at end of stream / after stop.
+
+        Frames decoded before the latest ``seek`` are skipped.
+        """
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return None
+            generation, frame = item
+            if generation == self._generation:
+                return frame
+
+    @property
+    def buffered(self) -> int:
+        return self._queue.qsize()
+
+    def seek(self, ts: float) -> None:
+        """Resume sampling at video time ``ts`` (the viewer seeked).
+
+        Must be called from the event loop. Frames buffered from the old
+        position are discarded, which also unblocks a decoder waiting for room.
+        """
+        with self._seek_lock:
+            self._seek_to = max(self.start_s, ts)
+            self._generation += 1
+        while not self._queue.empty():
+            if self._queue.get_nowait() is None:
+                # End of stream: keep it, the decoder has already exited
+                self._queue.put_nowait(None)
+                break
+
+    def _take_seek(self) -> float | None:
+        """Pending seek target aligned to the next sample slot, if any (decode thread)."""
+        with self._seek_lock:
+            ts, self._seek_to = self._seek_to, None
+            self._decode_generation = self._generation
+        if ts is None:
+            return None
+        self.seeks += 1
+        return math.ceil(ts * self.fps - 1e-6) / self.fps
+
+    def stop(self) -> None:
+        """Stop decoding and wake any consumer blocked in ``get``."""
+        self._stop.set()
+        # Make room for the sentinel if the buffer is full
+        while self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    # ---- Decode thread ----
+
+    def _put(self, frame: SampledFrame | None) -> bool:
+        """Hand a frame to the event loop, blocking while the buffer is full."""
+        assert self._loop is not None
+        item = None if frame is None else (self._decode_generation, frame)
+        future = asyncio.run_coroutine_threadsafe(self._queue.put(item), self._loop)
+        while not self._stop.is_set():
+            try:
+                future.result(timeout=0.5)
+                return True
+            except concurrent.futures.TimeoutError:
+                continue
+        future.cancel()
+        return False
+
+    def _scaled_size(self, width: int, height: int) -> tuple[int, int]:
+        if self.max_width is None or width <= self.max_width:
+            return width, height
+        scale = self.max_width / width
+        # Even dimensions keep swscale happy for yuv420 sources
+        return self.max_width, max(2, int(height * scale) // 2 * 2)
+
+    def _still_growing(self) -> bool:
+        return self.growing is not None and self.growing()
+
+    def _decode_loop(self) -> None:
+        t0 = time.perf_counter()
+        next_ts = self.start_s
+        try:
+            while not self._stop.is_set():
+                # Snapshot before the pass: if the download finishes mid-pass we
+                # still make one more pass to pick up the tail.
+                growing = self._still_growing()
+                next_ts, finished = self._decode_pass(next_ts, growing)
+                if finished or not growing:
+                    break
+                # Hit the downloaded watermark: wait for more fragments, then reopen
+                self.reopens += 1
+                self._stop.wait(self.growth_poll_s)
+        except Exception:
+            logger.exception("Decode error in %s", self.path)
+        finally:
+            logger.info(
+                "Decode finished: %s (%d decoded, %d sampled, %.1fs)",
+                self.path.name,
+                self.frames_decoded,
+                self.frames_sampled,
+                time.perf_counter() - t0,
+            )
+            if not self._stop.is_set():
+                self._put(None)
+
+    def _decode_pass(self, next_ts: float, growing: bool) -> tuple[float, bool]:
+        """Open the file and decode samples from ``next_ts`` until EOF.
+
+        Returns:
+            ``(next_ts, finished)`` -- finished is True when ``end_s`` was
+            reached or decoding was stopped, False at end of file.
+        """
+        try:
+            container = av.open(str(self.path))
+        except (av.error.FFmpegError, OSError):
+            if growing:
+                # Not enough of the file on disk yet to read the header
+                return next_ts, False
+            raise
+
+        with container:
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"
+
+            source_fps = float(stream.average_rate or 0)
+            if source_fps >= 2 * self.fps:
+                stream.codec_context.skip_frame = "NONREF"
+
+            interval = 1.0 / self.fps
+            width, height = self._scaled_size(
+                stream.codec_context.width, stream.codec_context.height
+            )
+            target = self._take_seek()
+            if target is not None:
+                next_ts = target
+            if next_ts > 0:
+                container.seek(int(next_ts / stream.time_base), stream=stream, backward=True)
+
+            while not self._stop.is_set():
+                seeked = False
+                try:
+                    for frame in container.decode(stream):
+                        if self._stop.is_set():
+                            return next_ts, True
+                        target = self._take_seek()
+                        if target is not None:
+                            next_ts = target
+                            container.seek(
+                                int(next_ts / stream.time_base), stream=stream, backward=True
+                            )
+                            seeked = True
+                            break
+                        self.frames_decoded += 1
+                        if frame.time is None or frame.time + 1e-3 < next_ts:
+                            continue
+                        if self.end_s is not None and frame.time >= self.end_s:
+                            return next_ts, True
+
+                        image = frame.to_ndarray(width=width, height=height, format="rgb24")
+                        index = int(round(next_ts * self.fps))
+                        if not self._put(SampledFrame(index=index, pts=frame.time, image=image)):
+                            return next_ts, True
+                        self.frames_sampled += 1
+                        while next_ts <= frame.time:
+                            next_ts += interval
+
+                        if next_ts - frame.time >= self.seek_threshold_s:
+                            container.seek(
+                                int(next_ts / stream.time_base), stream=stream, backward=True
+                            )
+                            seeked = True
+                            break
+                except av.error.FFmpegError:
+                    if not growing:
+                        raise
+                    # Truncated last fragment of a file that is still being written
+                    return next_ts, False
+                if not seeked:
+                    break
+
+        return next_ts, self._stop.is_set()
+
+
+class PlaybackPacer:
+    """Release sampled frames in step with (approximate) playback time.
+
+    Starts a wall clock at ``start`` and lets frame ``pts`` through once
+    ``pts - lead_s`` of playback has elapsed. ``sync`` re-anchors the clock to
+    a playback position reported by the client (play / pause / seek /
+    buffering); once the client has reported one, ``start`` keeps it.
+
+    A sync that moves the position by at least ``jump_s`` from the estimate
+    counts as a jump (a seek): ``sync`` reports it so the caller can move the
+    decoder, and a ``wait_until`` pending across it returns False because its
+    frame belongs to the old position.
+
+    Args:
+        lead_s: How far ahead of playback frames may be analyzed.
+        jump_s: Minimum position change, in seconds, treated as a seek.
+    """
+
+    def __init__(self, lead_s: float = 0.0, jump_s: float = 2.0) -> None:
+        self.lead_s = lead_s
+        self.jump_s = jump_s
+        self.jumps = 0
+        self._anchor_wall = time.monotonic()
+        self._anchor_pos = 0.0
+        self._paused = False
+        self._synced = False
+        self._released = False
+        self._changed = asyncio.Event()
+
+    def start(self) -> None:
+        if self._synced:
+            return
+        self._anchor_wall = time.monotonic()
+        self._anchor_pos = 0.0
+
+    def position(self) -> float:
+        """Estimated current playback position in seconds."""
+        if self._paused:
+            return self._anchor_pos
+        return self._anchor_pos + (time.monotonic() - self._anchor_wall)
+
+    def sync(self, position: float, paused: bool = False) -> bool:
+        """Re-anchor to a client-reported playback position.
+
+        Returns:
+            True when the position jumped by at least ``jump_s``.
+        """
+        jumped = abs(position - self.position()) >= self.jump_s
+        if jumped:
+            self.jumps += 1
+        self._anchor_pos = position
+        self._anchor_wall = time.monotonic()
+        self._paused = paused
+        self._synced = True
+        self._changed.set()
+        return jumped
+
+    def release(self) -> None:
+        """Stop pacing: every pending and future ``wait_until`` returns at once."""
+        self._released = True
+        self._changed.set()
+
+    async def wait_until(self, pts: float) -> bool:
+        """Sleep until the frame at ``pts`` is due (wakes early on ``sync``).
+
+        Returns:
+            False when playback jumped while waiting (drop the frame), else True.
+        """
+        jumps = self.jumps
+        while not self._released:
+            if self.jumps != jumps:
+                return False
+            delay = (pts - self.lead_s) - self.position()
+            if delay <= 0 and not self._paused:
+                return True
+            self._changed.clear()
+            try:
+                timeout = None if self._paused else delay
+                await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return True
@@ -9,6 +9,7 @@ import logging
 import random
 import time
 from pathlib import Path
+from typing import Any
 
 from vision_agents.core import Agent, AgentLauncher, Runner, User
 from vision_agents.plugins.anthropic import LLM as ClaudeLLM
@@ -17,7 +18,9 @@ from vision_agents.plugins.getstream import Edge
 
 from agent.cartesia_stt import CartesiaSTT
 from agent.config import config
+from agent.model_router import get_model_router
 from agent.processors.detection_processor import LocalDetectionProcessor
+from agent.processors.detector_service import get_detector
 from agent.processors.events import DetectionCompletedEvent
 
 logger = logging.getLogger(__name__)
@@ -52,14 +55,42 @@ class Debouncer:
         return False
 
 
+class RoutedClaudeLLM(ClaudeLLM):
+    """Claude LLM that re-picks its model from the router on every call.
+
+    Each call's latency (or failure) is recorded under the ``question`` route,
+    so the realtime agent falls back to the next candidate when its current
+    model runs over budget, like every other Claude call in the app.
+    """
+
+    def __init__(self, task: str = "question", **kwargs: Any) -> None:
+        self._task = task
+        super().__init__(model=get_model_router().pick(task), **kwargs)
+
+    async def create_message(self, *args: Any, **kwargs: Any) -> Any:
+        router = get_model_router()
+        model = self.model = router.pick(self._task)
+        kwargs["model"] = model
+        start = time.perf_counter()
+        try:
+            response = await super().create_message(*args, **kwargs)
+        except Exception as e:
+            router.record_failure(self._task, model, e)
+            raise
+        router.record(self._task, model, (time.perf_counter() - start) * 1000)
+        return response
+
+
 def create_agent() -> Agent:
     """Factory function that creates a fully configured sports commentator agent."""
+    # Shared detector: one model + inference queue per process, reused across agents
     processor = LocalDetectionProcessor(
         model_id=config.rfdetr_model_id,
         conf_threshold=config.detection_confidence,
         fps=config.detection_fps,
         classes=["person", "sports ball"],
         annotate=True,
+        detector=get_detector(config.rfdetr_model_id),
     )
 
     agent = Agent(
@@ -72,15 +103,19 @@ def create_agent() -> Agent:
             name="Danny",
         ),
         instructions=INSTRUCTIONS,
-        llm=ClaudeLLM(
-            model="claude-sonnet-4-5-20250929",
-            api_key=config.anthropic_api_key or None,
-        ),
+        llm=RoutedClaudeLLM(api_key=config.anthropic_api_key or None),
         stt=CartesiaSTT(
             api_key=config.cartesia_api_key or None,
             model="ink-whisper",
             language="en",
             max_silence_duration_secs=1.5,
+            packet_ms=config.stt_packet_ms,
+            max_buffer_ms=config.stt_max_buffer_ms,
+            vad=config.stt_vad,
+            vad_threshold_db=config.stt_vad_threshold_db,
+            vad_hangover_ms=config.stt_vad_hangover_ms,
+            vad_pre_roll_ms=config.stt_vad_pre_roll_ms,
+            replay_ms=config.stt_replay_ms,
         ),
         tts=CartesiaTTS(
             api_key=config.cartesia_api_key or None,
@@ -0,0 +1,78 @@
+"""Process-wide runtime metrics, served as JSON at ``GET /api/metrics``.
+
+Deliberately tiny: named counters and gauges, plus *providers* -- callables
+registered by long-lived components (pipelines, controllers) that return a
+dict of their current stats when a snapshot is taken.
+"""
+
+from __future__ import annotations
+
+import logging
+import resource
+import threading
+import time
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+_gauges: dict[str, Any] = {}
+_providers: dict[str, Callable[[], dict[str, Any]]] = {}
+_started_at = time.time()
+
+
+def incr(name: str, value: float = 1) -> None:
+    """Increment a counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: Any) -> None:
+    """Set a gauge to its latest value."""
+    with _lock:
+        _gauges[name] = value
+
+
+def register_provider(name: str, provider: Callable[[], dict[str, Any]]) -> None:
+    """Register a callable whose stats are included in every snapshot."""
+    with _lock:
+        _providers[name] = provider
+
+
+def unregister_provider(name: str) -> None:
+    """Remove a previously registered provider (no-op if absent)."""
+    with _lock:
+        _providers.pop(name, None)
+
+
+def process_rss_bytes() -> int:
+    """Current resident set size (falls back to peak RSS off Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def snapshot() -> dict[str, Any]:
+    """Return a JSON-serializable view of all metrics."""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        providers = dict(_providers)
+
+    provided: dict[str, Any] = {}
+    for name, provider in providers.items():
+        try:
+            provided[name] = provider()
+        except Exception:
+            logger.exception("Metrics provider %s failed", name)
+
+    return {
+        "uptime_s": round(time.time() - _started_at, 1),
+        "counters": counters,
+        "gauges": gauges,
+        "providers": provided,
+    }
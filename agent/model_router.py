@@ -0,0 +1,542 @@
+"""Per-task Claude model routing with latency-aware fallback.
+
+Each task ("commentary.danny", "question", "onboarding", "extraction", ...)
+has an ordered list of candidate models and a latency budget. The router
+keeps a rolling window of call latencies per (task, model) and picks the
+first candidate whose p95 is within budget; a model that blows its budget
+is skipped until its slow samples age out of the window. Calls that fail
+with a retryable API error count as infinitely slow samples and are retried
+once on the next candidate; other errors (e.g. a 400) are counted but do not
+mark the model slow.
+
+Task lookup falls back along the dotted name: "commentary.coach_kay" uses the
+"commentary.coach_kay" route if configured, else "commentary", else "default".
+
+Routes and budgets come from ``MODEL_ROUTES`` / ``MODEL_LATENCY_BUDGETS_MS``,
+e.g. ``commentary=claude-haiku-4-5-20251001,claude-sonnet-4-5-20250929;question=...``.
+
+``stream_text`` additionally supports request hedging: the call is streamed,
+and if no first token arrives within a percentile of recent time-to-first-
+token, a second request (same model, or the next candidate) is fired; the
+first to produce a token wins and the other is cancelled. A request cancelled
+before its first token still contributes its elapsed time as a (censored)
+time-to-first-token sample.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from anthropic import APIConnectionError, APIStatusError, APITimeoutError, AsyncAnthropic
+
+from agent import metrics
+from agent.config import config
+from agent.outbound import Priority, get_limiter
+
+logger = logging.getLogger(__name__)
+
+SONNET = "claude-sonnet-4-5-20250929"
+HAIKU = "claude-haiku-4-5-20251001"
+
+DEFAULT_ROUTES: dict[str, list[str]] = {
+    "default": [SONNET, HAIKU],
+    "commentary": [HAIKU, SONNET],
+    "question": [SONNET, HAIKU],
+    "onboarding": [SONNET, HAIKU],
+    "extraction": [HAIKU, SONNET],
+}
+
+DEFAULT_BUDGETS_MS: dict[str, float] = {
+    "default": 4000,
+    "commentary": 1500,
+    "question": 2500,
+    "onboarding": 2500,
+    "extraction": 3000,
+}
+
+
+def parse_routes(spec: str) -> dict[str, list[str]]:
+    """Parse ``task=model,model;task=model`` into a route table."""
+    routes: dict[str, list[str]] = {}
+    for entry in spec.split(";"):
+        task, _, models = entry.partition("=")
+        names = [m.strip() for m in models.split(",") if m.strip()]
+        if task.strip() and names:
+            routes[task.strip()] = names
+    return routes
+
+
+def parse_budgets(spec: str) -> dict[str, float]:
+    """Parse ``task=ms;task=ms`` into a budget table."""
+    budgets: dict[str, float] = {}
+    for entry in spec.split(";"):
+        task, _, ms = entry.partition("=")
+        if task.strip() and ms.strip():
+            budgets[task.strip()] = float(ms)
+    return budgets
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    return isinstance(error, APIStatusError) and (
+        error.status_code == 429 or error.status_code >= 500
+    )
+
+
+class _LatencyWindow:
+    """Latency samples of one (route, model) over the last ``window_s`` seconds."""
+
+    def __init__(self, window_s: float, max_samples: int) -> None:
+        self.window_s = window_s
+        self._samples: deque[tuple[float, float]] = deque(maxlen=max_samples)
+        self.calls = 0
+        self.errors = 0
+
+    def _prune(self, now: float) -> None:
+        while self._samples and now - self._samples[0][0] > self.window_s:
+            self._samples.popleft()
+
+    def add(self, latency_ms: float) -> None:
+        self._samples.append((time.monotonic(), latency_ms))
+
+    def percentile(self, pct: float) -> tuple[float | None, int]:
+        """Return (percentile ms, sample count); None below one sample."""
+        self._prune(time.monotonic())
+        if not self._samples:
+            return None, 0
+        ordered = sorted(ms for _, ms in self._samples)
+        idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[idx], len(ordered)
+
+
+@dataclass
+class _Attempt:
+    """One in-flight streamed request of a (possibly hedged) call."""
+
+    model: str
+    task: asyncio.Task | None = None
+    # Set on the first text token, or when the request task finishes
+    signal: asyncio.Event = field(default_factory=asyncio.Event)
+    # Set once the outbound limiter let the request go (or it finished)
+    started: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def failed(self) -> bool:
+        return (
+            self.task is not None
+            and self.task.done()
+            and (self.task.cancelled() or self.task.exception() is not None)
+        )
+
+
+class ModelRouter:
+    """Pick a Claude model per task from rolling latency.
+
+    Args:
+        routes: Task -> candidate models, preferred first.
+        budgets_ms: Task -> p95 latency budget in milliseconds.
+        window_s: Age after which latency samples are forgotten.
+        max_samples: Samples kept per (route, model).
+        min_samples: Samples needed before a model can be judged over budget.
+        percentile: Percentile compared against the budget (0-100).
+    """
+
+    def __init__(
+        self,
+        routes: dict[str, list[str]],
+        budgets_ms: dict[str, float],
+        window_s: float = 300.0,
+        max_samples: int = 100,
+        min_samples: int = 5,
+        percentile: float = 95.0,
+    ) -> None:
+        self.routes = {**DEFAULT_ROUTES, **routes}
+        self.budgets_ms = {**DEFAULT_BUDGETS_MS, **budgets_ms}
+        self.window_s = window_s
+        self.max_samples = max_samples
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self._windows: dict[tuple[str, str], _LatencyWindow] = {}
+        self._picks: dict[tuple[str, str], int] = {}
+        self._fallbacks: dict[str, int] = {}
+        self._last_choice: dict[str, str] = {}
+        self._ttft: dict[tuple[str, str], _LatencyWindow] = {}
+        self._hedges: dict[str, int] = {}
+        self._hedge_wins: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ---- Routing ----
+
+    def route_for(self, task: str) -> str:
+        """Most specific configured route for a dotted task name."""
+        name = task
+        while name:
+            if name in self.routes:
+                return name
+            name = name.rpartition(".")[0]
+        return "default"
+
+    def budget_ms(self, route: str) -> float:
+        """Latency budget of a route (falling back along the dotted name)."""
+        name = route
+        while name:
+            if name in self.budgets_ms:
+                return self.budgets_ms[name]
+            name = name.rpartition(".")[0]
+        return self.budgets_ms["default"]
+
+    def _window(self, route: str, model: str) -> _LatencyWindow:
+        key = (route, model)
+        window = self._windows.get(key)
+        if window is None:
+            window = _LatencyWindow(self.window_s, self.max_samples)
+            self._windows[key] = window
+        return window
+
+    def _within_budget(self, route: str, model: str) -> bool:
+        p, n = self._window(route, model).percentile(self.percentile)
+        return p is None or n < self.min_samples or p <= self.budget_ms(route)
+
+    def candidates(self, task: str) -> list[str]:
+        """Candidate models for ``task``: healthy ones in preference order, then the rest.
+
+        Over-budget models are ordered by their current percentile, so when
+        every candidate is slow the least slow one is tried first.
+        """
+        route = self.route_for(task)
+        models = self.routes[route]
+        with self._lock:
+            healthy = [m for m in models if self._within_budget(route, m)]
+            slow = sorted(
+                (m for m in models if m not in healthy),
+                key=lambda m: self._window(route, m).percentile(self.percentile)[0] or 0.0,
+            )
+        return healthy + slow
+
+    def pick(self, task: str) -> str:
+        """Model to use for the next ``task`` call."""
+        route = self.route_for(task)
+        model = self.candidates(task)[0]
+        with self._lock:
+            self._picks[(route, model)] = self._picks.get((route, model), 0) + 1
+            previous = self._last_choice.get(route)
+            self._last_choice[route] = model
+            if model != self.routes[route][0]:
+                self._fallbacks[route] = self._fallbacks.get(route, 0) + 1
+        if previous is not None and previous != model:
+            logger.info("Model route %s: %s -> %s", route, previous, model)
+        metrics.incr(f"models.{route}.{model}")
+        return model
+
+    def record(self, task: str, model: str, latency_ms: float, error: bool = False) -> None:
+        """Record one call. Failed calls count as infinitely slow samples."""
+        route = self.route_for(task)
+        with self._lock:
+            window = self._window(route, model)
+            window.calls += 1
+            if error:
+                window.errors += 1
+            window.add(float("inf") if error else latency_ms)
+
+    # ---- Calls ----
+
+    def record_failure(self, task: str, model: str, error: Exception) -> None:
+        """Record a failed call (and tell the outbound limiter about 429s).
+
+        Only retryable failures (connection, timeout, 429, 5xx) count as
+        infinitely slow samples; a non-retryable error such as a 400 is the
+        request's fault, not the model's, and is only counted as an error.
+        """
+        if _is_retryable(error):
+            self.record(task, model, 0.0, error=True)
+        else:
+            with self._lock:
+                window = self._window(self.route_for(task), model)
+                window.calls += 1
+                window.errors += 1
+        if isinstance(error, APIStatusError) and error.status_code == 429:
+            get_limiter("anthropic").note_rate_limited()
+
+    async def _timed_create(
+        self,
+        client: AsyncAnthropic,
+        task: str,
+        model: str,
+        priority: Priority,
+        kwargs: dict[str, Any],
+    ) -> Any:
+        async with get_limiter("anthropic").slot(priority):
+            start = time.perf_counter()
+            try:
+                response = await client.messages.create(model=model, **kwargs)
+            except Exception as e:
+                self.record_failure(task, model, e)
+                raise
+        self.record(task, model, (time.perf_counter() - start) * 1000)
+        return response
+
+    async def create(
+        self,
+        client: AsyncAnthropic,
+        task: str,
+        priority: Priority | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """``client.messages.create`` on the routed model, timed and recorded.
+
+        The call waits for an Anthropic outbound slot of ``priority`` (derived
+        from ``task`` by default). A retryable API error (connection, timeout,
+        429, 5xx) is retried once on the next candidate model.
+        """
+        priority = Priority.for_task(task) if priority is None else priority
+        model = self.pick(task)
+        try:
+            return await self._timed_create(client, task, model, priority, kwargs)
+        except Exception as e:
+            fallback = next((m for m in self.candidates(task) if m != model), None)
+            if fallback is None or not _is_retryable(e):
+                raise
+            logger.warning("Model %s failed for %s (%s), retrying on %s", model, task, e, fallback)
+            metrics.incr(f"models.{self.route_for(task)}.retries")
+            return await self._timed_create(client, task, fallback, priority, kwargs)
+
+    # ---- Hedged streaming ----
+
+    def _ttft_window(self, route: str, model: str) -> _LatencyWindow:
+        key = (route, model)
+        window = self._ttft.get(key)
+        if window is None:
+            window = _LatencyWindow(self.window_s, self.max_samples)
+            self._ttft[key] = window
+        return window
+
+    def hedge_delay_s(self, task: str, model: str) -> float:
+        """Seconds to wait for a first token before hedging a ``task`` call to ``model``."""
+        route = self.route_for(task)
+        with self._lock:
+            p, n = self._ttft_window(route, model).percentile(config.llm_hedge_percentile)
+        delay_ms = p if p is not None and n >= self.min_samples else config.llm_hedge_default_ms
+        return max(delay_ms, config.llm_hedge_min_delay_ms) / 1000
+
+    async def _stream_attempt(
+        self,
+        client: AsyncAnthropic,
+        task: str,
+        attempt: _Attempt,
+        priority: Priority,
+        kwargs: dict[str, Any],
+    ) -> str:
+        route = self.route_for(task)
+        parts: list[str] = []
+        async with get_limiter("anthropic").slot(priority):
+            attempt.started.set()
+            start = time.perf_counter()
+            try:
+                async with client.messages.stream(model=attempt.model, **kwargs) as stream:
+                    async for text in stream.text_stream:
+                        if not attempt.signal.is_set():
+                            with self._lock:
+                                self._ttft_window(route, attempt.model).add(
+                                    (time.perf_counter() - start) * 1000
+                                )
+                            attempt.signal.set()
+                        parts.append(text)
+            except asyncio.CancelledError:
+                if not attempt.signal.is_set():
+                    # Cancelled before its first token (e.g. a hedge won): its TTFT is
+                    # at least the elapsed time. Dropping it would leave only fast
+                    # samples, shrinking the hedge delay and raising the hedge rate.
+                    with self._lock:
+                        self._ttft_window(route, attempt.model).add(
+                            (time.perf_counter() - start) * 1000
+                        )
+                    metrics.incr("llm.ttft_censored")
+                raise
+            except Exception as e:
+                self.record_failure(task, attempt.model, e)
+                raise
+        self.record(task, attempt.model, (time.perf_counter() - start) * 1000)
+        return "".join(parts)
+
+    def _start_attempt(
+        self,
+        client: AsyncAnthropic,
+        task: str,
+        model: str,
+        priority: Priority,
+        kwargs: dict[str, Any],
+    ) -> _Attempt:
+        attempt = _Attempt(model)
+        attempt.task = asyncio.create_task(
+            self._stream_attempt(client, task, attempt, priority, kwargs)
+        )
+
+        # Signal from a done-callback so a racing waiter always sees the
+        # finished task (and can tell a failure from a win)
+        def _done(_: asyncio.Task) -> None:
+            attempt.started.set()
+            attempt.signal.set()
+
+        attempt.task.add_done_callback(_done)
+        return attempt
+
+    @staticmethod
+    async def _race(attempts: list[_Attempt], timeout: float | None) -> _Attempt | None:
+        """First attempt to produce a token (or finish cleanly); None on timeout / all failed."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            live = [a for a in attempts if not a.failed]
+            if not live:
+                return None
+            for a in live:
+                if a.signal.is_set():
+                    return a
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return None
+            waiters = [asyncio.ensure_future(a.signal.wait()) for a in live]
+            try:
+                done, _ = await asyncio.wait(
+                    waiters, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                for w in waiters:
+                    w.cancel()
+            if not done:
+                return None
+
+    async def stream_text(
+        self,
+        client: AsyncAnthropic,
+        task: str,
+        hedge: bool = False,
+        priority: Priority | None = None,
+        **kwargs: Any,
+    ) -> str:
+        """Stream a call on the routed model and return its text, optionally hedged.
+
+        With ``hedge``, a second request is fired when the first token takes
+        longer than ``hedge_delay_s`` after the request left the outbound
+        queue; the first to produce a token wins and the other is cancelled.
+        Failures of one attempt fall through to the other; if every attempt
+        fails with a retryable error, the call is retried once on the next
+        candidate model.
+        """
+        priority = Priority.for_task(task) if priority is None else priority
+        route = self.route_for(task)
+        model = self.pick(task)
+        attempts = [self._start_attempt(client, task, model, priority, kwargs)]
+        hedged: _Attempt | None = None
+        try:
+            # Time spent queued behind the outbound limiter is not provider
+            # latency, and hedging it would only deepen the queue
+            await attempts[0].started.wait()
+            winner = await self._race(attempts, self.hedge_delay_s(task, model) if hedge else None)
+            if winner is None and hedge:
+                hedge_model = model
+                if config.llm_hedge_model == "fallback":
+                    hedge_model = next((m for m in self.candidates(task) if m != model), model)
+                hedged = self._start_attempt(client, task, hedge_model, priority, kwargs)
+                attempts.append(hedged)
+                with self._lock:
+                    self._hedges[route] = self._hedges.get(route, 0) + 1
+                metrics.incr("llm.hedges")
+                logger.debug("Hedging %s: %s -> %s", task, model, hedge_model)
+                winner = await self._race(attempts, None)
+
+            if winner is None:
+                # Every attempt failed: like ``create``, retry once on the next
+                # candidate if all errors were retryable, else surface the primary's
+                errors = [
+                    None if a.task is None or a.task.cancelled() else a.task.exception()
+                    for a in attempts
+                ]
+                tried = {a.model for a in attempts}
+                fallback = next((m for m in self.candidates(task) if m not in tried), None)
+                assert attempts[0].task is not None
+                if fallback is None or not all(e is not None and _is_retryable(e) for e in errors):
+                    return await attempts[0].task
+                logger.warning(
+                    "Model %s failed for %s (%s), retrying on %s", model, task, errors[0], fallback
+                )
+                metrics.incr(f"models.{route}.retries")
+                retry = self._start_attempt(client, task, fallback, priority, kwargs)
+                attempts.append(retry)
+                assert retry.task is not None
+                return await retry.task
+
+            for a in attempts:
+                if a is not winner and a.task is not None:
+                    a.task.cancel()
+            if winner is hedged:
+                with self._lock:
+                    self._hedge_wins[route] = self._hedge_wins.get(route, 0) + 1
+                metrics.incr("llm.hedge_wins")
+            assert winner.task is not None
+            return await winner.task
+        finally:
+            for a in attempts:
+                if a.task is not None and not a.task.done():
+                    a.task.cancel()
+
+    # ---- Stats ----
+
+    def stats(self) -> dict[str, Any]:
+        out: dict[str, Any] = {}
+        with self._lock:
+            for route, models in self.routes.items():
+                per_model = {}
+                for model in models:
+                    window = self._window(route, model)
+                    p, n = window.percentile(self.percentile)
+                    per_model[model] = {
+                        # None while empty or when failures dominate the percentile
+                        f"p{int(self.percentile)}_ms": (
+                            round(p, 1) if p is not None and p != float("inf") else None
+                        ),
+                        "samples": n,
+                        "calls": window.calls,
+                        "errors": window.errors,
+                        "picks": self._picks.get((route, model), 0),
+                        "within_budget": self._within_budget(route, model),
+                    }
+                    ttft, _ = self._ttft_window(route, model).percentile(
+                        config.llm_hedge_percentile
+                    )
+                    if ttft is not None:
+                        per_model[model][f"ttft_p{int(config.llm_hedge_percentile)}_ms"] = round(
+                            ttft, 1
+                        )
+                out[route] = {
+                    "budget_ms": self.budget_ms(route),
+                    "current": self._last_choice.get(route, models[0]),
+                    "fallbacks": self._fallbacks.get(route, 0),
+                    "hedges": self._hedges.get(route, 0),
+                    "hedge_wins": self._hedge_wins.get(route, 0),
+                    "models": per_model,
+                }
+        return out
+
+
+_router: ModelRouter | None = None
+
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide model router (created from config on first use)."""
+    global _router
+    if _router is None:
+        _router = ModelRouter(
+            parse_routes(config.model_routes),
+            parse_budgets(config.model_latency_budgets_ms),
+            window_s=config.model_latency_window_s,
+        )
+        metrics.register_provider("models", _router.stats)
+    return _router
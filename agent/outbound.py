@@ -0,0 +1,254 @@
+"""Process-wide outbound rate and concurrency control per API provider.
+
+Every pipeline calls Claude and Cartesia on its own cadence; without
+coordination many concurrent sessions hit provider rate limits together and
+then all stall on 429 retries. ``OutboundLimiter`` is shared by every caller
+of one provider and combines:
+
+* a token bucket (requests per second, with a burst allowance),
+* a concurrency cap (requests in flight),
+* a priority queue -- viewer questions first, then periodic commentary, then
+  onboarding, then background work (precompute) -- so a question never waits
+  behind a queue of commentary lines.
+
+Queue wait is tracked per priority class. ``cadence_factor()`` turns recent
+commentary queue wait into a multiplier that pipelines apply to their
+commentary cooldown, so sessions speak less often instead of piling up when a
+provider is saturated.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import enum
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from agent import metrics
+from agent.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(enum.IntEnum):
+    """Outbound request classes, most urgent first."""
+
+    QUESTION = 0
+    COMMENTARY = 1
+    ONBOARDING = 2
+    BACKGROUND = 3
+
+    @classmethod
+    def for_task(cls, task: str) -> Priority:
+        """Priority of a model-router task name ("question", "commentary.danny", ...)."""
+        head = task.split(".", 1)[0]
+        if head == "question":
+            return cls.QUESTION
+        if head == "commentary":
+            return cls.COMMENTARY
+        return cls.ONBOARDING
+
+
+class OutboundLimiter:
+    """Token bucket + concurrency cap + priority queue for one provider.
+
+    Args:
+        name: Provider name (used in metrics).
+        rate_per_s: Sustained requests per second (0 = no rate limit).
+        burst: Bucket size: requests that may start back to back.
+        max_concurrency: Requests in flight at once (0 = unlimited).
+        window_s: Age after which queue-wait samples are forgotten.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate_per_s: float,
+        burst: int,
+        max_concurrency: int,
+        window_s: float = 30.0,
+    ) -> None:
+        self.name = name
+        self.rate_per_s = rate_per_s
+        self.burst = max(1, burst)
+        self.max_concurrency = max_concurrency
+        self.window_s = window_s
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+        self._waits: dict[Priority, deque[tuple[float, float]]] = {p: deque() for p in Priority}
+        self._granted: dict[Priority, int] = {p: 0 for p in Priority}
+        self._wait_total_s: dict[Priority, float] = {p: 0.0 for p in Priority}
+        self._rate_limited = 0
+
+    # ---- Bucket ----
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate_per_s > 0:
+            elapsed = now - self._refilled_at
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate_per_s)
+        self._refilled_at = now
+
+    def _can_start(self) -> bool:
+        if self.max_concurrency > 0 and self._in_flight >= self.max_concurrency:
+            return False
+        return self.rate_per_s <= 0 or self._tokens >= 1
+
+    def _dispatch(self) -> None:
+        """Grant queued waiters, most urgent first, while capacity allows."""
+        self._refill()
+        while self._waiters and self._can_start():
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():  # waiter was cancelled
+                continue
+            if self.rate_per_s > 0:
+                self._tokens -= 1
+            self._in_flight += 1
+            future.set_result(None)
+
+        # Out of tokens (not slots): come back when the next token is due
+        if (
+            self._waiters
+            and self.rate_per_s > 0
+            and self._tokens < 1
+            and self._wakeup is None
+            and (self.max_concurrency <= 0 or self._in_flight < self.max_concurrency)
+        ):
+            delay = (1 - self._tokens) / self.rate_per_s
+            self._wakeup = asyncio.get_running_loop().call_later(delay, self._on_wakeup)
+
+    def _on_wakeup(self) -> None:
+        self._wakeup = None
+        self._dispatch()
+
+    # ---- Acquire / release ----
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority) -> AsyncIterator[None]:
+        """Hold one request slot of ``priority`` for the duration of the block."""
+        start = time.monotonic()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled: give the slot back
+                self._release()
+            else:
+                future.cancel()
+            raise
+
+        waited = time.monotonic() - start
+        self._granted[priority] += 1
+        self._wait_total_s[priority] += waited
+        self._waits[priority].append((time.monotonic(), waited))
+        metrics.incr(f"outbound.{self.name}.{priority.name.lower()}")
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    def note_rate_limited(self) -> None:
+        """The provider answered 429: empty the bucket so callers back off."""
+        self._rate_limited += 1
+        self._tokens = 0.0
+        metrics.incr(f"outbound.{self.name}.rate_limited")
+
+    # ---- Saturation ----
+
+    def _recent_waits(self, priority: Priority) -> list[float]:
+        samples = self._waits[priority]
+        cutoff = time.monotonic() - self.window_s
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return [w for _, w in samples]
+
+    def cadence_factor(self) -> float:
+        """Commentary cooldown multiplier (1.0 = unsaturated, up to the configured max).
+
+        Grows with the mean recent queue wait of commentary requests relative
+        to ``outbound_stretch_wait_s``.
+        """
+        waits = self._recent_waits(Priority.COMMENTARY)
+        mean_wait = sum(waits) / len(waits) if waits else 0.0
+        factor = 1.0 + mean_wait / max(config.outbound_stretch_wait_s, 1e-3)
+        return min(config.outbound_stretch_max, factor)
+
+    def stats(self) -> dict[str, Any]:
+        self._refill()
+        per_class: dict[str, Any] = {}
+        for priority in Priority:
+            waits = sorted(self._recent_waits(priority))
+            granted = self._granted[priority]
+            per_class[priority.name.lower()] = {
+                "granted": granted,
+                "avg_wait_ms": (
+                    round(self._wait_total_s[priority] / granted * 1000, 1) if granted else None
+                ),
+                "recent_p95_wait_ms": (
+                    round(waits[min(len(waits) - 1, int(0.95 * (len(waits) - 1)))] * 1000, 1)
+                    if waits
+                    else None
+                ),
+            }
+        return {
+            "rate_per_s": self.rate_per_s,
+            "burst": self.burst,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "queued": sum(1 for _, _, f in self._waiters if not f.done()),
+            "tokens": round(self._tokens, 2),
+            "rate_limited": self._rate_limited,
+            "cadence_factor": round(self.cadence_factor(), 2),
+            "classes": per_class,
+        }
+
+
+_limiters: dict[str, OutboundLimiter] = {}
+
+
+def get_limiter(provider: str) -> OutboundLimiter:
+    """Return the process-wide limiter for "anthropic" or "cartesia"."""
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        if provider == "anthropic":
+            limiter = OutboundLimiter(
+                provider,
+                config.anthropic_rate_per_s,
+                config.anthropic_burst,
+                config.anthropic_max_concurrency,
+            )
+        else:
+            limiter = OutboundLimiter(
+                provider,
+                config.cartesia_rate_per_s,
+                config.cartesia_burst,
+                config.cartesia_max_concurrency,
+            )
+        _limiters[provider] = limiter
+        metrics.register_provider(f"outbound.{provider}", limiter.stats)
+    return limiter
+
+
+def cadence_factor() -> float:
+    """Largest cadence stretch across providers (1.0 when none is saturated)."""
+    return max(
+        (get_limiter(p).cadence_factor() for p in ("anthropic", "cartesia")),
+        default=1.0,
+    )
@@ -3,8 +3,10 @@
 Provides a ``BaseCommentaryPipeline`` with all shared detection, LLM, and TTS
 logic, plus two concrete subclasses:
 
-* ``CommentaryPipeline`` -- reads an MP4 file via VideoFileTrack.
+* ``CommentaryPipeline`` -- decodes an MP4 file via ``FileFrameSource``.
 * ``LiveCommentaryPipeline`` -- accepts live JPEG frames pushed externally.
+* ``PrecomputePipeline`` -- generates a timestamped script for a chunk of an
+  MP4 ahead of playback (see ``agent.precompute``).
 """
 
 from __future__ import annotations
@@ -15,23 +17,34 @@ import io
 import logging
 import random
 import re
+import struct
 import time
-from concurrent.futures import ThreadPoolExecutor
+import uuid
+from collections.abc import AsyncIterator, Callable
 from pathlib import Path
 from typing import Any
 
-import av
 import numpy as np
 import supervision as sv
 from anthropic import AsyncAnthropic
 from cartesia import AsyncCartesia
 from fastapi import WebSocket, WebSocketDisconnect
 from PIL import Image
-from vision_agents.core.utils.video_track import VideoFileTrack
 
+from agent import metrics
+from agent.audio_profiles import AudioProfile, audio_stats, default_profile, resolve_profile
 from agent.config import config
+from agent.detection_timeline import DetectionTimeline
+from agent.frame_source import FileFrameSource, PlaybackPacer
+from agent.model_router import get_model_router
+from agent.outbound import Priority, cadence_factor, get_limiter
+from agent.processors.adaptive_resolution import ResolutionController, parse_resolutions
+from agent.processors.detector_service import DetectorService, get_detector
 from agent.processors.events import DetectedObject
+from agent.tts_stream import CartesiaTTSWebSocket, tts_latency
 from agent.user_profile import UserProfile
+from agent.video_download import is_downloading
+from agent.viewer_speech import ViewerSpeech, normalize_question
 
 logger = logging.getLogger(__name__)
 
@@ -142,20 +155,84 @@ ANALYSTS = _build_analysts("soccer")
 # Emotion tag pattern for stripping from TTS text
 _EMOTION_RE = re.compile(r"\[EMOTION:\w+\]\s*")
 
-# Thread pool for blocking model inference
-_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rfdetr")
+# Classes the commentary pipelines care about
+_TRACKED_CLASSES = {"person", "sports ball"}
+
+# Binary /ws/live frames starting with this are viewer microphone audio:
+# magic, uint32 LE sample rate, then 16-bit LE mono PCM. (JPEG frames start FF D8.)
+VIEWER_AUDIO_MAGIC = b"PCM1"
+_VIEWER_AUDIO_HEADER = struct.Struct("<4sI")
+
+
+_global_resolution_ctl: ResolutionController | None = None
+
+
+def _make_resolution_controller() -> ResolutionController | None:
+    """Create (or share, in global scope) the adaptive-resolution controller."""
+    global _global_resolution_ctl
+
+    if not config.adaptive_resolution:
+        return None
+
+    resolutions = parse_resolutions(config.detection_resolutions)
+    budget_ms = 1000.0 / config.detection_fps
+
+    if config.adaptive_resolution_scope == "global":
+        if _global_resolution_ctl is None:
+            _global_resolution_ctl = ResolutionController(resolutions, budget_ms)
+            metrics.register_provider("detection.global", _global_resolution_ctl.stats)
+        return _global_resolution_ctl
+    return ResolutionController(resolutions, budget_ms)
+
+
+def _jpeg_b64(img: np.ndarray, quality: int = 50) -> str:
+    """Encode an RGB24 array as a base64 JPEG string."""
+    buf = io.BytesIO()
+    Image.fromarray(img).save(buf, format="JPEG", quality=quality)
+    return base64.b64encode(buf.getvalue()).decode()
+
+
+class StaleCommentary(Exception):
+    """A commentary job missed its playback deadline.
+
+    Args:
+        after_tts: True if TTS had already been paid for when it went stale.
+    """
+
+    def __init__(self, after_tts: bool = False) -> None:
+        super().__init__("commentary missed its playback deadline")
+        self.after_tts = after_tts
 
 
 class Debouncer:
-    """Simple time-based debouncer."""
+    """Simple time-based debouncer.
+
+    Args:
+        interval: Minimum seconds between truthy evaluations.
+        clock: Time source (wall clock by default; precompute passes video time).
+        stretch: Optional multiplier applied to ``interval`` on each evaluation
+            (live pipelines pass the outbound limiter's cadence factor).
+    """
 
-    def __init__(self, interval: float) -> None:
+    def __init__(
+        self,
+        interval: float,
+        clock: Callable[[], float] = time.monotonic,
+        stretch: Callable[[], float] | None = None,
+    ) -> None:
         self._interval = interval
-        self._last_time = 0.0
+        self._clock = clock
+        self._stretch = stretch
+        self._last_time = float("-inf")
+
+    @property
+    def interval(self) -> float:
+        """Current interval, including any stretch."""
+        return self._interval * (self._stretch() if self._stretch is not None else 1.0)
 
     def __bool__(self) -> bool:
-        now = time.monotonic()
-        if (now - self._last_time) >= self._interval:
+        now = self._clock()
+        if (now - self._last_time) >= self.interval:
             self._last_time = now
             return True
         return False
@@ -164,19 +241,31 @@ class Debouncer:
 class BaseCommentaryPipeline:
     """Shared detection, LLM commentary, and TTS logic.
 
-    Subclasses provide the frame source (file or live).  This base class owns
-    the RF-DETR model reference, API clients, ball-tracking state, debouncing,
-    and all commentary generation / TTS synthesis methods.
+    Subclasses provide the frame source (file or live).  This base class holds
+    a reference on the shared detector service, the API clients, ball-tracking
+    state, debouncing, and all commentary generation / TTS synthesis methods.
 
     Args:
-        ws: WebSocket connection to stream results to the frontend.
+        ws: WebSocket connection to stream results to the frontend. None for
+            offline use (e.g. precompute), where results are returned instead.
+        profile: Optional user profile for personalized commentary.
+        sport: "soccer" or "football".
+        session_id: Identifier used for logging and per-session metrics.
     """
 
+    # Commentary goes stale within seconds: eligible for LLM request hedging
+    _latency_sensitive = True
+
     def __init__(
-        self, ws: WebSocket, profile: UserProfile | None = None, sport: str = "soccer"
+        self,
+        ws: WebSocket | None,
+        profile: UserProfile | None = None,
+        sport: str = "soccer",
+        session_id: str | None = None,
     ) -> None:
         self.ws = ws
         self._running = False
+        self.session_id = session_id or uuid.uuid4().hex[:8]
 
         # Sport type (soccer or football)
         self._sport: str = sport if sport in SUPPORTED_SPORTS else "soccer"
@@ -191,10 +280,20 @@ class BaseCommentaryPipeline:
         # User profile for personalized commentary
         self._profile: UserProfile = profile or UserProfile()
 
-        # RF-DETR model (loaded via _load_model)
-        self._model: Any = None
+        # Shared RF-DETR detector service (acquired via _load_model)
+        self._detector: DetectorService | None = None
         self._class_name_map: dict[int, str] = {}
 
+        # Adaptive input resolution (None when disabled)
+        self._resolution_ctl = _make_resolution_controller()
+        self._model_resolution: int | None = None
+        self._switch_task: asyncio.Task | None = None
+        self._last_inference_ms = 0.0
+        self._last_raw_detections: sv.Detections | None = None
+        self._last_raw_resolution: int | None = None  # model resolution that produced them
+        if self._resolution_ctl is not None and config.adaptive_resolution_scope != "global":
+            metrics.register_provider(f"detection.{self.session_id}", self._resolution_ctl.stats)
+
         # Annotation helpers
         self._box_annotator = sv.BoxAnnotator(thickness=2)
         self._label_annotator = sv.LabelAnnotator(text_scale=0.5, text_thickness=1)
@@ -202,6 +301,12 @@ class BaseCommentaryPipeline:
         # API clients
         self._anthropic = AsyncAnthropic(api_key=config.anthropic_api_key)
         self._cartesia = AsyncCartesia(api_key=config.cartesia_api_key)
+        # Persistent TTS websocket for live sessions (HTTP remains the fallback)
+        self._tts_ws: CartesiaTTSWebSocket | None = None
+        if config.tts_websocket and self._latency_sensitive:
+            self._tts_ws = CartesiaTTSWebSocket(config.cartesia_api_key, session_id=self.session_id)
+        # Audio profile (mp3 / mp3_low / pcm / opus), negotiated by the client
+        self._audio_profile: AudioProfile = default_profile()
 
         # Ball tracking state
         self._ball_was_present = False
@@ -221,10 +326,18 @@ class BaseCommentaryPipeline:
         self._current_frame_b64: str | None = None
 
         # Debouncer
-        self._debouncer = Debouncer(config.commentary_cooldown)
+        # Cooldown stretches while Claude / Cartesia requests are queueing
+        self._debouncer = Debouncer(config.commentary_cooldown, stretch=cadence_factor)
 
         # Frame capture timestamp from the frontend (for sync with delayed playback)
         self._last_frame_ts: float = 0.0
+        # When that timestamp reached us (monotonic); None until a client reports one.
+        # A clip about that frame must be sent within the client's playback delay.
+        self._last_frame_arrival: float | None = None
+        self._playback_delay_s = config.pipeline_delay_ms / 1000
+        self._tts_estimate_s = 0.5  # EWMA of TTS duration, used to predict misses
+        # When the pending viewer question was heard (question -> answer latency)
+        self._question_asked_at: float | None = None
 
         # Frame counter for debug logging
         self._frame_count = 0
@@ -237,6 +350,11 @@ class BaseCommentaryPipeline:
         self._last_analyst: str = "danny"
         self._last_scene: str = "transition"
 
+        # At most one commentary job (LLM + TTS + send) per session; bumping the
+        # generation invalidates any job that has not been sent yet
+        self._commentary_task: asyncio.Task | None = None
+        self._generation = 0
+
     def set_profile(self, profile: UserProfile) -> None:
         """Update the user profile (can be called mid-session)."""
         self._profile = profile
@@ -247,6 +365,44 @@ class BaseCommentaryPipeline:
             profile.hot_take_slider,
         )
 
+    def set_frame_ts(self, ts: float) -> None:
+        """Record the capture timestamp of the frame about to arrive (client clock)."""
+        self._last_frame_ts = ts
+        self._last_frame_arrival = time.monotonic()
+
+    def set_playback_delay(self, delay_ms: float) -> None:
+        """Update how far behind capture the client plays the video (PIPELINE_DELAY_MS)."""
+        self._playback_delay_s = max(0.0, delay_ms / 1000)
+        logger.info("[%s] Playback delay set to %.0f ms", self.session_id, delay_ms)
+
+    async def set_audio_profile(self, name: str | None) -> AudioProfile:
+        """Switch this session's audio profile and confirm it to the client.
+
+        Unknown names get the default profile; the ``audio_profile`` reply
+        tells the client which one (and which format) it will actually receive.
+        """
+        profile = self._audio_profile = resolve_profile(name)
+        logger.info("[%s] Audio profile: %s", self.session_id, profile.name)
+        if self.ws is not None:
+            try:
+                await self.ws.send_json(
+                    {
+                        "type": "audio_profile",
+                        "profile": profile.name,
+                        "format": profile.format,
+                        "mime": profile.mime,
+                    }
+                )
+            except WebSocketDisconnect:
+                self._running = False
+        return profile
+
+    def _deadline_for(self, arrival: float | None) -> float | None:
+        """Monotonic time by which a clip about a frame that arrived at ``arrival`` must be sent."""
+        if arrival is None or self._playback_delay_s <= 0:
+            return None
+        return arrival + self._playback_delay_s - config.commentary_deadline_margin_ms / 1000
+
     def set_sport(self, sport: str) -> None:
         """Switch sport mid-session (reconfigures instructions and prompts)."""
         if sport not in SUPPORTED_SPORTS:
@@ -300,28 +456,84 @@ class BaseCommentaryPipeline:
     # ---- Model loading ----
 
     async def _load_model(self) -> None:
-        """Load (or retrieve from cache) the RF-DETR model."""
+        """Acquire the shared detector and make sure the model is loaded."""
         await self._send_status("Loading RF-DETR model...")
-        cached = await get_or_load_model()
-        self._model = cached["model"]
+        detector = get_detector()
+        detector.acquire(self.session_id)
+        resolution = self._resolution_ctl.resolution if self._resolution_ctl else None
+        try:
+            cached = await detector.load(resolution)
+        except BaseException:
+            # stop() only releases a detector that was assigned
+            detector.release(self.session_id)
+            raise
+        self._detector = detector
         self._class_name_map = cached["class_name_map"]
+        self._model_resolution = resolution
         await self._send_status("Model loaded. Starting commentary...")
 
+    async def _switch_resolution(self, resolution: int | None) -> None:
+        """Swap in the model variant for a new input resolution (runs in background).
+
+        Inference keeps using the current model until the new one is loaded
+        (on the detector's loader thread, usually already preloaded).
+        If a smaller variant can't be loaded, the controller is capped below
+        it; if a larger one can't, it goes back to the level still loaded.
+        """
+        if self._detector is None:
+            return
+        try:
+            await self._detector.load(resolution)
+        except Exception:
+            logger.exception("Could not load RF-DETR at %spx", resolution)
+            ctl = self._resolution_ctl
+            if ctl is not None:
+                # The controller may have moved during the load: use the
+                # levels of the failed and the loaded variants, not its level
+                failed = ctl.levels.index(resolution)
+                loaded = ctl.levels.index(self._model_resolution)
+                if failed > loaded:
+                    ctl.cap_level(failed - 1)
+                else:
+                    ctl.set_level(loaded)
+            return
+        self._model_resolution = resolution
+
     # ---- Detection ----
 
-    async def _detect_from_array(self, img: np.ndarray) -> list[DetectedObject]:
-        """Run RF-DETR on an RGB24 numpy array, return detected objects."""
-        if self._model is None:
+    async def _detect_from_array(
+        self, img: np.ndarray, cached: sv.Detections | None = None
+    ) -> list[DetectedObject]:
+        """Run RF-DETR on an RGB24 numpy array, return detected objects.
+
+        Args:
+            img: RGB24 frame.
+            cached: Detections for this frame from the detection timeline; when
+                given, inference is skipped and only annotation/filtering runs.
+        """
+        if self._detector is None:
             return []
 
         self._frame_count += 1
         self._frame_h, self._frame_w = img.shape[:2]
-        loop = asyncio.get_running_loop()
 
-        raw_detections: sv.Detections = await loop.run_in_executor(
-            _executor,
-            lambda: self._model.predict(img, threshold=config.detection_confidence),
-        )
+        ctl = self._resolution_ctl
+        resolution = self._model_resolution
+        if cached is not None:
+            raw_detections, self._last_inference_ms = cached, 0.0
+        else:
+            raw_detections, self._last_inference_ms = await self._detector.predict(
+                img, threshold=config.detection_confidence, resolution=resolution
+            )
+
+            # Adapt input resolution to the measured latency
+            if ctl is not None:
+                ctl.record(self._last_inference_ms)
+                switching = self._switch_task is not None and not self._switch_task.done()
+                if ctl.resolution != self._model_resolution and not switching:
+                    self._switch_task = asyncio.create_task(self._switch_resolution(ctl.resolution))
+        self._last_raw_detections = raw_detections
+        self._last_raw_resolution = resolution
 
         # Annotate frame with all detections (before filtering)
         self._annotate_frame(img, raw_detections)
@@ -330,7 +542,7 @@ class BaseCommentaryPipeline:
         self._current_frame_b64 = self._last_annotated_frame
 
         # Filter to person + sports ball
-        detections = self._filter_detections(raw_detections)
+        detections = self._detector.filter(raw_detections, _TRACKED_CLASSES)
         objects = self._build_objects(detections)
 
         # Debug logging every 25 frames (~5s at 5 FPS)
@@ -347,7 +559,7 @@ class BaseCommentaryPipeline:
             )
 
         # Send annotated frame to frontend every 10 frames (~2s) for debug overlay
-        if self._frame_count % 10 == 0 and self._last_annotated_frame:
+        if self.ws is not None and self._frame_count % 10 == 0 and self._last_annotated_frame:
             try:
                 await self.ws.send_json(
                     {
@@ -355,6 +567,9 @@ class BaseCommentaryPipeline:
                         "annotated_frame": self._last_annotated_frame,
                         "person_count": sum(1 for o in objects if o["label"] == "person"),
                         "ball_count": sum(1 for o in objects if o["label"] == "sports ball"),
+                        "inference_ms": round(self._last_inference_ms, 1),
+                        "resolution": self._model_resolution or "native",
+                        "resolution_level": ctl.level if ctl is not None else 0,
                     }
                 )
             except WebSocketDisconnect:
@@ -375,27 +590,10 @@ class BaseCommentaryPipeline:
             if labels:
                 annotated = self._label_annotator.annotate(annotated, detections, labels=labels)
 
-            pil_img = Image.fromarray(annotated)
-            buf = io.BytesIO()
-            pil_img.save(buf, format="JPEG", quality=50)
-            self._last_annotated_frame = base64.b64encode(buf.getvalue()).decode()
+            self._last_annotated_frame = _jpeg_b64(annotated)
         except Exception:
             logger.exception("Error annotating frame")
 
-    def _filter_detections(self, detections: sv.Detections) -> sv.Detections:
-        """Keep only person and sports ball."""
-        if detections.class_id is None:
-            return detections
-
-        allowed = {"person", "sports ball"}
-        allowed_ids: set[int] = set()
-        for cid, cname in self._class_name_map.items():
-            if cname in allowed:
-                allowed_ids.add(cid)
-
-        mask = np.array([cid in allowed_ids for cid in detections.class_id])
-        return detections[mask]
-
     def _build_objects(self, detections: sv.Detections) -> list[DetectedObject]:
         """Convert supervision Detections to DetectedObject list."""
         objects: list[DetectedObject] = []
@@ -566,7 +764,8 @@ class BaseCommentaryPipeline:
         self._last_scene = self._classify_scene(objects)
 
         # Timer-based: when debouncer allows, commentate regardless of detection
-        if self._debouncer:
+        # (the busy check comes first so a skipped slot doesn't reset the cooldown)
+        if not self._commentary_busy() and self._debouncer:
             # Snapshot frame_ts NOW before async Claude call
             snapshot_ts = self._last_frame_ts
             # Pick analyst based on scene and rotation
@@ -575,10 +774,22 @@ class BaseCommentaryPipeline:
 
             prompts = self._commentary_prompts.get(analyst_key, self._commentary_prompts["danny"])
             prompt = random.choice(prompts)
-            await self._commentate(
+            await self._emit_commentary(
                 f"{det_context} {prompt}", analyst_key=analyst_key, frame_ts=snapshot_ts
             )
 
+    async def _emit_commentary(self, prompt: str, analyst_key: str, frame_ts: float) -> None:
+        """Produce periodic commentary (inline here; the live pipeline runs it as a task)."""
+        await self._commentate(prompt, analyst_key=analyst_key, frame_ts=frame_ts)
+
+    def _frame_only_prompt(self) -> tuple[str, str]:
+        """Pick an analyst and prompt for commentary without detection context."""
+        analyst_key = self._pick_analyst("active_play")
+        self._last_analyst = analyst_key
+        prompts = self._commentary_prompts.get(analyst_key, self._commentary_prompts["danny"])
+        sport_label = "American football game" if self._sport == "football" else "soccer match"
+        return analyst_key, f"You're watching a {sport_label}. {random.choice(prompts)}"
+
     # ---- LLM + TTS ----
 
     async def _commentate(
@@ -587,63 +798,82 @@ class BaseCommentaryPipeline:
         analyst_key: str = "danny",
         frame_ts: float | None = None,
         force: bool = False,
+        task: str | None = None,
+        generation: int | None = None,
+        release: asyncio.Future[bool] | None = None,
     ) -> None:
-        """Generate commentary via Claude, synthesize via Cartesia, send over WebSocket."""
-        analyst = self._analysts.get(analyst_key, self._analysts["danny"])
-        # Snapshot frame_ts NOW (before async calls overwrite _last_frame_ts)
-        captured_frame_ts = frame_ts if frame_ts is not None else self._last_frame_ts
-
+        """Generate commentary via Claude, synthesize via Cartesia, send over WebSocket.
+
+        A job started for ``generation`` is dropped if a newer job superseded it.
+        With ``release`` (a speculative answer), the finished clip is held until
+        the future resolves: True sends it, False (or no answer within
+        ``speculative_hold_ms``) discards it.
+        A job that would miss its playback deadline before TTS is retried on the
+        latest frame (up to ``commentary_stale_retries`` times) or dropped.
+        """
+        arrival = self._last_frame_arrival
+        retries_left = config.commentary_stale_retries
         try:
-            # Build prompt with recent history so Claude doesn't repeat itself
-            full_prompt = prompt
-            if self._recent_commentary and not force:
-                history = "\n".join(f"- {line}" for line in self._recent_commentary[-3:])
-                full_prompt = (
-                    f"{prompt}\n\n"
-                    f"Recent commentary from the broadcast booth (DO NOT repeat):\n{history}\n"
-                    f"Build on what your colleagues said or move the commentary forward. "
-                    f"If nothing new to add, respond with SKIP."
-                )
+            while True:
+                try:
+                    message = await self._produce_commentary(
+                        prompt,
+                        analyst_key=analyst_key,
+                        frame_ts=frame_ts,
+                        force=force,
+                        task=task,
+                        deadline=self._deadline_for(arrival),
+                    )
+                    break
+                except StaleCommentary as stale:
+                    fresher = self._last_frame_arrival is not None and (
+                        arrival is None or self._last_frame_arrival > arrival
+                    )
+                    if stale.after_tts or retries_left <= 0 or not fresher:
+                        logger.info(
+                            "[%s] Dropping stale commentary (frame_ts=%s%s)",
+                            self.session_id,
+                            frame_ts,
+                            ", after TTS" if stale.after_tts else "",
+                        )
+                        metrics.incr("commentary.stale_dropped")
+                        return
+                    retries_left -= 1
+                    arrival, frame_ts = self._last_frame_arrival, self._last_frame_ts
+                    metrics.incr("commentary.stale_retried")
+                    logger.info(
+                        "[%s] Retrying stale commentary on frame %s", self.session_id, frame_ts
+                    )
 
-            # Generate commentary text with this analyst's persona
-            text = await self._generate_commentary(full_prompt, analyst_key=analyst_key)
-            if not text:
+            if message is None:
+                return
+            if release is not None:
+                try:
+                    confirmed = await asyncio.wait_for(
+                        asyncio.shield(release), timeout=config.speculative_hold_ms / 1000
+                    )
+                except asyncio.TimeoutError:
+                    confirmed = False
+                if not confirmed:
+                    metrics.incr("question.speculative_discarded")
+                    return
+            if generation is not None and generation != self._generation:
+                metrics.incr("commentary.superseded")
+                logger.info("[%s] Dropping superseded commentary", self.session_id)
                 return
-
-            # Strip emotion tag for display and TTS
-            display_text = _EMOTION_RE.sub("", text).strip()
-
-            # Track recent commentary
-            self._recent_commentary.append(f"[{analyst['label']}] {display_text}")
-            if len(self._recent_commentary) > 5:
-                self._recent_commentary.pop(0)
-
-            # Extract emotion for Cartesia
-            emotion_match = re.match(r"\[EMOTION:(\w+)\]", text)
-            emotion = emotion_match.group(1) if emotion_match else "neutral"
-
-            # Generate TTS audio with this analyst's voice
-            voice_id = self._get_voice_id_for_analyst(analyst_key)
-            audio_bytes = await self._synthesize_speech(display_text, emotion, voice_id=voice_id)
 
             # Send text, audio, and analyst info to frontend
-            await self.ws.send_json(
-                {
-                    "type": "commentary",
-                    "text": display_text,
-                    "emotion": emotion,
-                    "analyst": analyst["label"],
-                    "audio": base64.b64encode(audio_bytes).decode() if audio_bytes else None,
-                    "annotated_frame": self._last_annotated_frame,
-                    "frame_ts": captured_frame_ts,
-                }
-            )
+            await self.ws.send_json(message)
+            if task == "question" and self._question_asked_at is not None:
+                latency_ms = (time.monotonic() - self._question_asked_at) * 1000
+                metrics.set_gauge("question.answer_latency_ms", round(latency_ms, 1))
+                self._question_asked_at = None
 
             logger.info(
                 "[%s] Commentary sent: [%s] %s",
-                analyst["label"],
-                emotion,
-                display_text[:80],
+                message["analyst"],
+                message["emotion"],
+                message["text"][:80],
             )
 
         except WebSocketDisconnect:
@@ -651,8 +881,93 @@ class BaseCommentaryPipeline:
         except Exception:
             logger.exception("Error generating commentary")
 
-    async def _generate_commentary(self, prompt: str, analyst_key: str = "danny") -> str:
-        """Call Claude with the annotated frame (multimodal) + text prompt."""
+    async def _produce_commentary(
+        self,
+        prompt: str,
+        analyst_key: str = "danny",
+        frame_ts: float | None = None,
+        force: bool = False,
+        task: str | None = None,
+        deadline: float | None = None,
+    ) -> dict[str, Any] | None:
+        """Generate one commentary line + TTS audio and return the client message.
+
+        ``task`` selects the model route (default ``commentary.<analyst_key>``).
+        Returns None when Claude has nothing to add (SKIP).
+
+        Raises:
+            StaleCommentary: ``deadline`` (monotonic) would be missed -- checked
+                before TTS (using the recent TTS duration) and again after it.
+        """
+        analyst = self._analysts.get(analyst_key, self._analysts["danny"])
+        # Snapshot frame_ts NOW (before async calls overwrite _last_frame_ts)
+        captured_frame_ts = frame_ts if frame_ts is not None else self._last_frame_ts
+
+        # Build prompt with recent history so Claude doesn't repeat itself
+        full_prompt = prompt
+        if self._recent_commentary and not force:
+            history = "\n".join(f"- {line}" for line in self._recent_commentary[-3:])
+            full_prompt = (
+                f"{prompt}\n\n"
+                f"Recent commentary from the broadcast booth (DO NOT repeat):\n{history}\n"
+                f"Build on what your colleagues said or move the commentary forward. "
+                f"If nothing new to add, respond with SKIP."
+            )
+
+        # Generate commentary text with this analyst's persona
+        task = task or f"commentary.{analyst_key}"
+        priority = Priority.for_task(task) if self._latency_sensitive else Priority.BACKGROUND
+        text = await self._generate_commentary(
+            full_prompt, analyst_key=analyst_key, task=task, priority=priority
+        )
+        if not text:
+            return None
+
+        # Strip emotion tag for display and TTS
+        display_text = _EMOTION_RE.sub("", text).strip()
+
+        # Extract emotion for Cartesia
+        emotion_match = re.match(r"\[EMOTION:(\w+)\]", text)
+        emotion = emotion_match.group(1) if emotion_match else "neutral"
+
+        # Don't pay for TTS if the clip can't reach the viewer in time
+        if deadline is not None and time.monotonic() + self._tts_estimate_s > deadline:
+            raise StaleCommentary()
+
+        # Generate TTS audio with this analyst's voice
+        voice_id = self._get_voice_id_for_analyst(analyst_key)
+        tts_start = time.monotonic()
+        audio_bytes, audio_format = await self._synthesize_speech(
+            display_text, emotion, voice_id=voice_id, priority=priority, voice_key=analyst_key
+        )
+        self._tts_estimate_s = 0.8 * self._tts_estimate_s + 0.2 * (time.monotonic() - tts_start)
+        if deadline is not None and time.monotonic() > deadline:
+            raise StaleCommentary(after_tts=True)
+
+        # Track recent commentary (only lines that are actually delivered)
+        self._recent_commentary.append(f"[{analyst['label']}] {display_text}")
+        if len(self._recent_commentary) > 5:
+            self._recent_commentary.pop(0)
+
+        return {
+            "type": "commentary",
+            "text": display_text,
+            "emotion": emotion,
+            "analyst": analyst["label"],
+            "audio": base64.b64encode(audio_bytes).decode() if audio_bytes else None,
+            "audio_format": audio_format,
+            "annotated_frame": self._last_annotated_frame,
+            "frame_ts": captured_frame_ts,
+        }
+
+    async def _generate_commentary(
+        self,
+        prompt: str,
+        analyst_key: str = "danny",
+        task: str = "commentary",
+        priority: Priority = Priority.COMMENTARY,
+    ) -> str:
+        """Call Claude (model chosen by the router for ``task``) with the frame + prompt."""
         content: list[dict[str, Any]] = []
 
         if self._current_frame_b64:
@@ -669,21 +984,29 @@ class BaseCommentaryPipeline:
 
         content.append({"type": "text", "text": prompt})
 
-        response = await self._anthropic.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=80,
-            system=self._build_system_prompt(analyst_key=analyst_key),
-            messages=[{"role": "user", "content": content}],
-        )
-        if response.content and response.content[0].type == "text":
-            text = response.content[0].text.strip()
-            # If LLM says SKIP, nothing worth commenting on
-            if text.upper() == "SKIP" or (
-                text.upper().startswith("[EMOTION") and "SKIP" in text.upper()
-            ):
+        request = {
+            "max_tokens": 80,
+            "system": self._build_system_prompt(analyst_key=analyst_key),
+            "messages": [{"role": "user", "content": content}],
+        }
+        router = get_model_router()
+        if config.llm_hedging and self._latency_sensitive:
+            text = await router.stream_text(
+                self._anthropic, task, hedge=True, priority=priority, **request
+            )
+            text = text.strip()
+        else:
+            response = await router.create(self._anthropic, task, priority=priority, **request)
+            if not response.content or response.content[0].type != "text":
                 return ""
-            return text
-        return ""
+            text = response.content[0].text.strip()
+
+        # If LLM says SKIP, nothing worth commenting on
+        if text.upper() == "SKIP" or (
+            text.upper().startswith("[EMOTION") and "SKIP" in text.upper()
+        ):
+            return ""
+        return text
 
     def _get_voice_id_for_analyst(self, analyst_key: str) -> str:
         """Get Cartesia voice ID for a specific analyst."""
@@ -696,9 +1019,22 @@ class BaseCommentaryPipeline:
         return voice_id or config.voice_id_danny
 
     async def _synthesize_speech(
-        self, text: str, emotion: str, voice_id: str | None = None
-    ) -> bytes:
-        """Generate TTS audio via Cartesia Sonic-3."""
+        self,
+        text: str,
+        emotion: str,
+        voice_id: str | None = None,
+        priority: Priority = Priority.COMMENTARY,
+        voice_key: str = "danny",
+    ) -> tuple[bytes, str]:
+        """Generate TTS audio via Cartesia Sonic-3 (within a Cartesia outbound slot).
+
+        Audio follows the session's profile. PCM-based profiles use the
+        session's TTS websocket when there is one, and the per-utterance HTTP
+        request otherwise or when the websocket fails.
+
+        Returns:
+            ``(audio_bytes, audio_format)`` with format ``"mp3"``, ``"wav"`` or ``"ogg"``.
+        """
         # Map emotion to speed adjustment
         speed_map = {
             "excited": 1.2,
@@ -712,85 +1048,239 @@ class BaseCommentaryPipeline:
 
         if not voice_id:
             voice_id = self._get_voice_id_for_analyst("danny")
-        audio_chunks: list[bytes] = []
-        response = self._cartesia.tts.bytes(
-            model_id="sonic-3",
-            transcript=text,
-            voice={"mode": "id", "id": voice_id},
-            output_format={
-                "container": "mp3",
-                "sample_rate": 44100,
-                "bit_rate": 128000,
-            },
-            language="en",
-            generation_config={"speed": speed},
+        profile = self._audio_profile
+        audio: bytes | None = None
+        async with get_limiter("cartesia").slot(priority):
+            start = time.perf_counter()
+            if self._tts_ws is not None and profile.pcm_source:
+                try:
+                    audio = await self._tts_ws.synthesize(
+                        text,
+                        voice_id,
+                        speed=speed,
+                        voice_key=voice_key,
+                        sample_rate=profile.sample_rate,
+                    )
+                except (ConnectionError, RuntimeError) as e:
+                    metrics.incr("tts.ws_fallbacks")
+                    logger.warning("[%s] TTS websocket failed, using HTTP: %s", self.session_id, e)
+
+            if audio is None:
+                start = time.perf_counter()
+                audio_chunks: list[bytes] = []
+                response = self._cartesia.tts.bytes(
+                    model_id="sonic-3",
+                    transcript=text,
+                    voice={"mode": "id", "id": voice_id},
+                    output_format=profile.output_format(),
+                    language="en",
+                    generation_config={"speed": speed},
+                )
+                async for chunk in response:
+                    if not audio_chunks:
+                        tts_latency.record("http", (time.perf_counter() - start) * 1000)
+                    audio_chunks.append(chunk)
+                audio = b"".join(audio_chunks)
+        synth_ms = (time.perf_counter() - start) * 1000
+
+        encode_start = time.perf_counter()
+        clip = await profile.encode(audio) if audio else b""
+        audio_stats.record(
+            profile.name, len(clip), synth_ms, (time.perf_counter() - encode_start) * 1000
         )
-        async for chunk in response:
-            audio_chunks.append(chunk)
-
-        return b"".join(audio_chunks)
+        return clip, profile.format
 
     # ---- Utility ----
 
     async def _send_status(self, message: str) -> None:
         """Send a status message to the frontend."""
+        if self.ws is None:
+            return
         try:
             await self.ws.send_json({"type": "status", "message": message})
         except WebSocketDisconnect:
             self._running = False
 
+    # ---- Commentary tasks ----
+
+    def _commentary_busy(self) -> bool:
+        return self._commentary_task is not None and not self._commentary_task.done()
+
+    def _start_commentary(self, prompt: str, preempt: bool = False, **kwargs: Any) -> bool:
+        """Run one commentary job in the background (at most one per session).
+
+        Periodic jobs (``preempt=False``) are skipped while a job is in flight.
+        A preempting job (a viewer question) cancels the in-flight job -- its
+        LLM call, TTS or pending send -- and takes its place.
+
+        Returns:
+            True if the job was started.
+        """
+        if self._commentary_busy():
+            if not preempt:
+                return False
+            assert self._commentary_task is not None
+            self._commentary_task.cancel()
+            metrics.incr("commentary.preempted")
+            logger.info("[%s] Preempting in-flight commentary", self.session_id)
+
+        self._generation += 1
+        self._commentary_task = asyncio.create_task(
+            self._commentate(prompt, generation=self._generation, **kwargs)
+        )
+        return True
+
     async def stop(self) -> None:
         """Signal the pipeline to stop and clean up resources."""
         self._running = False
+        if self._commentary_busy():
+            assert self._commentary_task is not None
+            self._commentary_task.cancel()
+        metrics.unregister_provider(f"detection.{self.session_id}")
+        if self._detector is not None:
+            self._detector.release(self.session_id)
+            self._detector = None
+        if self._tts_ws is not None:
+            await self._tts_ws.close()
         await self._cartesia.close()
 
 
 class CommentaryPipeline(BaseCommentaryPipeline):
-    """File-based pipeline: reads an MP4 via VideoFileTrack and runs commentary.
+    """File-based pipeline: decodes an MP4 via FileFrameSource and runs commentary.
+
+    Decoding happens on a dedicated thread that samples ``detection_fps``
+    frames per second of video and runs ahead into a bounded buffer; a
+    ``PlaybackPacer`` releases them in step with playback. Client messages are
+    handled by a separate receive task:
+
+    * ``{"type": "stop"}`` -- end the session.
+    * ``{"type": "playback", "position": s, "paused": bool}`` -- re-sync pacing.
+    * ``{"type": "set_audio_profile", "profile": name}`` -- pick the audio profile.
+
+    Detections are read from / written to a ``DetectionTimeline`` next to the
+    MP4 (one per model input resolution), so later sessions of the same video
+    skip inference.
 
     Args:
         ws: WebSocket connection to stream results to the frontend.
-        video_path: Path to the downloaded MP4 file.
+        video_path: Path to the downloaded MP4 file (or its analysis proxy).
+        profile: Optional user profile for personalized commentary.
+        sport: "soccer" or "football".
+        skip_detection: Skip RF-DETR and send sampled frames straight to Claude
+            (used when the server admits the session in degraded mode).
+        session_id: Identifier used for logging and per-session metrics.
+        video_id: Id of the downloaded video (defaults to the file name up to
+            the first dot, which covers ``<id>.mp4`` and ``<id>.proxy.mp4``).
     """
 
-    def __init__(self, ws: WebSocket, video_path: Path) -> None:
-        super().__init__(ws)
+    def __init__(
+        self,
+        ws: WebSocket,
+        video_path: Path,
+        profile: UserProfile | None = None,
+        sport: str = "soccer",
+        skip_detection: bool = False,
+        session_id: str | None = None,
+        video_id: str | None = None,
+    ) -> None:
+        super().__init__(ws, profile=profile, sport=sport, session_id=session_id)
         self.video_path = video_path
+        self.video_id = video_id or video_path.name.split(".", 1)[0]
+        self._skip_detection = skip_detection
+        self._source: FileFrameSource | None = None
+        # Detection timelines by model input resolution (opened on first use)
+        self._timelines: dict[int | None, DetectionTimeline] = {}
+        self._pacer = PlaybackPacer(lead_s=config.analysis_lead_s)
+
+    async def _receive_loop(self) -> None:
+        """Handle client control messages until stop or disconnect."""
+        try:
+            while self._running:
+                msg = await self.ws.receive_json()
+                msg_type = msg.get("type")
+                if msg_type == "stop":
+                    logger.info("Client requested stop")
+                    break
+                elif msg_type == "playback":
+                    position = float(msg.get("position", 0.0))
+                    jumped = self._pacer.sync(position, paused=bool(msg.get("paused", False)))
+                    if jumped and self._source is not None:
+                        # Viewer seeked: restart decoding there instead of
+                        # working through (or waiting on) the old position
+                        self._source.seek(position)
+                elif msg_type == "set_audio_profile":
+                    await self.set_audio_profile(msg.get("profile"))
+        except WebSocketDisconnect:
+            logger.info("WebSocket disconnected")
+        except Exception:
+            logger.exception("Error receiving client message")
+        finally:
+            self._halt()
+
+    def _halt(self) -> None:
+        """Stop the main loop: unblock decoding and pacing waits."""
+        self._running = False
+        if self._source is not None:
+            self._source.stop()
+        self._pacer.release()
 
     async def run(self) -> None:
-        """Main loop: warm up model, read frames, detect, commentate."""
+        """Main loop: warm up model, read sampled frames, detect, commentate."""
         self._running = True
+        receiver = asyncio.create_task(self._receive_loop())
 
         try:
-            await self._load_model()
-
-            # Open video file
-            track = await asyncio.to_thread(
-                VideoFileTrack, str(self.video_path), fps=config.detection_fps
+            if self._skip_detection:
+                await self._send_status("Starting commentary (detection off)...")
+            else:
+                await self._load_model()
+
+            self._source = FileFrameSource(
+                self.video_path,
+                # Without detection only the frame Claude sees matters: one per second
+                fps=1.0 if self._skip_detection else config.detection_fps,
+                max_width=config.analysis_max_width,
+                buffer_size=config.decode_buffer_frames,
+                growing=lambda: is_downloading(self.video_path.stem, self.video_path.parent),
             )
+            self._source.start()
+            self._pacer.start()
 
             while self._running:
-                try:
-                    frame = await track.recv()
-                except Exception:
-                    logger.info("Video track ended or errored")
+                frame = await self._source.get()
+                if frame is None:
+                    logger.info("Video ended")
                     break
 
-                # Check if client disconnected
-                try:
-                    # Non-blocking check for incoming messages (e.g. pause/stop)
-                    msg = await asyncio.wait_for(self.ws.receive_json(), timeout=0.01)
-                    if msg.get("type") == "stop":
-                        logger.info("Client requested stop")
-                        break
-                except asyncio.TimeoutError:
-                    pass
-                except WebSocketDisconnect:
-                    logger.info("WebSocket disconnected")
+                due = await self._pacer.wait_until(frame.pts)
+                if not self._running:
                     break
-
-                # Run detection on the frame
-                objects = await self._detect_from_array(frame.to_ndarray(format="rgb24"))
+                if not due:
+                    continue  # decoded before a seek
+                self._last_frame_ts = frame.pts
+
+                if self._skip_detection:
+                    self._frame_count += 1
+                    if self._debouncer:
+                        self._current_frame_b64 = _jpeg_b64(frame.image)
+                        analyst_key, prompt = self._frame_only_prompt()
+                        await self._commentate(prompt, analyst_key=analyst_key, frame_ts=frame.pts)
+                    continue
+
+                # Run detection on the (already scaled) frame, or reuse the timeline
+                h, w = frame.image.shape[:2]
+                timeline = await self._timeline_for(self._model_resolution)
+                cached = None
+                if timeline is not None and timeline.resolution == self._model_resolution:
+                    cached = timeline.lookup(frame.index, w, h)
+                objects = await self._detect_from_array(frame.image, cached=cached)
+                if cached is None and self._last_raw_detections is not None:
+                    # Filed under the resolution inference actually ran at
+                    recorded = await self._timeline_for(self._last_raw_resolution)
+                    if recorded is not None:
+                        recorded.record(
+                            frame.index, self._last_raw_detections, w, h, self._class_name_map
+                        )
 
                 # Ball tracking + commentary
                 await self._handle_detections(objects)
@@ -802,10 +1292,51 @@ class CommentaryPipeline(BaseCommentaryPipeline):
         except Exception:
             logger.exception("Pipeline error")
         finally:
-            self._running = False
+            self._halt()
+            receiver.cancel()
+            if self._timelines:
+                await asyncio.to_thread(self._flush_timelines)
             await self._cartesia.close()
             logger.info("Pipeline stopped")
 
+    async def _timeline_for(self, resolution: int | None) -> DetectionTimeline | None:
+        """The detection timeline for a model input resolution (None when caching is off)."""
+        if not config.detection_timeline_cache or self._skip_detection:
+            return None
+        timeline = self._timelines.get(resolution)
+        if timeline is None:
+            timeline = await asyncio.to_thread(
+                DetectionTimeline,
+                self.video_path.parent,
+                self.video_id,
+                config.detection_fps,
+                config.rfdetr_model_id,
+                config.detection_confidence,
+                resolution,
+            )
+            timeline = self._timelines.setdefault(resolution, timeline)
+        return timeline
+
+    def _flush_timelines(self) -> None:
+        """Persist newly computed detections (runs in a worker thread)."""
+        for timeline in self._timelines.values():
+            try:
+                timeline.flush()
+            except Exception:
+                logger.exception("Could not save detection timeline %s", timeline.path)
+            logger.info(
+                "Detection timeline %s: %d hits, %d misses (%d slots covered)",
+                timeline.path.name,
+                timeline.hits,
+                timeline.misses,
+                timeline.slots_covered,
+            )
+
+    async def stop(self) -> None:
+        """Signal the pipeline to stop and clean up resources."""
+        self._halt()
+        await super().stop()
+
 
 class LiveCommentaryPipeline(BaseCommentaryPipeline):
     """Live pipeline: accepts externally-pushed JPEG frames.
@@ -814,9 +1345,18 @@ class LiveCommentaryPipeline(BaseCommentaryPipeline):
     an ``initialize`` / ``process_frame`` interface so a caller (e.g. a
     WebSocket handler receiving webcam frames) can feed frames one at a time.
 
+    Viewer questions arrive either as text (``answer_question``) or as
+    microphone audio (``process_viewer_audio``), transcribed server-side. With
+    audio, the answer is started speculatively once a partial transcript is
+    stable and released when the final transcript confirms the same question;
+    a different final question restarts it.
+
     Args:
         ws: WebSocket connection to stream results to the frontend.
         profile: Optional user profile for personalized commentary.
+        skip_detection: Send frames straight to Claude without RF-DETR.
+        sport: "soccer" or "football".
+        session_id: Identifier used for logging and per-session metrics.
     """
 
     def __init__(
@@ -825,10 +1365,16 @@ class LiveCommentaryPipeline(BaseCommentaryPipeline):
         profile: UserProfile | None = None,
         skip_detection: bool = True,
         sport: str = "soccer",
+        session_id: str | None = None,
     ) -> None:
-        super().__init__(ws, profile=profile, sport=sport)
+        super().__init__(ws, profile=profile, sport=sport, session_id=session_id)
         self._skip_detection = skip_detection
 
+        # Server-side viewer speech (created on the first audio frame) and the
+        # speculative answer awaiting its final transcript: (question, release, job)
+        self._viewer_speech: ViewerSpeech | None = None
+        self._speculation: tuple[str, asyncio.Future[bool], asyncio.Task] | None = None
+
     async def initialize(self) -> None:
         """Load model (if detection enabled) and notify the client."""
         self._running = True
@@ -840,20 +1386,121 @@ class LiveCommentaryPipeline(BaseCommentaryPipeline):
     async def answer_question(self, question: str) -> None:
         """Answer a viewer's question using the current frame context.
 
-        Bypasses the debouncer so the answer is immediate.
+        Bypasses the debouncer and preempts any periodic commentary still in
+        flight, so the answer is immediate and no stale clip follows it.
+        Returns once the answer is started; it is sent from a background task.
         """
         if not self._running:
             return
+        self._question_asked_at = time.monotonic()
+        self._start_answer(question)
 
+    def _start_answer(self, question: str, release: asyncio.Future[bool] | None = None) -> None:
         analyst_key = "danny"
         prompt = (
             f'The viewer just asked: "{question}"\n'
             f"Answer briefly (1-2 sentences) as part of your commentary, then move on."
         )
-        await self._commentate(
-            prompt, analyst_key=analyst_key, frame_ts=self._last_frame_ts, force=True
+        self._start_commentary(
+            prompt,
+            preempt=True,
+            analyst_key=analyst_key,
+            frame_ts=self._last_frame_ts,
+            force=True,
+            task="question",
+            release=release,
         )
 
+    # ---- Viewer audio ----
+
+    async def process_viewer_audio(self, frame: bytes) -> None:
+        """Feed one binary audio frame (``VIEWER_AUDIO_MAGIC`` header + PCM) to STT."""
+        if not self._running or not config.cartesia_api_key:
+            return
+        if len(frame) <= _VIEWER_AUDIO_HEADER.size:
+            return
+        _, sample_rate = _VIEWER_AUDIO_HEADER.unpack_from(frame)
+        pcm = memoryview(frame)[_VIEWER_AUDIO_HEADER.size :]
+        samples = np.frombuffer(pcm[: len(pcm) // 2 * 2], dtype=np.int16)
+
+        if self._viewer_speech is not None and self._viewer_speech.failed:
+            await self._viewer_speech.close()
+            self._viewer_speech = None
+        if self._viewer_speech is None:
+            # STT connects in the background so the /ws/live loop never waits
+            # on it; audio until then is buffered by ViewerSpeech
+            self._viewer_speech = ViewerSpeech(
+                self.session_id,
+                on_stable=self._on_stable_question,
+                on_final=self._on_final_question,
+                on_partial=self._on_partial_question,
+                stable_ms=config.speculative_stable_ms,
+            )
+            self._viewer_speech.start()
+        await self._viewer_speech.feed(samples, sample_rate)
+
+    async def end_viewer_audio(self) -> None:
+        """The viewer stopped talking (mic released): finalize the transcript now."""
+        if self._viewer_speech is not None:
+            await self._viewer_speech.end_of_speech()
+
+    async def _on_partial_question(self, text: str) -> None:
+        await self._send_transcript(text, final=False)
+
+    async def _on_stable_question(self, text: str) -> None:
+        """Start answering a stable partial transcript, held until it is confirmed."""
+        if not self._running or not config.speculative_answers:
+            return
+        key = normalize_question(text)
+        if self._speculation is not None:
+            if self._speculation[0] == key:
+                return
+            if not self._speculation[1].done():
+                self._speculation[1].set_result(False)
+
+        release: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        metrics.incr("question.speculative_started")
+        logger.info("[%s] Speculatively answering: %s", self.session_id, text)
+        self._start_answer(text, release=release)
+        assert self._commentary_task is not None
+        self._speculation = (key, release, self._commentary_task)
+
+    async def _on_final_question(self, text: str) -> None:
+        """Confirm the speculative answer if the question matches, else answer afresh."""
+        if not self._running or not text:
+            return
+        logger.info("Viewer question (speech): %s", text)
+        await self._send_transcript(text, final=True)
+        self._question_asked_at = time.monotonic()
+
+        speculation, self._speculation = self._speculation, None
+        if speculation is not None and not speculation[1].done():
+            key, release, job = speculation
+            if key == normalize_question(text) and not job.done():
+                release.set_result(True)
+                metrics.incr("question.speculative_confirmed")
+                return
+            release.set_result(False)
+            metrics.incr("question.speculative_restarted")
+        self._start_answer(text)
+
+    async def _send_transcript(self, text: str, final: bool) -> None:
+        try:
+            await self.ws.send_json({"type": "viewer_transcript", "text": text, "final": final})
+        except WebSocketDisconnect:
+            self._running = False
+
+    async def stop(self) -> None:
+        """Stop the pipeline and the viewer's speech recognition."""
+        if self._viewer_speech is not None:
+            await self._viewer_speech.close()
+            self._viewer_speech = None
+        await super().stop()
+
+    async def _emit_commentary(self, prompt: str, analyst_key: str, frame_ts: float) -> None:
+        """Start periodic commentary in the background so the frame loop keeps going."""
+        self._start_commentary(prompt, analyst_key=analyst_key, frame_ts=frame_ts)
+
     async def process_frame(self, jpeg_bytes: bytes) -> None:
         """Process a JPEG frame: either via RF-DETR or straight to Claude.
 
@@ -868,23 +1515,11 @@ class LiveCommentaryPipeline(BaseCommentaryPipeline):
             self._frame_count += 1
             self._current_frame_b64 = base64.b64encode(jpeg_bytes).decode()
 
-            if self._debouncer:
+            if not self._commentary_busy() and self._debouncer:
                 # Snapshot frame_ts NOW before async Claude call
                 snapshot_ts = self._last_frame_ts
-                analyst_key = self._pick_analyst("active_play")
-                self._last_analyst = analyst_key
-                prompts = self._commentary_prompts.get(
-                    analyst_key, self._commentary_prompts["danny"]
-                )
-                prompt = random.choice(prompts)
-                sport_label = (
-                    "American football game" if self._sport == "football" else "soccer match"
-                )
-                await self._commentate(
-                    f"You're watching a {sport_label}. {prompt}",
-                    analyst_key=analyst_key,
-                    frame_ts=snapshot_ts,
-                )
+                analyst_key, prompt = self._frame_only_prompt()
+                await self._emit_commentary(prompt, analyst_key=analyst_key, frame_ts=snapshot_ts)
         else:
             # Full path: RF-DETR detection → enriched commentary
             img = Image.open(io.BytesIO(jpeg_bytes)).convert("RGB")
@@ -893,37 +1528,96 @@ class LiveCommentaryPipeline(BaseCommentaryPipeline):
             await self._handle_detections(objects)
 
 
-# ---- Shared model cache ----
-# Load the model once and reuse across pipeline instances
-_cached_model: dict[str, Any] | None = None
-_model_lock = asyncio.Lock()
+class PrecomputePipeline(BaseCommentaryPipeline):
+    """Offline pipeline: generate commentary for one chunk of an MP4 ahead of time.
 
+    Runs the same detection / LLM / TTS path as ``CommentaryPipeline`` but
+    without a WebSocket or pacing: frames are read as fast as they decode, the
+    commentary cadence follows video time instead of wall time, and every
+    generated message is yielded (tagged with its video timestamp) instead of
+    sent. ``agent.precompute`` runs several of these in parallel, one per chunk.
 
-async def get_or_load_model() -> dict[str, Any]:
-    """Load the RF-DETR model once and cache it globally."""
-    global _cached_model
-
-    async with _model_lock:
-        if _cached_model is not None:
-            return _cached_model
+    Args:
+        video_path: Path to the downloaded MP4 file.
+        profile: Optional user profile for personalized commentary.
+        sport: "soccer" or "football".
+        skip_detection: Sample one frame per commentary slot and skip RF-DETR.
+        session_id: Identifier used for logging and per-session metrics.
+    """
 
-        logger.info("Loading RF-DETR model (first request, will be cached)...")
-        loop = asyncio.get_running_loop()
+    # Generated ahead of playback, so a slow call is never worth a second one
+    _latency_sensitive = False
 
-        def _load():
-            model_id = config.rfdetr_model_id
-            if model_id == "rfdetr-large":
-                from rfdetr.detr import RFDETRLarge
+    def __init__(
+        self,
+        video_path: Path,
+        profile: UserProfile | None = None,
+        sport: str = "soccer",
+        skip_detection: bool = True,
+        session_id: str | None = None,
+    ) -> None:
+        super().__init__(None, profile=profile, sport=sport, session_id=session_id)
+        self.video_path = video_path
+        self._skip_detection = skip_detection
+        self._debouncer = Debouncer(config.commentary_cooldown, clock=lambda: self._last_frame_ts)
+        self._items: list[dict[str, Any]] = []
 
-                model = RFDETRLarge()
-            else:
-                from rfdetr.detr import RFDETRBase
+    async def _commentate(
+        self,
+        prompt: str,
+        analyst_key: str = "danny",
+        frame_ts: float | None = None,
+        force: bool = False,
+    ) -> None:
+        """Generate commentary and collect it for the script instead of sending it."""
+        try:
+            message = await self._produce_commentary(
+                prompt, analyst_key=analyst_key, frame_ts=frame_ts, force=force
+            )
+        except Exception:
+            logger.exception("Error generating precomputed commentary")
+            return
+        if message is not None:
+            message["ts"] = message["frame_ts"]
+            self._items.append(message)
 
-                model = RFDETRBase()
+    async def run_chunk(self, start_s: float, end_s: float | None) -> AsyncIterator[dict[str, Any]]:
+        """Yield commentary messages for video time ``[start_s, end_s)``."""
+        self._running = True
+        if self._skip_detection:
+            fps = 1.0 / config.commentary_cooldown
+        else:
+            fps = config.detection_fps
+            await self._load_model()
 
-            model.optimize_for_inference()
-            return {"model": model, "class_name_map": dict(model.class_names)}
+        source = FileFrameSource(
+            self.video_path,
+            fps=fps,
+            max_width=config.analysis_max_width,
+            buffer_size=config.decode_buffer_frames,
+            start_s=start_s,
+            end_s=end_s,
+            growing=lambda: is_downloading(self.video_path.stem, self.video_path.parent),
+        )
+        source.start()
+        try:
+            while self._running:
+                frame = await source.get()
+                if frame is None:
+                    break
+                self._last_frame_ts = frame.pts
+
+                if self._skip_detection:
+                    self._frame_count += 1
+                    self._current_frame_b64 = _jpeg_b64(frame.image)
+                    if self._debouncer:
+                        analyst_key, prompt = self._frame_only_prompt()
+                        await self._commentate(prompt, analyst_key=analyst_key, frame_ts=frame.pts)
+                else:
+                    objects = await self._detect_from_array(frame.image)
+                    await self._handle_detections(objects)
 
-        _cached_model = await loop.run_in_executor(_executor, _load)
-        logger.info("RF-DETR model cached globally")
-        return _cached_model
+                while self._items:
+                    yield self._items.pop(0)
+        finally:
+            source.stop()
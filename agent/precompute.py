@@ -0,0 +1,351 @@
+"""Ahead-of-time commentary for downloaded videos.
+
+For ``/api/start`` sessions the whole MP4 is on disk before playback starts,
+so commentary (LLM text + TTS audio) can be generated ahead of time instead of
+live. A ``PrecomputeJob`` splits the video into chunks and runs one
+``PrecomputePipeline`` per chunk in parallel; the resulting timestamped script
+is stored next to the MP4 keyed by video id, sport, persona and audio profile,
+so later sessions for the same combination start instantly. Chunk pipelines are capped
+per job (``precompute_concurrency``) and across all jobs in the process
+(``max_precompute_pipelines``).
+
+``stream_script`` replays a (possibly still growing) script over the session
+WebSocket in step with the client's playback position, interleaved with
+``precompute_progress`` events while the job is running. Scripts are
+synthesized in the server's default audio profile (``AUDIO_PROFILE``); a
+client's ``set_audio_profile`` is answered with that profile.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+import av
+from fastapi import WebSocket, WebSocketDisconnect
+
+from agent import metrics
+from agent.audio_profiles import AudioProfile, default_profile
+from agent.config import config
+from agent.frame_source import PlaybackPacer
+from agent.pipeline import PrecomputePipeline
+from agent.user_profile import PERSONAS
+from agent.video_download import VideoInfo, analysis_path, pin_video, unpin_video
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_FORMAT_VERSION = 1
+
+
+# Process-wide chunk pipeline slots (created on first use, in the server's loop)
+_pipeline_slots: asyncio.Semaphore | None = None
+_pipelines_running = 0
+
+
+def _pipeline_slot() -> contextlib.AbstractAsyncContextManager:
+    global _pipeline_slots
+    if config.max_precompute_pipelines <= 0:
+        return contextlib.nullcontext()
+    if _pipeline_slots is None:
+        _pipeline_slots = asyncio.Semaphore(config.max_precompute_pipelines)
+    return _pipeline_slots
+
+
+def script_path(
+    video: VideoInfo, sport: str, persona: str | None, audio_profile: AudioProfile
+) -> Path:
+    """Where the precomputed script for this video/sport/persona/audio profile lives."""
+    name = f"{video.video_id}.script-{sport}-{persona or 'default'}-{audio_profile.name}.json"
+    return video.path.with_name(name)
+
+
+def _probe_duration(path: Path) -> float:
+    with av.open(str(path)) as container:
+        if container.duration is not None:
+            return container.duration / av.time_base
+        stream = container.streams.video[0]
+        return float(stream.duration * stream.time_base) if stream.duration else 0.0
+
+
+class PrecomputeJob:
+    """Chunked, parallel commentary generation for one video/sport/persona.
+
+    Args:
+        video: The downloaded video.
+        sport: "soccer" or "football".
+        persona: Key into ``PERSONAS`` (None uses the default profile).
+        audio_profile: Audio profile the commentary is synthesized in.
+    """
+
+    def __init__(
+        self, video: VideoInfo, sport: str, persona: str | None, audio_profile: AudioProfile
+    ) -> None:
+        self.video = video
+        self.sport = sport
+        self.persona = persona
+        self.audio_profile = audio_profile
+        self.path = script_path(video, sport, persona, audio_profile)
+        self.items: list[dict[str, Any]] = []
+        self.chunks_total = 0
+        self.chunks_done = 0
+        self.error: str | None = None
+        self.done = asyncio.Event()
+        self.changed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._started = time.monotonic()
+
+    @property
+    def key(self) -> str:
+        return self.path.stem
+
+    @property
+    def progress(self) -> float:
+        if self.done.is_set():
+            return 1.0
+        return self.chunks_done / self.chunks_total if self.chunks_total else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "video_id": self.video.video_id,
+            "sport": self.sport,
+            "persona": self.persona,
+            "audio_profile": self.audio_profile.name,
+            "progress": round(self.progress, 3),
+            "chunks": f"{self.chunks_done}/{self.chunks_total}",
+            "items": len(self.items),
+            "done": self.done.is_set(),
+            "error": self.error,
+            "elapsed_s": round(time.monotonic() - self._started, 1),
+        }
+
+    def start(self) -> None:
+        """Load a stored script, or start generating one in the background."""
+        if self.path.exists():
+            try:
+                stored = json.loads(self.path.read_text())
+                if stored.get("version") == SCRIPT_FORMAT_VERSION:
+                    self.items = stored["items"]
+                    self.done.set()
+                    logger.info(
+                        "Loaded precomputed script: %s (%d items)", self.path.name, len(self.items)
+                    )
+                    return
+            except (OSError, ValueError, KeyError):
+                logger.exception("Ignoring unreadable script: %s", self.path)
+
+        self._task = asyncio.create_task(self._run())
+
+    def _add(self, item: dict[str, Any]) -> None:
+        self.items.append(item)
+        self.items.sort(key=lambda it: it["ts"])
+        self.changed.set()
+
+    async def _run(self) -> None:
+        pin_video(self.video)
+        try:
+            duration = float(self.video.duration)
+            if duration <= 0:
+                duration = await asyncio.to_thread(_probe_duration, self.video.path)
+
+            chunk_s = config.precompute_chunk_s
+            self.chunks_total = max(1, math.ceil(duration / chunk_s))
+            semaphore = asyncio.Semaphore(config.precompute_concurrency)
+            profile = PERSONAS.get(self.persona) if self.persona else None
+            logger.info(
+                "Precomputing %s: %.0fs in %d chunks", self.key, duration, self.chunks_total
+            )
+
+            async def _chunk(i: int) -> None:
+                global _pipelines_running
+                start = i * chunk_s
+                end = None if i == self.chunks_total - 1 else start + chunk_s
+                async with semaphore, _pipeline_slot():
+                    _pipelines_running += 1
+                    pipeline = PrecomputePipeline(
+                        analysis_path(self.video),
+                        profile=profile,
+                        sport=self.sport,
+                        skip_detection=config.skip_detection,
+                        session_id=f"{self.video.video_id}-pre{i}",
+                    )
+                    await pipeline.set_audio_profile(self.audio_profile.name)
+                    try:
+                        async for item in pipeline.run_chunk(start, end):
+                            self._add(item)
+                    finally:
+                        _pipelines_running -= 1
+                        await pipeline.stop()
+                self.chunks_done += 1
+                self.changed.set()
+
+            await asyncio.gather(*(_chunk(i) for i in range(self.chunks_total)))
+            await asyncio.to_thread(self._save)
+            logger.info(
+                "Precompute finished: %s (%d items, %.1fs)",
+                self.key,
+                len(self.items),
+                time.monotonic() - self._started,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Precompute failed: %s", self.key)
+            self.error = str(e)
+        finally:
+            unpin_video(self.video)
+            self.done.set()
+            self.changed.set()
+
+    def _save(self) -> None:
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"version": SCRIPT_FORMAT_VERSION, "items": self.items}))
+        os.replace(tmp, self.path)
+
+
+_jobs: dict[str, PrecomputeJob] = {}
+
+
+def _jobs_stats() -> dict[str, Any]:
+    return {
+        "pipelines": {"running": _pipelines_running, "cap": config.max_precompute_pipelines},
+        "jobs": {key: job.stats() for key, job in _jobs.items()},
+    }
+
+
+metrics.register_provider("precompute", _jobs_stats)
+
+
+def start_precompute(video: VideoInfo, sport: str, persona: str | None) -> PrecomputeJob:
+    """Return the job for this video/sport/persona, starting it if needed.
+
+    Commentary is synthesized in the default audio profile, since precompute
+    starts before the session's client connects and negotiates one.
+    """
+    audio_profile = default_profile()
+    key = script_path(video, sport, persona, audio_profile).stem
+    job = _jobs.get(key)
+    if job is None or (job.error is not None and job.done.is_set()):
+        job = PrecomputeJob(video, sport, persona, audio_profile)
+        _jobs[key] = job
+        job.start()
+    return job
+
+
+async def stream_script(ws: WebSocket, job: PrecomputeJob) -> None:
+    """Send precomputed commentary in step with the client's playback position.
+
+    Items are sent once playback reaches ``ts - precompute_send_ahead_s``.
+    Items that playback has already passed by more than one commentary
+    interval (e.g. after a forward seek) are skipped; seeking backwards makes
+    them eligible again. Client messages are the same as for live file mode
+    (``stop``, ``playback`` and ``set_audio_profile``, answered with the
+    profile the script was synthesized in).
+    """
+    pacer = PlaybackPacer()
+    pacer.start()
+    sent: set[int] = set()  # id() of items already sent (the list is re-sorted as it grows)
+    last_position = 0.0
+    stopped = asyncio.Event()
+
+    async def _receive() -> None:
+        try:
+            while True:
+                msg = await ws.receive_json()
+                if msg.get("type") == "stop":
+                    break
+                if msg.get("type") == "playback":
+                    pacer.sync(
+                        float(msg.get("position", 0.0)), paused=bool(msg.get("paused", False))
+                    )
+                    job.changed.set()
+                if msg.get("type") == "set_audio_profile":
+                    profile = job.audio_profile
+                    if msg.get("profile") != profile.name:
+                        logger.info(
+                            "Precomputed %s: client asked for %s audio, sending %s",
+                            job.key,
+                            msg.get("profile"),
+                            profile.name,
+                        )
+                    await ws.send_json(
+                        {
+                            "type": "audio_profile",
+                            "profile": profile.name,
+                            "format": profile.format,
+                            "mime": profile.mime,
+                        }
+                    )
+        except WebSocketDisconnect:
+            pass
+        finally:
+            stopped.set()
+            job.changed.set()
+
+    receiver = asyncio.create_task(_receive())
+    progress_sent_at = 0.0
+    try:
+        if not job.done.is_set():
+            await ws.send_json({"type": "status", "message": "Precomputing commentary..."})
+
+        while not stopped.is_set():
+            position = pacer.position()
+            if position < last_position - 1.0:
+                # Seeked backwards: everything after the new position may replay
+                sent = {id(item) for item in job.items if item["ts"] < position}
+            last_position = position
+
+            horizon = position + config.precompute_send_ahead_s
+            next_due: float | None = None
+            for item in list(job.items):
+                if id(item) in sent:
+                    continue
+                if item["ts"] > horizon:
+                    next_due = item["ts"] if next_due is None else min(next_due, item["ts"])
+                    continue
+                sent.add(id(item))
+                if item["ts"] < position - config.commentary_cooldown:
+                    continue
+                await ws.send_json({k: v for k, v in item.items() if k != "ts"})
+
+            now = time.monotonic()
+            if not job.done.is_set() and now - progress_sent_at >= 1.0:
+                await ws.send_json(
+                    {
+                        "type": "precompute_progress",
+                        "progress": round(job.progress, 3),
+                        "items": len(job.items),
+                        "done": False,
+                    }
+                )
+                progress_sent_at = now
+            elif job.done.is_set() and progress_sent_at >= 0:
+                await ws.send_json(
+                    {
+                        "type": "precompute_progress",
+                        "progress": 1.0,
+                        "items": len(job.items),
+                        "done": True,
+                        "error": job.error,
+                    }
+                )
+                progress_sent_at = -1.0
+
+            timeout = 1.0
+            if next_due is not None:
+                timeout = min(timeout, max(0.05, next_due - horizon))
+            job.changed.clear()
+            try:
+                await asyncio.wait_for(job.changed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+    except WebSocketDisconnect:
+        logger.info("WebSocket disconnected while streaming %s", job.key)
+    finally:
+        receiver.cancel()
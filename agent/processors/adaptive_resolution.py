@@ -0,0 +1,130 @@
+"""Latency-driven input-resolution controller for RF-DETR.
+
+Tracks a moving percentile of measured inference time and steps the model
+input resolution down a configured ladder when it exceeds the per-frame
+budget (``1000 / detection_fps`` ms), and back up when there is headroom.
+
+Level 0 is the model's native resolution; levels 1..N are the explicit
+step-down resolutions (e.g. 448, 336).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def parse_resolutions(spec: str) -> list[int]:
+    """Parse a step-down ladder such as ``DETECTION_RESOLUTIONS="448,336"``."""
+    return [int(r) for r in spec.split(",") if r.strip()]
+
+
+class ResolutionController:
+    """Step detector input resolution based on recent inference latency.
+
+    Args:
+        resolutions: Step-down ladder below native, largest first (e.g. [448, 336]).
+        budget_ms: Per-frame inference budget in milliseconds.
+        window: Number of recent samples the percentile is computed over.
+        percentile: Percentile of the window compared against the budget (0-100).
+        headroom: Step back up when the percentile falls below ``budget * headroom``.
+        min_samples: Samples needed at a level before it may change again.
+    """
+
+    def __init__(
+        self,
+        resolutions: list[int],
+        budget_ms: float,
+        window: int = 30,
+        percentile: float = 90.0,
+        headroom: float = 0.6,
+        min_samples: int = 10,
+    ) -> None:
+        self._levels: list[int | None] = [None, *resolutions]
+        self._budget_ms = budget_ms
+        self._percentile = percentile
+        self._headroom = headroom
+        self._min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+        self._level = 0
+        self._max_level = len(self._levels) - 1
+        self._changes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def levels(self) -> list[int | None]:
+        """Every input resolution the controller may pick, native first."""
+        return list(self._levels)
+
+    @property
+    def level(self) -> int:
+        return self._level
+
+    @property
+    def resolution(self) -> int | None:
+        """Current input resolution (None = model native)."""
+        return self._levels[self._level]
+
+    def cap_level(self, level: int) -> None:
+        """Forbid levels above ``level`` (e.g. when a variant can't be loaded)."""
+        with self._lock:
+            self._max_level = max(0, min(self._max_level, level))
+            self._level = min(self._level, self._max_level)
+
+    def set_level(self, level: int) -> None:
+        """Move back to ``level`` (e.g. the one still loaded after a failed switch)."""
+        with self._lock:
+            self._level = max(0, min(level, self._max_level))
+            self._samples.clear()
+
+    def _current_percentile(self) -> float:
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, int(round(self._percentile / 100 * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def record(self, inference_ms: float) -> bool:
+        """Record one inference time. Returns True if the level changed."""
+        with self._lock:
+            self._samples.append(inference_ms)
+            if len(self._samples) < self._min_samples:
+                return False
+
+            p = self._current_percentile()
+            previous = self._level
+            if p > self._budget_ms and self._level < self._max_level:
+                self._level += 1
+            elif p < self._budget_ms * self._headroom and self._level > 0:
+                self._level -= 1
+            else:
+                return False
+
+            # Start fresh at the new level so old samples don't bounce us back
+            self._samples.clear()
+            self._changes += 1
+
+        logger.info(
+            "Detection resolution level %d -> %d (%s), p%d=%.0fms budget=%.0fms",
+            previous,
+            self._level,
+            self.resolution or "native",
+            self._percentile,
+            p,
+            self._budget_ms,
+        )
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            p = self._current_percentile() if self._samples else None
+            return {
+                "level": self._level,
+                "resolution": self.resolution or "native",
+                "budget_ms": round(self._budget_ms, 1),
+                f"p{int(self._percentile)}_ms": round(p, 1) if p is not None else None,
+                "samples": len(self._samples),
+                "level_changes": self._changes,
+            }
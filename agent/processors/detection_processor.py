@@ -12,9 +12,7 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import time
 import typing
-from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import av
@@ -24,33 +22,34 @@ from vision_agents.core.processors import VideoProcessorPublisher
 from vision_agents.core.utils.video_track import QueuedVideoTrack
 from vision_agents.core.warmup import Warmable
 
+from agent.processors.detector_service import DetectorService, get_detector
 from agent.processors.events import DetectedObject, DetectionCompletedEvent
 
 if typing.TYPE_CHECKING:
     from aiortc import VideoStreamTrack
-    from rfdetr.detr import RFDETRBase as RFDETRBaseType
     from vision_agents.core import Agent
     from vision_agents.core.utils.video_forwarder import VideoForwarder
 
 logger = logging.getLogger(__name__)
 
-# Thread pool for running blocking model inference off the event loop
-_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rfdetr")
-
 
 class LocalDetectionProcessor(VideoProcessorPublisher, Warmable[dict]):
     """Video processor that runs RF-DETR locally and publishes annotated frames.
 
     Extends VideoProcessorPublisher (process video + publish annotated output)
-    and Warmable (cache the loaded model across agent restarts).
+    and Warmable (cache the loaded model across agent restarts). Model loading,
+    inference and class filtering go through the shared ``DetectorService``, so
+    the FastAPI pipelines in the same process reuse the same model and queue.
 
     Args:
-        model_id: RF-DETR model variant. "rfdetr-base" or "rfdetr-large".
+        model_id: RF-DETR model variant. "rfdetr-base" or "rfdetr-large", or an
+            ONNX export ("rfdetr-base-onnx", "rfdetr-base-onnx-int8", "/path/model.onnx").
         conf_threshold: Minimum confidence for a detection to count.
         fps: How many frames per second to process.
         classes: COCO class names to keep (e.g. ["person", "sports ball"]).
             None means keep all classes.
         annotate: Whether to draw bounding boxes on published frames.
+        detector: Shared detector service. Defaults to the one for ``model_id``.
     """
 
     def __init__(
@@ -60,15 +59,17 @@ class LocalDetectionProcessor(VideoProcessorPublisher, Warmable[dict]):
         fps: int = 5,
         classes: list[str] | None = None,
         annotate: bool = True,
+        detector: DetectorService | None = None,
     ) -> None:
         self._model_id = model_id
+        self._detector = detector or get_detector(model_id)
         self._conf_threshold = conf_threshold
         self._fps = fps
         self._filter_classes = classes
         self._annotate = annotate
 
         # Set by on_warmed_up
-        self._model: RFDETRBaseType | None = None
+        self._model_ready = False
         self._class_name_map: dict[int, str] = {}
 
         # Set by attach_agent
@@ -95,32 +96,16 @@ class LocalDetectionProcessor(VideoProcessorPublisher, Warmable[dict]):
     # ---- Warmable: load model once, cache across agent restarts ----
 
     async def on_warmup(self) -> dict:
-        """Load the RF-DETR model. Called once at startup; result is cached."""
+        """Load the RF-DETR model via the shared detector. Result is cached."""
         logger.info("Loading RF-DETR model: %s", self._model_id)
-
-        loop = asyncio.get_running_loop()
-
-        def _load() -> dict:
-            if self._model_id == "rfdetr-large":
-                from rfdetr.detr import RFDETRLarge
-
-                model = RFDETRLarge()
-            else:
-                from rfdetr.detr import RFDETRBase
-
-                model = RFDETRBase()
-
-            model.optimize_for_inference()
-            class_name_map = dict(model.class_names)
-            logger.info("RF-DETR model loaded (%d classes, optimized)", len(class_name_map))
-            return {"model": model, "class_name_map": class_name_map}
-
-        return await loop.run_in_executor(_executor, _load)
+        return await self._detector.load()
 
     def on_warmed_up(self, resource: dict) -> None:
-        """Store the cached model reference."""
-        self._model = resource["model"]
+        """Store the class map and register as a detector user."""
         self._class_name_map = resource["class_name_map"]
+        if not self._model_ready:
+            self._detector.acquire(self.name)
+            self._model_ready = True
         logger.info("RF-DETR model ready")
 
     # ---- Agent integration ----
@@ -193,24 +178,20 @@ class LocalDetectionProcessor(VideoProcessorPublisher, Warmable[dict]):
 
     async def _on_frame(self, frame: av.VideoFrame) -> None:
         """Process a single video frame: detect, annotate, emit event."""
-        if not self._running or self._model is None:
+        if not self._running or not self._model_ready:
             return
 
         try:
             img = frame.to_ndarray(format="rgb24")
             h, w = img.shape[:2]
 
-            # Run inference in thread pool to avoid blocking the event loop
-            loop = asyncio.get_running_loop()
-            t0 = time.perf_counter()
-            detections = await loop.run_in_executor(
-                _executor,
-                lambda: self._model.predict(img, threshold=self._conf_threshold),
+            # Run inference on the shared detector's executor (off the event loop)
+            detections, inference_ms = await self._detector.predict(
+                img, threshold=self._conf_threshold
             )
-            inference_ms = (time.perf_counter() - t0) * 1000
 
             # Filter by class if configured
-            detections = self._filter_detections(detections)
+            detections = self._detector.filter(detections, self._filter_classes)
 
             # Build the list of DetectedObject dicts
             objects = self._build_objects(detections)
@@ -243,20 +224,6 @@ class LocalDetectionProcessor(VideoProcessorPublisher, Warmable[dict]):
         except Exception:
             logger.exception("Error processing frame for detection")
 
-    def _filter_detections(self, detections: sv.Detections) -> sv.Detections:
-        """Filter detections to only include configured classes."""
-        if self._filter_classes is None or detections.class_id is None:
-            return detections
-
-        # Build set of allowed class IDs
-        allowed_ids: set[int] = set()
-        for cid, cname in self._class_name_map.items():
-            if cname in self._filter_classes:
-                allowed_ids.add(cid)
-
-        mask = np.array([cid in allowed_ids for cid in detections.class_id])
-        return detections[mask]
-
     def _build_objects(self, detections: sv.Detections) -> list[DetectedObject]:
         """Convert supervision Detections to our DetectedObject list."""
         objects: list[DetectedObject] = []
@@ -312,6 +279,8 @@ class LocalDetectionProcessor(VideoProcessorPublisher, Warmable[dict]):
     async def close(self) -> None:
         """Close the processor and clean up resources."""
         await self.stop_processing()
-        self._model = None
+        if self._model_ready:
+            self._detector.release(self.name)
+            self._model_ready = False
         self._class_name_map = {}
         logger.info("LocalDetectionProcessor closed")
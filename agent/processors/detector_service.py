@@ -0,0 +1,305 @@
+"""Process-wide RF-DETR detector service.
+
+One ``DetectorService`` per model id owns the model lifecycle (lazy load per
+input resolution), the single inference executor and class filtering. The
+FastAPI pipelines and ``LocalDetectionProcessor`` share it, so a process that
+hosts both holds one copy of the model and one serialized inference queue.
+
+Model variants are loaded (and warmed up) on a separate loader thread, so an
+adaptive-resolution switch never stalls the inference queue; ``preload``
+loads the whole resolution ladder in the background at startup. At most
+``max_variants`` variants stay cached, least recently used evicted first.
+
+Users call ``acquire`` / ``release`` so the service knows who depends on it;
+``stats`` reports users, loaded variants, queue depth/wait and memory.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+import supervision as sv
+
+from agent import metrics
+from agent.config import config
+from agent.processors.model_cache import TorchScriptRFDETR
+from agent.processors.model_loader import load_rfdetr
+from agent.processors.onnx_detector import OnnxRFDETR
+
+logger = logging.getLogger(__name__)
+
+
+class DetectorService:
+    """Shared RF-DETR model + inference queue for one model id.
+
+    Args:
+        model_id: RF-DETR model id (see ``model_loader``).
+        max_variants: Resolution variants kept loaded (``detector_max_variants``
+            by default).
+    """
+
+    def __init__(self, model_id: str, max_variants: int | None = None) -> None:
+        self.model_id = model_id
+        self.max_variants = max(1, max_variants or config.detector_max_variants)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rfdetr")
+        # Loads run on their own thread so they never queue behind (or block) inference;
+        # being single-threaded it also serializes loads across event loops
+        self._load_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rfdetr-load")
+        # Resolution -> loaded variant, least recently used first
+        self._models: OrderedDict[int | None, dict[str, Any]] = OrderedDict()
+        self._models_lock = threading.Lock()
+        self._evictions = 0
+        # The service is process-wide but asyncio locks belong to one event
+        # loop, so each loop gets its own
+        self._load_locks: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._users: dict[str, int] = {}
+
+        # Queue / throughput stats
+        self._pending = 0
+        self._max_pending = 0
+        self._inferences = 0
+        self._inference_ms_total = 0.0
+        self._queue_wait_ms_total = 0.0
+
+    # ---- Lifecycle ----
+
+    def acquire(self, user: str) -> None:
+        """Register a user (pipeline / processor) of this detector."""
+        self._users[user] = self._users.get(user, 0) + 1
+        logger.debug("Detector %s acquired by %s (%d users)", self.model_id, user, self.refcount)
+
+    def release(self, user: str) -> None:
+        """Drop a user reference. Models stay cached for the next session."""
+        count = self._users.get(user, 0) - 1
+        if count > 0:
+            self._users[user] = count
+        else:
+            self._users.pop(user, None)
+        logger.debug("Detector %s released by %s (%d users)", self.model_id, user, self.refcount)
+
+    @property
+    def refcount(self) -> int:
+        return sum(self._users.values())
+
+    async def load(self, resolution: int | None = None) -> dict[str, Any]:
+        """Load the model for an input resolution once and cache it.
+
+        Returns:
+            Dict with ``model`` and ``class_name_map``.
+        """
+        cached = self._cached(resolution)
+        if cached is not None:
+            return cached
+        async with self._load_lock():
+            cached = self._cached(resolution)
+            if cached is not None:
+                return cached
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._load_executor, self._load_sync, resolution)
+
+    async def preload(self, resolutions: list[int | None]) -> None:
+        """Load and warm up variants ahead of use (up to ``max_variants``)."""
+        for resolution in resolutions[: self.max_variants]:
+            try:
+                await self.load(resolution)
+            except Exception:
+                logger.exception("Could not preload RF-DETR at %spx", resolution or "native")
+
+    def _cached(self, resolution: int | None) -> dict[str, Any] | None:
+        """The cached variant (marked most recently used), or None."""
+        with self._models_lock:
+            cached = self._models.get(resolution)
+            if cached is not None:
+                self._models.move_to_end(resolution)
+            return cached
+
+    def _load_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        lock = self._load_locks.get(loop)
+        if lock is None:
+            lock = self._load_locks[loop] = asyncio.Lock()
+        return lock
+
+    def _load_sync(self, resolution: int | None) -> dict[str, Any]:
+        """Load (and warm up) a variant unless another event loop already did.
+
+        Runs on the loader thread; evicts least recently used variants beyond
+        ``max_variants``.
+        """
+        cached = self._cached(resolution)
+        if cached is not None:
+            return cached
+        logger.info(
+            "Loading RF-DETR %s at %spx (first request, will be cached)...",
+            self.model_id,
+            resolution or "native",
+        )
+        cached = load_rfdetr(self.model_id, resolution)
+        with self._models_lock:
+            self._models[resolution] = cached
+            while len(self._models) > self.max_variants:
+                evicted, _ = self._models.popitem(last=False)
+                self._evictions += 1
+                logger.info("Evicted RF-DETR %spx variant from the cache", evicted or "native")
+        logger.info("RF-DETR model cached globally")
+        return cached
+
+    @property
+    def class_name_map(self) -> dict[int, str]:
+        with self._models_lock:
+            for cached in self._models.values():
+                return cached["class_name_map"]
+        return {}
+
+    def is_loaded(self, resolution: int | None = None) -> bool:
+        return resolution in self._models
+
+    # ---- Inference ----
+
+    async def predict(
+        self,
+        img: np.ndarray,
+        threshold: float | None = None,
+        resolution: int | None = None,
+    ) -> tuple[sv.Detections, float]:
+        """Run inference on an RGB24 array through the shared executor.
+
+        Returns:
+            ``(detections, inference_ms)`` -- inference time excludes queueing.
+        """
+        detections, inference_ms = await self.predict_batch([img], threshold, resolution)
+        return detections[0], inference_ms
+
+    async def predict_batch(
+        self,
+        imgs: list[np.ndarray],
+        threshold: float | None = None,
+        resolution: int | None = None,
+    ) -> tuple[list[sv.Detections], float]:
+        """Run inference on several RGB24 arrays in one executor call.
+
+        PyTorch RF-DETR models get the whole list in one ``predict`` call when
+        they accept that batch size (see ``_accepts_batch``); traced/ONNX
+        graphs and models compiled for another batch size run image by image.
+
+        Returns:
+            ``(detections per image, inference_ms for the whole batch)``.
+        """
+        cached = await self.load(resolution)
+        model = cached["model"]
+        threshold = config.detection_confidence if threshold is None else threshold
+
+        submitted = time.perf_counter()
+        timings: dict[str, float] = {}
+
+        def _run() -> list[sv.Detections]:
+            start = time.perf_counter()
+            timings["wait"] = (start - submitted) * 1000
+            if len(imgs) > 1 and _accepts_batch(model, len(imgs)):
+                detections = model.predict(imgs, threshold=threshold)
+            else:
+                detections = [model.predict(img, threshold=threshold) for img in imgs]
+            timings["inference"] = (time.perf_counter() - start) * 1000
+            return detections
+
+        self._pending += 1
+        self._max_pending = max(self._max_pending, self._pending)
+        try:
+            loop = asyncio.get_running_loop()
+            detections = await loop.run_in_executor(self._executor, _run)
+        finally:
+            self._pending -= 1
+
+        self._inferences += len(imgs)
+        self._inference_ms_total += timings["inference"]
+        self._queue_wait_ms_total += timings["wait"] * len(imgs)
+        return detections, timings["inference"]
+
+    def filter(
+        self, detections: sv.Detections, classes: set[str] | list[str] | None
+    ) -> sv.Detections:
+        """Keep only detections whose class name is in ``classes`` (None keeps all)."""
+        if classes is None or detections.class_id is None:
+            return detections
+
+        allowed_ids = {cid for cid, cname in self.class_name_map.items() if cname in classes}
+        mask = np.array([cid in allowed_ids for cid in detections.class_id], dtype=bool)
+        return detections[mask]
+
+    async def close(self) -> None:
+        """Shut down the inference and loader executors (call on server shutdown)."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._load_executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---- Stats ----
+
+    def stats(self) -> dict[str, Any]:
+        n = self._inferences
+        return {
+            "model_id": self.model_id,
+            "users": dict(self._users),
+            "refcount": self.refcount,
+            "loaded_resolutions": [r or "native" for r in list(self._models)],
+            "max_variants": self.max_variants,
+            "variant_evictions": self._evictions,
+            "queue_depth": self._pending,
+            "max_queue_depth": self._max_pending,
+            "inferences": n,
+            "avg_inference_ms": round(self._inference_ms_total / n, 1) if n else None,
+            "avg_queue_wait_ms": round(self._queue_wait_ms_total / n, 1) if n else None,
+            "process_rss_mb": round(metrics.process_rss_bytes() / 1e6, 1),
+        }
+
+
+def _accepts_batch(model: Any, batch_size: int) -> bool:
+    """Whether ``model.predict`` takes a list of ``batch_size`` images in one call.
+
+    ``optimize_for_inference`` compiles PyTorch RF-DETR for a fixed batch size
+    (1 by default, as in ``model_loader``), and ``predict`` rejects any other.
+    """
+    if isinstance(model, (OnnxRFDETR, TorchScriptRFDETR)):
+        return False
+    inner = getattr(model, "model", None)
+    if getattr(inner, "_is_optimized_for_inference", False) and getattr(
+        inner, "_optimized_has_been_compiled", False
+    ):
+        return getattr(inner, "_optimized_batch_size", 1) == batch_size
+    return True
+
+
+_services: dict[str, DetectorService] = {}
+
+
+def get_detector(model_id: str | None = None) -> DetectorService:
+    """Return the process-wide detector service for a model id."""
+    model_id = model_id or config.rfdetr_model_id
+    service = _services.get(model_id)
+    if service is None:
+        if config.detector_backend == "sidecar":
+            from agent.processors.sidecar_client import SidecarDetector
+
+            service = SidecarDetector(model_id, config.detector_socket)
+        else:
+            service = DetectorService(model_id)
+        _services[model_id] = service
+        metrics.register_provider(f"detector.{model_id}", service.stats)
+    return service
+
+
+async def close_detectors() -> None:
+    """Close every detector service in this process (server shutdown)."""
+    for service in _services.values():
+        try:
+            await service.close()
+        except Exception:
+            logger.exception("Failed to close detector %s", service.model_id)
@@ -0,0 +1,160 @@
+"""On-disk cache of the inference-optimized RF-DETR (TorchScript) model.
+
+``RFDETRBase()`` + ``optimize_for_inference()`` rebuilds the checkpoint,
+deep-copies it into export mode and traces it on every process start. The
+traced module is what ``predict`` actually runs, so we save it once (with
+``class_names`` embedded) and later starts load it directly.
+
+Cache entries live under ``<MODEL_CACHE_DIR>/torchscript/<entry>/`` where the
+entry name hashes everything that makes a trace non-portable: model id, input
+resolution, rfdetr/torch versions, device and torch thread settings, plus a
+format version bumped whenever the wrapper's pre/post-processing changes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import supervision as sv
+
+from agent.processors.onnx_detector import postprocess, preprocess
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 1
+
+_MODEL_FILE = "model.pt"
+_META_FILE = "meta.json"
+_CLASS_NAMES_EXTRA = "class_names.json"
+
+
+def default_device() -> str:
+    """Device rfdetr will place the model on (same preference order as rfdetr)."""
+    import torch
+
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def _cache_key(model_id: str, resolution: int | None, device: str) -> dict[str, Any]:
+    import rfdetr
+    import torch
+
+    return {
+        "format": CACHE_FORMAT_VERSION,
+        "model_id": model_id,
+        "resolution": resolution,
+        "rfdetr": getattr(rfdetr, "__version__", "unknown"),
+        "torch": torch.__version__,
+        "device": device,
+        "threads": torch.get_num_threads(),
+        "interop_threads": torch.get_num_interop_threads(),
+    }
+
+
+def cache_entry_dir(root: str | Path, model_id: str, resolution: int | None, device: str) -> Path:
+    """Return the versioned cache directory for this model/settings combination."""
+    key = _cache_key(model_id, resolution, device)
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+    return Path(root) / "torchscript" / f"{model_id}-{resolution or 'native'}-{digest}"
+
+
+class TorchScriptRFDETR:
+    """Traced RF-DETR loaded straight from disk.
+
+    Exposes the same ``predict`` / ``class_names`` surface as ``RFDETRBase``.
+
+    Args:
+        module: The traced ``inference_model`` (returns ``(boxes, logits)``).
+        class_names: Mapping of class id -> name.
+        resolution: Square input size the module was traced at.
+        device: Torch device string the module lives on.
+    """
+
+    def __init__(
+        self, module: Any, class_names: dict[int, str], resolution: int, device: str
+    ) -> None:
+        self._module = module
+        self.class_names = class_names
+        self.resolution = resolution
+        self._device = device
+
+    def predict(self, img: np.ndarray, threshold: float = 0.5) -> sv.Detections:
+        """Run inference on an RGB24 numpy array."""
+        import torch
+
+        h, w = img.shape[:2]
+        x = torch.from_numpy(preprocess(img, self.resolution)).to(self._device)
+        with torch.inference_mode():
+            boxes, logits = self._module(x)
+        return postprocess(
+            boxes.float().cpu().numpy(), logits.float().cpu().numpy(), w, h, threshold
+        )
+
+
+def load_cached(
+    root: str | Path, model_id: str, resolution: int | None, device: str
+) -> TorchScriptRFDETR | None:
+    """Load a cached traced model, or return None on a miss / unreadable entry."""
+    import torch
+
+    entry = cache_entry_dir(root, model_id, resolution, device)
+    model_path = entry / _MODEL_FILE
+    if not model_path.exists():
+        return None
+
+    try:
+        meta = json.loads((entry / _META_FILE).read_text())
+        extra_files = {_CLASS_NAMES_EXTRA: ""}
+        module = torch.jit.load(str(model_path), map_location=device, _extra_files=extra_files)
+        module.eval()
+        class_names = {int(k): v for k, v in json.loads(extra_files[_CLASS_NAMES_EXTRA]).items()}
+    except Exception:
+        logger.exception("Ignoring unreadable model cache entry: %s", entry)
+        return None
+
+    logger.info("Loaded traced RF-DETR from cache: %s", entry)
+    return TorchScriptRFDETR(module, class_names, int(meta["resolution"]), device)
+
+
+def save_cached(root: str | Path, model: Any, model_id: str, resolution: int | None) -> Path | None:
+    """Persist an ``optimize_for_inference()``-d RF-DETR model's traced module.
+
+    Returns the cache entry directory, or None if the model isn't traced
+    (e.g. optimized without compile) and therefore can't be serialized.
+    """
+    import torch
+
+    module = getattr(model.model, "inference_model", None)
+    if not isinstance(module, torch.jit.ScriptModule):
+        logger.info("RF-DETR inference model is not traced; skipping disk cache")
+        return None
+
+    device = default_device()
+    entry = cache_entry_dir(root, model_id, resolution, device)
+    entry.mkdir(parents=True, exist_ok=True)
+
+    class_names = json.dumps({str(k): v for k, v in model.class_names.items()})
+    meta = {
+        **_cache_key(model_id, resolution, device),
+        "resolution": int(model.model.resolution),
+    }
+
+    # Write to temp names and rename so a crash never leaves a half-written entry
+    tmp_model = entry / f"{_MODEL_FILE}.tmp"
+    torch.jit.save(module, str(tmp_model), _extra_files={_CLASS_NAMES_EXTRA: class_names})
+    (entry / f"{_META_FILE}.tmp").write_text(json.dumps(meta, indent=2))
+    os.replace(entry / f"{_META_FILE}.tmp", entry / _META_FILE)
+    os.replace(tmp_model, entry / _MODEL_FILE)
+
+    logger.info("Saved traced RF-DETR to cache: %s", entry)
+    return entry
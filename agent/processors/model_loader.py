@@ -0,0 +1,118 @@
+"""RF-DETR model loading shared by the FastAPI pipelines and the agent processor.
+
+Picks the backend from the model id: PyTorch (``rfdetr-base`` / ``rfdetr-large``,
+optimized for inference) or ONNX Runtime (``*-onnx``, ``*-onnx-int8`` or a
+path to an ``.onnx`` file). Either way the returned model exposes
+``predict(img, threshold) -> sv.Detections`` and ``class_names``.
+
+PyTorch models are traced once and persisted via ``model_cache``; every
+loaded model gets a few warm-up inferences so the first real frame doesn't
+pay for kernel selection / JIT profiling.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+
+import numpy as np
+
+from agent.config import config
+from agent.processors import model_cache
+from agent.processors.onnx_detector import OnnxRFDETR, is_onnx_model_id
+
+logger = logging.getLogger(__name__)
+
+
+def load_rfdetr(model_id: str, resolution: int | None = None) -> dict[str, Any]:
+    """Load an RF-DETR model by id (blocking -- run in an executor).
+
+    Args:
+        model_id: Model id (see module docstring).
+        resolution: Input resolution override (multiple of 56). None = native.
+
+    Returns:
+        Dict with ``model`` and ``class_name_map`` (class id -> name).
+    """
+    if is_onnx_model_id(model_id):
+        model = OnnxRFDETR.from_model_id(
+            model_id,
+            cache_dir=config.model_cache_dir,
+            intra_op_threads=config.onnx_intra_op_threads,
+            resolution=resolution,
+        )
+        logger.info(
+            "RF-DETR ONNX model loaded: %s (%d classes, %dpx, threads=%s)",
+            model.onnx_path,
+            len(model.class_names),
+            model.resolution,
+            config.onnx_intra_op_threads or "auto",
+        )
+    else:
+        model = _load_torch(model_id, resolution)
+
+    _warm_up(model)
+    return {"model": model, "class_name_map": dict(model.class_names)}
+
+
+def _load_torch(model_id: str, resolution: int | None) -> Any:
+    """Load the traced model from the disk cache, or build, optimize and cache it."""
+    import torch
+
+    if config.torch_num_threads > 0:
+        torch.set_num_threads(config.torch_num_threads)
+
+    t0 = time.perf_counter()
+    device = model_cache.default_device()
+    if config.model_disk_cache:
+        cached = model_cache.load_cached(config.model_cache_dir, model_id, resolution, device)
+        if cached is not None:
+            logger.info(
+                "RF-DETR model loaded from disk cache in %.1fs (%d classes, %dpx)",
+                time.perf_counter() - t0,
+                len(cached.class_names),
+                cached.resolution,
+            )
+            return cached
+
+    kwargs = {"resolution": resolution} if resolution else {}
+    if model_id == "rfdetr-large":
+        from rfdetr.detr import RFDETRLarge
+
+        model = RFDETRLarge(**kwargs)
+    else:
+        from rfdetr.detr import RFDETRBase
+
+        model = RFDETRBase(**kwargs)
+
+    model.optimize_for_inference()
+    logger.info(
+        "RF-DETR model loaded in %.1fs (%d classes, %spx, optimized)",
+        time.perf_counter() - t0,
+        len(model.class_names),
+        resolution or "native",
+    )
+
+    if config.model_disk_cache:
+        try:
+            model_cache.save_cached(config.model_cache_dir, model, model_id, resolution)
+        except Exception:
+            logger.exception("Failed to persist RF-DETR model cache")
+
+    return model
+
+
+def _warm_up(model: Any) -> None:
+    """Run a few throwaway inferences to prime kernels before serving."""
+    if config.model_warmup_runs <= 0:
+        return
+    t0 = time.perf_counter()
+    blank = np.zeros((720, 1280, 3), dtype=np.uint8)
+    for _ in range(config.model_warmup_runs):
+        model.predict(blank, threshold=config.detection_confidence)
+    logger.info(
+        "RF-DETR warm-up done (%d runs, %.0fms)",
+        config.model_warmup_runs,
+        (time.perf_counter() - t0) * 1000,
+    )
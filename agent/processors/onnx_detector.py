@@ -0,0 +1,260 @@
+"""ONNX Runtime backend for RF-DETR (CPU-only hosts).
+
+Wraps an exported RF-DETR ONNX graph behind the same ``predict`` /
+``class_names`` surface as ``rfdetr.detr.RFDETRBase`` so callers get back
+``sv.Detections`` and never need to know which backend is running.
+
+Model ids understood by ``is_onnx_model_id``:
+
+* ``rfdetr-base-onnx`` / ``rfdetr-large-onnx`` -- FP32 export from the cache dir.
+* ``rfdetr-base-onnx-int8`` / ``rfdetr-large-onnx-int8`` -- dynamically
+  quantized INT8 export from the cache dir.
+* ``/path/to/model.onnx`` -- any exported RF-DETR graph on disk.
+
+Artifacts are produced once with ``python -m agent.export_onnx``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import supervision as sv
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+_ONNX_SUFFIX = "-onnx"
+_INT8_SUFFIX = "-onnx-int8"
+
+# ImageNet normalization used by RF-DETR's own predict()
+_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+# Matches rfdetr's PostProcess default (top-k over queries x classes)
+_NUM_SELECT = 300
+
+
+def is_onnx_model_id(model_id: str) -> bool:
+    """Return True if the model id refers to an ONNX export."""
+    return model_id.endswith(".onnx") or model_id.endswith((_ONNX_SUFFIX, _INT8_SUFFIX))
+
+
+def base_model_id(model_id: str) -> str:
+    """Strip the ONNX suffix: ``rfdetr-base-onnx-int8`` -> ``rfdetr-base``."""
+    for suffix in (_INT8_SUFFIX, _ONNX_SUFFIX):
+        if model_id.endswith(suffix):
+            return model_id[: -len(suffix)]
+    return model_id
+
+
+def artifact_paths(
+    model_id: str, cache_dir: str | Path, resolution: int | None = None
+) -> tuple[Path, Path]:
+    """Return ``(onnx_path, metadata_path)`` for a model id.
+
+    Explicit ``.onnx`` paths keep their metadata in a ``.json`` sidecar next
+    to the graph; cache-managed ids live under ``<cache_dir>/<base_id>/``.
+    Non-native input resolutions get their own graph (``model.448.onnx``).
+    """
+    if model_id.endswith(".onnx"):
+        onnx_path = Path(model_id)
+        if resolution is not None:
+            onnx_path = onnx_path.with_suffix(f".{resolution}.onnx")
+        return onnx_path, Path(model_id).with_suffix(".json")
+
+    model_dir = Path(cache_dir) / base_model_id(model_id)
+    stem = "model.int8" if model_id.endswith(_INT8_SUFFIX) else "model"
+    if resolution is not None:
+        stem = f"{stem}.{resolution}"
+    return model_dir / f"{stem}.onnx", model_dir / "metadata.json"
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def preprocess(img: np.ndarray, resolution: int) -> np.ndarray:
+    """RGB24 HxWx3 uint8 -> normalized 1x3xRxR float32 (RF-DETR input)."""
+    resized = Image.fromarray(img).resize((resolution, resolution), Image.Resampling.BILINEAR)
+    x = np.asarray(resized, dtype=np.float32) / 255.0
+    x = (x - _MEAN) / _STD
+    return np.ascontiguousarray(x.transpose(2, 0, 1)[np.newaxis])
+
+
+def postprocess(
+    boxes: np.ndarray, logits: np.ndarray, width: int, height: int, threshold: float
+) -> sv.Detections:
+    """Decode raw RF-DETR outputs into ``sv.Detections`` in pixel xyxy.
+
+    Mirrors rfdetr's PostProcess: sigmoid scores, top-k over queries x classes,
+    cxcywh -> xyxy scaled to the original image.
+
+    Args:
+        boxes: ``(1, num_queries, 4)`` normalized cxcywh.
+        logits: ``(1, num_queries, num_classes)`` class logits.
+    """
+    boxes = boxes[0]
+    prob = _sigmoid(logits[0])
+    num_classes = prob.shape[1]
+
+    flat = prob.reshape(-1)
+    k = min(_NUM_SELECT, flat.size)
+    top = np.argpartition(flat, -k)[-k:]
+    top = top[np.argsort(flat[top])[::-1]]
+    scores = flat[top]
+
+    keep = scores > threshold
+    top, scores = top[keep], scores[keep]
+    query_idx = top // num_classes
+    class_ids = top % num_classes
+
+    cx, cy, bw, bh = boxes[query_idx].T
+    xyxy = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+    xyxy *= np.array([width, height, width, height], dtype=np.float32)
+
+    return sv.Detections(
+        xyxy=xyxy.astype(np.float32).reshape(-1, 4),
+        confidence=scores.astype(np.float32),
+        class_id=class_ids.astype(int),
+    )
+
+
+class OnnxRFDETR:
+    """RF-DETR inference through ONNX Runtime.
+
+    Args:
+        onnx_path: Path to the exported ``.onnx`` graph.
+        class_names: Mapping of class id -> name (COCO ids for the stock models).
+        intra_op_threads: ONNX Runtime intra-op thread count. 0 lets ORT decide.
+    """
+
+    def __init__(
+        self,
+        onnx_path: str | Path,
+        class_names: dict[int, str],
+        intra_op_threads: int = 0,
+    ) -> None:
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+
+        self._session = ort.InferenceSession(
+            str(onnx_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        self.resolution = int(model_input.shape[-1])
+        self.class_names = class_names
+        self.onnx_path = Path(onnx_path)
+
+    @classmethod
+    def from_model_id(
+        cls,
+        model_id: str,
+        cache_dir: str | Path,
+        intra_op_threads: int = 0,
+        resolution: int | None = None,
+    ) -> OnnxRFDETR:
+        """Open a cached or explicit ONNX export by model id."""
+        onnx_path, metadata_path = artifact_paths(model_id, cache_dir, resolution)
+        if not onnx_path.exists():
+            hint = f" --resolution {resolution}" if resolution else ""
+            raise FileNotFoundError(
+                f"ONNX model not found: {onnx_path}. "
+                f"Run `python -m agent.export_onnx --model {base_model_id(model_id)}{hint}` first."
+            )
+
+        if metadata_path.exists():
+            metadata = json.loads(metadata_path.read_text())
+            class_names = {int(k): v for k, v in metadata["class_names"].items()}
+        else:
+            from rfdetr.util.coco_classes import COCO_CLASSES
+
+            logger.warning("No metadata next to %s, assuming COCO classes", onnx_path)
+            class_names = dict(COCO_CLASSES)
+
+        return cls(onnx_path, class_names, intra_op_threads=intra_op_threads)
+
+    def predict(self, img: np.ndarray, threshold: float = 0.5) -> sv.Detections:
+        """Run inference on an RGB24 numpy array.
+
+        Mirrors ``RFDETRBase.predict``: boxes are returned in pixel xyxy of the
+        original image, with confidences and class ids from the top-k queries.
+        """
+        h, w = img.shape[:2]
+        inputs = {self._input_name: preprocess(img, self.resolution)}
+        boxes, logits = self._session.run(None, inputs)
+        return postprocess(boxes, logits, w, h, threshold)
+
+
+def export_onnx(
+    model_id: str,
+    cache_dir: str | Path,
+    quantize: bool = False,
+    force: bool = False,
+    resolution: int | None = None,
+) -> dict[str, Any]:
+    """Export an RF-DETR checkpoint to ONNX (and optionally INT8) in ``cache_dir``.
+
+    Args:
+        model_id: ``rfdetr-base`` or ``rfdetr-large``.
+        cache_dir: Root of the local model cache.
+        quantize: Also write a dynamically quantized INT8 graph.
+        force: Overwrite existing artifacts.
+        resolution: Input resolution to export at. None = model native.
+
+    Returns:
+        Dict of written artifact paths (``onnx``, ``metadata`` and maybe ``int8``).
+    """
+    model_id = base_model_id(model_id)
+    onnx_path, metadata_path = artifact_paths(f"{model_id}{_ONNX_SUFFIX}", cache_dir, resolution)
+    int8_path, _ = artifact_paths(f"{model_id}{_INT8_SUFFIX}", cache_dir, resolution)
+    onnx_path.parent.mkdir(parents=True, exist_ok=True)
+
+    written: dict[str, Any] = {"onnx": onnx_path, "metadata": metadata_path}
+
+    if force or not onnx_path.exists():
+        kwargs = {"resolution": resolution} if resolution else {}
+        if model_id == "rfdetr-large":
+            from rfdetr.detr import RFDETRLarge
+
+            model = RFDETRLarge(**kwargs)
+        else:
+            from rfdetr.detr import RFDETRBase
+
+            model = RFDETRBase(**kwargs)
+
+        logger.info("Exporting %s to ONNX...", model_id)
+        with tempfile.TemporaryDirectory() as tmp:
+            model.export(output_dir=tmp, simplify=True, verbose=False)
+            shutil.move(str(Path(tmp) / "inference_model.onnx"), onnx_path)
+
+        metadata = {
+            "model_id": model_id,
+            "class_names": {str(k): v for k, v in model.class_names.items()},
+        }
+        metadata_path.write_text(json.dumps(metadata, indent=2))
+        logger.info("Wrote %s", onnx_path)
+    else:
+        logger.info("ONNX export already present: %s", onnx_path)
+
+    if quantize:
+        if force or not int8_path.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info("Quantizing %s to INT8...", onnx_path.name)
+            quantize_dynamic(str(onnx_path), str(int8_path), weight_type=QuantType.QInt8)
+            logger.info("Wrote %s", int8_path)
+        written["int8"] = int8_path
+
+    return written
@@ -0,0 +1,263 @@
+"""Client for the RF-DETR detector sidecar (``python -m agent.detector_sidecar``).
+
+With ``DETECTOR_BACKEND=sidecar`` every uvicorn worker talks to one sidecar
+process that owns the model, instead of loading its own copy. Requests go
+over a Unix domain socket as length-prefixed JSON; the frame itself is
+written into a ``multiprocessing.shared_memory`` segment that the sidecar
+reads in place, so only the segment name crosses the socket.
+
+``SidecarDetector`` is a drop-in ``DetectorService`` (same ``load`` /
+``predict`` / ``filter`` / ``stats`` surface), returned by ``get_detector``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+import supervision as sv
+
+from agent.processors.detector_service import DetectorService
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("!I")
+
+
+# ---- Wire protocol (shared with the sidecar) ----
+
+
+async def read_message(reader: asyncio.StreamReader) -> dict[str, Any]:
+    """Read one length-prefixed JSON message."""
+    header = await reader.readexactly(_HEADER.size)
+    (length,) = _HEADER.unpack(header)
+    return json.loads(await reader.readexactly(length))
+
+
+def write_message(writer: asyncio.StreamWriter, message: dict[str, Any]) -> None:
+    """Queue one length-prefixed JSON message (caller drains)."""
+    payload = json.dumps(message).encode()
+    writer.write(_HEADER.pack(len(payload)) + payload)
+
+
+def detections_to_wire(detections: sv.Detections) -> dict[str, Any]:
+    n = len(detections)
+    return {
+        "xyxy": np.asarray(detections.xyxy, dtype=np.float32).reshape(n, 4).tolist(),
+        "class_id": (
+            np.asarray(detections.class_id).tolist() if detections.class_id is not None else None
+        ),
+        "confidence": (
+            np.asarray(detections.confidence).tolist()
+            if detections.confidence is not None
+            else None
+        ),
+    }
+
+
+def detections_from_wire(data: dict[str, Any]) -> sv.Detections:
+    xyxy = np.asarray(data["xyxy"], dtype=np.float32).reshape(-1, 4)
+    return sv.Detections(
+        xyxy=xyxy,
+        class_id=np.asarray(data["class_id"], dtype=int) if data["class_id"] is not None else None,
+        confidence=(
+            np.asarray(data["confidence"], dtype=np.float32)
+            if data["confidence"] is not None
+            else None
+        ),
+    )
+
+
+# ---- Client ----
+
+
+class SidecarDetector(DetectorService):
+    """``DetectorService`` that forwards inference to the detector sidecar.
+
+    Args:
+        model_id: Model id the sidecar is expected to serve.
+        socket_path: Unix socket the sidecar listens on.
+        segments: Shared-memory frame buffers (= max requests in flight).
+        timeout_s: Per-request timeout.
+    """
+
+    def __init__(
+        self, model_id: str, socket_path: str, segments: int = 4, timeout_s: float = 10.0
+    ) -> None:
+        super().__init__(model_id)
+        self.socket_path = socket_path
+        self.timeout_s = timeout_s
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._read_task: asyncio.Task | None = None
+        self._connect_lock = asyncio.Lock()
+        self._pending_replies: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._class_names: dict[int, str] = {}
+        self._loaded: set[int | None] = set()
+
+        # Free frame buffers; None marks a slot whose segment is not created yet
+        self._free_segments: asyncio.Queue[shared_memory.SharedMemory | None] = asyncio.Queue()
+        for _ in range(segments):
+            self._free_segments.put_nowait(None)
+        self._segments: list[shared_memory.SharedMemory] = []
+
+        self._requests = 0
+        self._round_trip_ms_total = 0.0
+        self._batch_sizes_total = 0
+
+    # ---- Connection ----
+
+    async def _connect(self) -> None:
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            try:
+                self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+            except OSError as e:
+                raise RuntimeError(
+                    f"Detector sidecar not reachable at {self.socket_path} "
+                    f"(start it with `python -m agent.detector_sidecar`): {e}"
+                ) from e
+            self._read_task = asyncio.create_task(self._read_loop())
+            logger.info("Connected to detector sidecar at %s", self.socket_path)
+
+    async def _read_loop(self) -> None:
+        assert self._reader is not None
+        try:
+            while True:
+                message = await read_message(self._reader)
+                future = self._pending_replies.pop(message.get("id", 0), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            logger.warning("Detector sidecar connection closed")
+        finally:
+            self._writer = None
+            for future in self._pending_replies.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Detector sidecar disconnected"))
+            self._pending_replies.clear()
+
+    async def _request(self, message: dict[str, Any]) -> dict[str, Any]:
+        if self._writer is None:
+            await self._connect()
+        assert self._writer is not None
+
+        request_id = next(self._ids)
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending_replies[request_id] = future
+        write_message(self._writer, {**message, "id": request_id})
+        await self._writer.drain()
+        try:
+            reply = await asyncio.wait_for(future, timeout=self.timeout_s)
+        finally:
+            self._pending_replies.pop(request_id, None)
+        if "error" in reply:
+            raise RuntimeError(f"Detector sidecar error: {reply['error']}")
+        return reply
+
+    # ---- Shared memory ----
+
+    async def _acquire_segment(self, nbytes: int) -> shared_memory.SharedMemory:
+        segment = await self._free_segments.get()
+        if segment is not None and segment.size >= nbytes:
+            return segment
+        if segment is not None:
+            self._segments.remove(segment)
+            segment.close()
+            segment.unlink()
+        segment = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._segments.append(segment)
+        return segment
+
+    # ---- DetectorService surface ----
+
+    async def load(self, resolution: int | None = None) -> dict[str, Any]:
+        """Ask the sidecar to load the model at ``resolution`` (no local model)."""
+        if resolution not in self._loaded:
+            reply = await self._request({"op": "load", "resolution": resolution})
+            self._class_names = {int(k): v for k, v in reply["class_name_map"].items()}
+            self._loaded.add(resolution)
+        return {"model": None, "class_name_map": self._class_names}
+
+    @property
+    def class_name_map(self) -> dict[int, str]:
+        return self._class_names
+
+    def is_loaded(self, resolution: int | None = None) -> bool:
+        return resolution in self._loaded
+
+    async def predict_batch(
+        self,
+        imgs: list[np.ndarray],
+        threshold: float | None = None,
+        resolution: int | None = None,
+    ) -> tuple[list[sv.Detections], float]:
+        """Send frames to the sidecar (which batches across all callers)."""
+        results = await asyncio.gather(
+            *(self._predict_one(img, threshold, resolution) for img in imgs)
+        )
+        return [r[0] for r in results], max((r[1] for r in results), default=0.0)
+
+    async def _predict_one(
+        self, img: np.ndarray, threshold: float | None, resolution: int | None
+    ) -> tuple[sv.Detections, float]:
+        img = np.ascontiguousarray(img, dtype=np.uint8)
+        segment = await self._acquire_segment(img.nbytes)
+        start = time.perf_counter()
+        self._pending += 1
+        self._max_pending = max(self._max_pending, self._pending)
+        try:
+            np.ndarray(img.shape, dtype=np.uint8, buffer=segment.buf)[:] = img
+            reply = await self._request(
+                {
+                    "op": "predict",
+                    "shm": segment.name,
+                    "shape": list(img.shape),
+                    "threshold": threshold,
+                    "resolution": resolution,
+                }
+            )
+        finally:
+            self._pending -= 1
+            self._free_segments.put_nowait(segment)
+
+        self._requests += 1
+        self._inferences += 1
+        self._round_trip_ms_total += (time.perf_counter() - start) * 1000
+        self._inference_ms_total += reply["inference_ms"]
+        self._batch_sizes_total += reply.get("batch_size", 1)
+        return detections_from_wire(reply["detections"]), reply["inference_ms"]
+
+    def stats(self) -> dict[str, Any]:
+        n = self._requests
+        return {
+            **super().stats(),
+            "backend": "sidecar",
+            "socket": self.socket_path,
+            "connected": self._writer is not None,
+            "loaded_resolutions": [r or "native" for r in self._loaded],
+            "avg_round_trip_ms": round(self._round_trip_ms_total / n, 1) if n else None,
+            "avg_batch_size": round(self._batch_sizes_total / n, 2) if n else None,
+            "shm_segments": len(self._segments),
+        }
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._read_task is not None:
+            self._read_task.cancel()
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments.clear()
+        await super().close()
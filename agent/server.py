@@ -3,33 +3,58 @@
 Endpoints:
 - POST /api/start           — Download a YouTube video and return session info
 - POST /api/profile-chat    — Text-based profile onboarding (legacy)
+- POST /api/profile-chat/stream — Same, streamed as server-sent events (text, then audio)
 - POST /api/agent-token     — Get a Cartesia access token for the voice agent
 - POST /api/extract-profile — Extract structured profile from conversation transcript
 - POST /api/call-transcript    — Fetch latest Cartesia call transcript + extract profile
 - WS   /ws/{session_id}     — Stream commentary (text + TTS audio) over WebSocket
+                              (live, or a precomputed script synced to playback)
 - GET  /api/health           — Health check
+- GET  /api/metrics          — Runtime metrics (sessions, detection, counters, gauges)
 """
 
 from __future__ import annotations
 
+import asyncio
 import base64
 import json as json_module
 import logging
+import math
 import re
+import time
 import uuid
+from collections.abc import AsyncIterator
 from pathlib import Path
 
 from anthropic import AsyncAnthropic
 from cartesia import AsyncCartesia
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
+from agent import metrics
+from agent.audio_profiles import AudioProfile, audio_stats, resolve_profile
 from agent.config import config
-from agent.pipeline import CommentaryPipeline, LiveCommentaryPipeline, get_or_load_model
+from agent.model_router import get_model_router
+from agent.outbound import Priority, get_limiter
+from agent.pipeline import VIEWER_AUDIO_MAGIC, CommentaryPipeline, LiveCommentaryPipeline
+from agent.precompute import start_precompute, stream_script
+from agent.processors.adaptive_resolution import parse_resolutions
+from agent.processors.detector_service import close_detectors, get_detector
+from agent.session_store import FileSession, make_session_store
+from agent.sessions import Admission, SessionManager
+from agent.tts_stream import tts_latency
 from agent.user_profile import PERSONAS, UserProfile
-from agent.video_download import VideoInfo, download_video
+from agent.video_download import (
+    analysis_path,
+    download_state,
+    download_video,
+    is_downloading,
+    pin_video,
+    unpin_video,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -43,11 +68,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory session store: session_id -> VideoInfo
-_sessions: dict[str, VideoInfo] = {}
+# Sessions, running pipelines, idle eviction and admission control
+sessions = SessionManager(
+    ttl_s=config.session_ttl_s,
+    max_pipelines={"file": config.max_file_pipelines, "live": config.max_live_pipelines},
+    overflow=config.admission_overflow,
+    retry_after_s=config.admission_retry_after_s,
+    store=make_session_store(config.session_store, config.session_ttl_s, config.session_store_url),
+)
 
-# Active pipelines for cleanup
-_active_pipelines: dict[str, CommentaryPipeline] = {}
+# Fire-and-forget startup work (referenced so it isn't garbage collected)
+_background_tasks: set[asyncio.Task] = set()
 
 
 # ---- Models ----
@@ -55,6 +86,10 @@ _active_pipelines: dict[str, CommentaryPipeline] = {}
 
 class StartRequest(BaseModel):
     url: str
+    sport: str = "soccer"
+    persona: str | None = None  # key into PERSONAS
+    profile: dict | None = None  # custom profile (UserProfile.to_dict shape)
+    precompute: bool | None = None  # None = config.precompute_mode
 
 
 class StartResponse(BaseModel):
@@ -62,6 +97,9 @@ class StartResponse(BaseModel):
     title: str
     duration: int
     video_url: str
+    precompute: bool = False
+    degraded: bool = False  # over capacity: commentary runs without detection
+    downloading: bool = False  # video still growing; progress arrives over /ws/{session_id}
 
 
 # ---- Endpoints ----
@@ -76,20 +114,40 @@ async def startup():
     # Mount videos directory for static serving
     app.mount("/videos", StaticFiles(directory=str(videos_dir)), name="videos")
 
+    sessions.start()
+
     # Skip model warmup when detection is disabled (faster startup)
     if not config.skip_detection:
         logger.info("Starting RF-DETR model warmup...")
-        await get_or_load_model()
+        detector = get_detector()
+        await detector.load()
+        if config.adaptive_resolution:
+            # Step-down variants load and warm up off the inference thread
+            ladder = [None, *parse_resolutions(config.detection_resolutions)]
+            task = asyncio.create_task(detector.preload(ladder))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
         logger.info("RF-DETR model ready. Server is live.")
     else:
         logger.info("Detection skipped — frames go straight to Claude. Server is live.")
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    await sessions.store.close()
+    await close_detectors()
+
+
 @app.get("/api/health")
 async def health():
     return {"status": "ok"}
 
 
+@app.get("/api/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
+
 # ---- Cartesia Voice Agent Token ----
 
 
@@ -165,20 +223,19 @@ _PROFILE_COMPLETE_RE = re.compile(
 
 class ProfileChatRequest(BaseModel):
     messages: list[dict]  # [{"role": "user"|"assistant", "text": str}, ...]
+    audio_profile: str | None = None  # mp3, mp3_low, pcm or opus (default: AUDIO_PROFILE)
 
 
 class ProfileChatResponse(BaseModel):
     text: str
     audio: str | None = None
+    audio_format: str | None = None  # "mp3", "wav" or "ogg"
     done: bool = False
     profile: dict | None = None
 
 
-@app.post("/api/profile-chat", response_model=ProfileChatResponse)
-async def profile_chat(req: ProfileChatRequest):
-    """Drive a conversational onboarding flow with Danny to build a UserProfile."""
-
-    # Build Anthropic messages from the conversation history.
+def _profile_chat_messages(req: ProfileChatRequest) -> list[dict]:
+    """Build Anthropic messages from the onboarding conversation history."""
     anthropic_messages: list[dict] = []
     for msg in req.messages:
         role = msg.get("role", "user")
@@ -189,63 +246,126 @@ async def profile_chat(req: ProfileChatRequest):
     # First call (empty history) — seed with a greeting trigger.
     if not anthropic_messages:
         anthropic_messages = [{"role": "user", "content": "Hey! I just tuned in."}]
+    return anthropic_messages
+
+
+def _parse_profile_reply(raw_text: str) -> tuple[str, dict | None]:
+    """Split Danny's reply into display text and the parsed profile (if complete)."""
+    profile_match = _PROFILE_COMPLETE_RE.search(raw_text)
+
+    # The text the user sees/hears should not contain the raw JSON block.
+    display_text = _PROFILE_COMPLETE_RE.sub("", raw_text).strip()
+    if not profile_match:
+        return display_text, None
+
+    try:
+        extracted = json_module.loads(profile_match.group(1))
+    except json_module.JSONDecodeError:
+        extracted = {}
+
+    experience_key = extracted.get("experience", "casual").lower()
+    style_key = extracted.get("style", "balanced").lower()
+
+    profile_dict = {
+        "name": extracted.get("name", "Fan"),
+        "favorite_team": extracted.get("favorite_team"),
+        "expertise_slider": _EXPERIENCE_TO_EXPERTISE.get(experience_key, 40),
+        "hot_take_slider": _STYLE_TO_HOT_TAKE.get(style_key, 25),
+        "favorite_players": extracted.get("favorite_players", []),
+        "voice_key": "danny",
+    }
+    return display_text, profile_dict
+
+
+async def _danny_tts_stream(
+    cartesia: AsyncCartesia, text: str, profile: AudioProfile
+) -> AsyncIterator[bytes]:
+    """Stream Danny's voice for ``text`` from Cartesia (synthesized in an onboarding outbound slot).
+
+    MP3 profiles are forwarded chunk by chunk as Cartesia produces them;
+    PCM-based profiles are wrapped / encoded once the text is synthesized and
+    yielded as a single clip.
+    """
+    nbytes = 0
+    pcm_chunks: list[bytes] = []
+    synth_ms = 0.0
+    # Chunks are buffered so the Cartesia slot is released when synthesis
+    # ends, never held while a slow client consumes them
+    chunks: asyncio.Queue[bytes | Exception | None] = asyncio.Queue()
+
+    async def read_cartesia() -> None:
+        nonlocal synth_ms
+        try:
+            async with get_limiter("cartesia").slot(Priority.ONBOARDING):
+                start = time.perf_counter()
+                first = True
+                async for chunk in cartesia.tts.bytes(
+                    model_id="sonic-3",
+                    transcript=text,
+                    voice={"mode": "id", "id": config.voice_id_danny},
+                    output_format=profile.output_format(),
+                    language="en",
+                    generation_config={"speed": 1.1},
+                ):
+                    if first:
+                        tts_latency.record("http", (time.perf_counter() - start) * 1000)
+                        first = False
+                    chunks.put_nowait(chunk)
+                synth_ms = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            chunks.put_nowait(e)
+        else:
+            chunks.put_nowait(None)
+
+    reader = asyncio.create_task(read_cartesia())
+    try:
+        while (chunk := await chunks.get()) is not None:
+            if isinstance(chunk, Exception):
+                raise chunk
+            if profile.pcm_source:
+                pcm_chunks.append(chunk)
+            else:
+                nbytes += len(chunk)
+                yield chunk
+    finally:
+        if not reader.done():
+            reader.cancel()
+
+    encode_start = time.perf_counter()
+    clip = await profile.encode(b"".join(pcm_chunks)) if pcm_chunks else b""
+    audio_stats.record(
+        profile.name, nbytes + len(clip), synth_ms, (time.perf_counter() - encode_start) * 1000
+    )
+    if clip:
+        yield clip
+
+
+@app.post("/api/profile-chat", response_model=ProfileChatResponse)
+async def profile_chat(req: ProfileChatRequest):
+    """Drive a conversational onboarding flow with Danny to build a UserProfile."""
+    anthropic_messages = _profile_chat_messages(req)
 
     # Call Claude to generate Danny's next response.
     anthropic = AsyncAnthropic(api_key=config.anthropic_api_key)
-    llm_response = await anthropic.messages.create(
-        model="claude-sonnet-4-5-20250929",
+    llm_response = await get_model_router().create(
+        anthropic,
+        "onboarding",
         max_tokens=300,
         system=_PROFILE_SYSTEM_PROMPT,
         messages=anthropic_messages,
     )
 
     raw_text: str = llm_response.content[0].text
-
-    # Check if Danny decided the profile is complete.
-    profile_match = _PROFILE_COMPLETE_RE.search(raw_text)
-    done = profile_match is not None
-    profile_dict: dict | None = None
-
-    # The text the user sees/hears should not contain the raw JSON block.
-    display_text = _PROFILE_COMPLETE_RE.sub("", raw_text).strip()
-
-    if profile_match:
-        try:
-            extracted = json_module.loads(profile_match.group(1))
-        except json_module.JSONDecodeError:
-            extracted = {}
-
-        experience_key = extracted.get("experience", "casual").lower()
-        style_key = extracted.get("style", "balanced").lower()
-
-        profile_dict = {
-            "name": extracted.get("name", "Fan"),
-            "favorite_team": extracted.get("favorite_team"),
-            "expertise_slider": _EXPERIENCE_TO_EXPERTISE.get(experience_key, 40),
-            "hot_take_slider": _STYLE_TO_HOT_TAKE.get(style_key, 25),
-            "favorite_players": extracted.get("favorite_players", []),
-            "voice_key": "danny",
-        }
+    display_text, profile_dict = _parse_profile_reply(raw_text)
 
     # Synthesize Danny's response via Cartesia TTS.
     audio_b64: str | None = None
+    audio_profile = resolve_profile(req.audio_profile)
     if display_text and config.cartesia_api_key:
         try:
             cartesia = AsyncCartesia(api_key=config.cartesia_api_key)
-            tts_response = cartesia.tts.bytes(
-                model_id="sonic-3",
-                transcript=display_text,
-                voice={"mode": "id", "id": config.voice_id_danny},
-                output_format={
-                    "container": "mp3",
-                    "sample_rate": 44100,
-                    "bit_rate": 128000,
-                },
-                language="en",
-                generation_config={"speed": 1.1},
-            )
             audio_chunks: list[bytes] = []
-            async for chunk in tts_response:
+            async for chunk in _danny_tts_stream(cartesia, display_text, audio_profile):
                 audio_chunks.append(chunk)
             audio_bytes = b"".join(audio_chunks)
             audio_b64 = base64.b64encode(audio_bytes).decode()
@@ -256,11 +376,198 @@ async def profile_chat(req: ProfileChatRequest):
     return ProfileChatResponse(
         text=display_text,
         audio=audio_b64,
-        done=done,
+        audio_format=audio_profile.format if audio_b64 else None,
+        done=profile_dict is not None,
         profile=profile_dict,
     )
 
 
+# ---- Profile Onboarding Chat (streaming) ----
+
+_PROFILE_OPEN_TAG = "[PROFILE_COMPLETE]"
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+class _ProfileBlockFilter:
+    """Pass streamed text through, withholding the ``[PROFILE_COMPLETE]`` block.
+
+    A delta that ends in a possible prefix of the opening tag (e.g. ``"[PRO"``)
+    is held back until the next delta decides it; everything from the tag on
+    is never released.
+    """
+
+    def __init__(self) -> None:
+        self._held = ""
+        self._in_block = False
+
+    def feed(self, delta: str) -> str:
+        if self._in_block:
+            return ""
+        text = self._held + delta
+        self._held = ""
+        tag_at = text.find(_PROFILE_OPEN_TAG)
+        if tag_at >= 0:
+            self._in_block = True
+            return text[:tag_at]
+        # Hold back the longest suffix that could still grow into the tag
+        for n in range(min(len(_PROFILE_OPEN_TAG) - 1, len(text)), 0, -1):
+            if _PROFILE_OPEN_TAG.startswith(text[-n:]):
+                self._held = text[-n:]
+                return text[:-n]
+        return text
+
+    def finish(self) -> str:
+        """Release held text once the stream ends without completing the tag."""
+        held, self._held = ("" if self._in_block else self._held), ""
+        return held
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json_module.dumps(data)}\n\n"
+
+
+@app.post("/api/profile-chat/stream")
+async def profile_chat_stream(req: ProfileChatRequest):
+    """Streaming ``/api/profile-chat`` over server-sent events.
+
+    Events, in order of arrival:
+
+    * ``text``    -- ``{"delta": str}`` display text as Claude produces it
+    * ``audio``   -- ``{"seq": int, "audio": base64, "format": str}`` Danny's
+      voice in the request's ``audio_profile``, synthesized as soon as each
+      sentence is complete; MP3 sentences arrive as one or more chunks of a
+      separate MP3 stream, PCM-based profiles as one WAV / Ogg clip each
+    * ``done``    -- ``{"text", "done", "profile"}`` same fields as the JSON endpoint
+    * ``error``   -- ``{"message": str}`` if Claude fails mid-stream
+    """
+    anthropic_messages = _profile_chat_messages(req)
+    audio_profile = resolve_profile(req.audio_profile)
+
+    async def events():
+        text_filter = _ProfileBlockFilter()
+        raw_parts: list[str] = []
+        pending_sentence = ""
+
+        # Sentences go to TTS in order on a background task while text keeps
+        # streaming; audio events are interleaved as chunks become available.
+        tts_enabled = bool(config.cartesia_api_key)
+        sentences: asyncio.Queue[str | None] = asyncio.Queue()
+        out: asyncio.Queue[str | None] = asyncio.Queue()
+
+        async def synthesize() -> None:
+            cartesia = AsyncCartesia(api_key=config.cartesia_api_key)
+            seq = 0
+            try:
+                while (sentence := await sentences.get()) is not None:
+                    try:
+                        async for chunk in _danny_tts_stream(cartesia, sentence, audio_profile):
+                            await out.put(
+                                _sse(
+                                    "audio",
+                                    {
+                                        "seq": seq,
+                                        "audio": base64.b64encode(chunk).decode(),
+                                        "format": audio_profile.format,
+                                    },
+                                )
+                            )
+                            seq += 1
+                    except Exception:
+                        logger.exception("Cartesia TTS failed during profile chat")
+            finally:
+                await cartesia.close()
+
+        tts_task = asyncio.create_task(synthesize()) if tts_enabled else None
+
+        def queue_sentences(final: bool) -> None:
+            nonlocal pending_sentence
+            parts = _SENTENCE_END_RE.split(pending_sentence)
+            pending_sentence = "" if final else parts.pop()
+            for part in parts:
+                if part.strip():
+                    sentences.put_nowait(part.strip())
+
+        async def drain_audio() -> AsyncIterator[str]:
+            while not out.empty():
+                item = out.get_nowait()
+                if item is not None:
+                    yield item
+
+        router = get_model_router()
+        model = router.pick("onboarding")
+        # Claude's deltas are buffered on a queue so the onboarding slot is
+        # released as soon as the stream finishes, never held across writes to
+        # a slow SSE client.
+        deltas: asyncio.Queue[str | Exception | None] = asyncio.Queue()
+
+        async def read_claude() -> None:
+            try:
+                anthropic = AsyncAnthropic(api_key=config.anthropic_api_key)
+                async with (
+                    get_limiter("anthropic").slot(Priority.ONBOARDING),
+                    anthropic.messages.stream(
+                        model=model,
+                        max_tokens=300,
+                        system=_PROFILE_SYSTEM_PROMPT,
+                        messages=anthropic_messages,
+                    ) as stream,
+                ):
+                    llm_start = time.perf_counter()
+                    async for delta in stream.text_stream:
+                        deltas.put_nowait(delta)
+                router.record("onboarding", model, (time.perf_counter() - llm_start) * 1000)
+            except Exception as e:
+                router.record_failure("onboarding", model, e)
+                deltas.put_nowait(e)
+            else:
+                deltas.put_nowait(None)
+
+        llm_task = asyncio.create_task(read_claude())
+        try:
+            while (delta := await deltas.get()) is not None:
+                if isinstance(delta, Exception):
+                    raise delta
+                raw_parts.append(delta)
+                visible = text_filter.feed(delta)
+                if visible:
+                    yield _sse("text", {"delta": visible})
+                    if tts_enabled:
+                        pending_sentence += visible
+                        queue_sentences(final=False)
+                async for event in drain_audio():
+                    yield event
+
+            visible = text_filter.finish()
+            if visible:
+                yield _sse("text", {"delta": visible})
+                pending_sentence += visible
+            if tts_task is not None:
+                queue_sentences(final=True)
+                sentences.put_nowait(None)
+                tts_task.add_done_callback(lambda _: out.put_nowait(None))
+                while (event := await out.get()) is not None:
+                    yield event
+
+            display_text, profile_dict = _parse_profile_reply("".join(raw_parts))
+            yield _sse(
+                "done",
+                {"text": display_text, "done": profile_dict is not None, "profile": profile_dict},
+            )
+        except Exception as e:
+            logger.exception("Streaming profile chat failed")
+            yield _sse("error", {"message": str(e)})
+        finally:
+            for task in (llm_task, tts_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ---- Profile Extraction (for Cartesia Voice Agent flow) ----
 
 _EXTRACT_PROMPT = """\
@@ -288,8 +595,9 @@ class ExtractProfileResponse(BaseModel):
 async def extract_profile(req: ExtractProfileRequest):
     """Extract a structured UserProfile from a voice conversation transcript."""
     anthropic = AsyncAnthropic(api_key=config.anthropic_api_key)
-    llm_response = await anthropic.messages.create(
-        model="claude-sonnet-4-5-20250929",
+    llm_response = await get_model_router().create(
+        anthropic,
+        "extraction",
         max_tokens=200,
         system=_EXTRACT_PROMPT,
         messages=[{"role": "user", "content": req.transcript}],
@@ -390,8 +698,9 @@ async def call_transcript(req: CallTranscriptRequest):
 
     # 3. Extract structured profile via Claude
     anthropic = AsyncAnthropic(api_key=config.anthropic_api_key)
-    llm_response = await anthropic.messages.create(
-        model="claude-sonnet-4-5-20250929",
+    llm_response = await get_model_router().create(
+        anthropic,
+        "extraction",
         max_tokens=200,
         system=_EXTRACT_PROMPT,
         messages=[{"role": "user", "content": transcript_text}],
@@ -426,14 +735,43 @@ async def call_transcript(req: CallTranscriptRequest):
 @app.post("/api/start", response_model=StartResponse)
 async def start_commentary(req: StartRequest):
     """Download a YouTube video and return a session for WebSocket commentary."""
+    precompute = config.precompute_mode if req.precompute is None else req.precompute
+    # Precompute sessions run no file pipeline; their chunk pipelines are capped
+    # process-wide by max_precompute_pipelines instead
+    admission = Admission.ADMIT if precompute else sessions.admit("file")
+    if admission is Admission.REJECT:
+        raise HTTPException(
+            status_code=503,
+            detail="Commentary capacity reached, try again shortly.",
+            headers={"Retry-After": str(sessions.retry_after_s)},
+        )
+
     video = await download_video(
         url=req.url,
         output_dir=config.videos_dir,
         max_duration=config.max_video_duration,
+        quota_bytes=config.videos_quota_bytes,
+        progressive=config.progressive_download,
+        progressive_min_bytes=config.progressive_min_bytes,
+        proxy_max_height=config.analysis_proxy_height,
+        proxy_fragments=config.proxy_fragment_downloads,
     )
 
     session_id = str(uuid.uuid4())[:8]
-    _sessions[session_id] = video
+    persona = req.persona if req.persona in PERSONAS else None
+    session = FileSession(
+        video=video,
+        sport=req.sport,
+        persona=persona,
+        profile=req.profile,
+        precompute=precompute,
+        degraded=admission is Admission.DEGRADE,
+    )
+    await sessions.add_session(session_id, session)
+
+    if precompute:
+        # Start generating the script now so it is (partly) ready when the client connects
+        start_precompute(video, session.sport, session.persona)
 
     logger.info("Session %s created for: %s (%ds)", session_id, video.title, video.duration)
 
@@ -442,6 +780,9 @@ async def start_commentary(req: StartRequest):
         title=video.title,
         duration=video.duration,
         video_url=f"/videos/{video.path.name}",
+        precompute=precompute,
+        downloading=is_downloading(video.video_id),
+        degraded=session.degraded,
     )
 
 
@@ -449,19 +790,33 @@ async def start_commentary(req: StartRequest):
 # NOTE: /ws/live must be registered BEFORE /ws/{session_id} so the literal
 # path matches before the path-parameter route captures "live" as a session_id.
 
-# Active live pipelines for cleanup
-_active_live_pipelines: dict[str, LiveCommentaryPipeline] = {}
-
 
 @app.websocket("/ws/live")
 async def live_commentary_ws(ws: WebSocket):
-    """WebSocket for Chrome Extension: receives JPEG frames, streams commentary back."""
+    """WebSocket for Chrome Extension: receives JPEG frames, streams commentary back.
+
+    Binary messages are JPEG frames, or viewer microphone audio when prefixed
+    with ``VIEWER_AUDIO_MAGIC`` (transcribed server-side; questions are
+    answered speculatively from stable partial transcripts).
+    """
     await ws.accept()
     session_id = str(uuid.uuid4())[:8]
     logger.info("Live WebSocket connected: session %s", session_id)
 
-    pipeline = LiveCommentaryPipeline(ws=ws, skip_detection=config.skip_detection, sport="soccer")
-    _active_live_pipelines[session_id] = pipeline
+    admission = sessions.admit("live")
+    if admission is Admission.REJECT:
+        # 1013 = "Try Again Later"
+        await ws.close(code=1013, reason=f"At capacity, retry in {sessions.retry_after_s}s")
+        return
+    degraded = admission is Admission.DEGRADE
+
+    pipeline = LiveCommentaryPipeline(
+        ws=ws,
+        skip_detection=config.skip_detection or degraded,
+        sport="soccer",
+        session_id=session_id,
+    )
+    sessions.register_pipeline("live", session_id, pipeline, degraded=degraded)
 
     try:
         await pipeline.initialize()
@@ -472,9 +827,12 @@ async def live_commentary_ws(ws: WebSocket):
             if message.get("type") == "websocket.disconnect":
                 break
 
-            # Binary message = JPEG frame
+            # Binary message = viewer audio (VIEWER_AUDIO_MAGIC prefix) or JPEG frame
             if "bytes" in message and message["bytes"]:
-                await pipeline.process_frame(message["bytes"])
+                if message["bytes"][:4] == VIEWER_AUDIO_MAGIC:
+                    await pipeline.process_viewer_audio(message["bytes"])
+                else:
+                    await pipeline.process_frame(message["bytes"])
 
             # Text message = JSON command
             elif "text" in message and message["text"]:
@@ -500,7 +858,22 @@ async def live_commentary_ws(ws: WebSocket):
 
                 elif msg_type == "frame_ts":
                     # Capture timestamp from frontend for sync with delayed playback
-                    pipeline._last_frame_ts = data.get("ts", 0.0)
+                    pipeline.set_frame_ts(data.get("ts", 0.0))
+
+                elif msg_type == "set_audio_profile":
+                    # Negotiated on connect: mp3, mp3_low, pcm or opus
+                    await pipeline.set_audio_profile(data.get("profile"))
+
+                elif msg_type == "set_delay":
+                    # Client's playback delay behind capture (commentary deadline)
+                    try:
+                        delay_ms = float(data.get("ms", config.pipeline_delay_ms))
+                    except (TypeError, ValueError):
+                        delay_ms = math.nan
+                    if math.isfinite(delay_ms):
+                        pipeline.set_playback_delay(delay_ms)
+                    else:
+                        logger.warning("Invalid playback delay: %r", data.get("ms"))
 
                 elif msg_type == "set_sport":
                     # Switch sport mid-session
@@ -508,6 +881,10 @@ async def live_commentary_ws(ws: WebSocket):
                     pipeline.set_sport(sport)
                     await ws.send_json({"type": "status", "message": f"Sport set: {sport}"})
 
+                elif msg_type == "audio_end":
+                    # Viewer released the mic: finalize the speech transcript
+                    await pipeline.end_viewer_audio()
+
                 elif msg_type == "user_question":
                     # Viewer asked a question via voice input
                     question = data.get("text", "")
@@ -529,7 +906,7 @@ async def live_commentary_ws(ws: WebSocket):
         logger.exception("Error in live commentary session %s", session_id)
     finally:
         await pipeline.stop()
-        _active_live_pipelines.pop(session_id, None)
+        sessions.unregister_pipeline("live", session_id, pipeline)
         logger.info("Live pipeline stopped: session %s", session_id)
 
 
@@ -539,14 +916,20 @@ async def live_commentary_ws(ws: WebSocket):
 @app.websocket("/ws/{session_id}")
 async def commentary_ws(ws: WebSocket, session_id: str):
     """WebSocket endpoint that streams commentary for a session."""
-    video = _sessions.get(session_id)
-    if video is None:
+    try:
+        session = await sessions.get_session(session_id)
+    except (ConnectionError, OSError, asyncio.TimeoutError):
+        logger.exception("Session store unavailable for session %s", session_id)
+        # 1013 = "Try Again Later"
+        await ws.close(code=1013, reason="Session store unavailable")
+        return
+    if session is None:
         await ws.close(code=4004, reason="Session not found")
         return
 
     # If there's already an active pipeline for this session (e.g. React StrictMode
     # double-mount), stop it before starting a new one.
-    existing = _active_pipelines.pop(session_id, None)
+    existing = sessions.pop_pipeline("file", session_id)
     if existing is not None:
         logger.info("Replacing existing pipeline for session %s", session_id)
         await existing.stop()
@@ -554,19 +937,79 @@ async def commentary_ws(ws: WebSocket, session_id: str):
     await ws.accept()
     logger.info("WebSocket connected for session %s", session_id)
 
-    pipeline = CommentaryPipeline(ws=ws, video_path=video.path)
-    _active_pipelines[session_id] = pipeline
+    degraded = session.degraded
+    if not session.precompute:
+        admission = sessions.admit("file")
+        if admission is Admission.REJECT:
+            # 1013 = "Try Again Later"
+            await ws.close(code=1013, reason=f"At capacity, retry in {sessions.retry_after_s}s")
+            return
+        degraded = degraded or admission is Admission.DEGRADE
+
+    # Keep the video (and its scripts / timelines) out of quota eviction while in use
+    pin_video(session.video)
+    try:
+        await _run_file_session(ws, session_id, session, degraded)
+    finally:
+        unpin_video(session.video)
+
+
+async def _run_file_session(
+    ws: WebSocket, session_id: str, session: FileSession, degraded: bool
+) -> None:
+    """Stream commentary for an accepted file session (precomputed or live)."""
+    progress_task = asyncio.create_task(_send_download_progress(ws, session.video.video_id))
+
+    if session.precompute:
+        job = start_precompute(session.video, session.sport, session.persona)
+        try:
+            await stream_script(ws, job)
+        finally:
+            progress_task.cancel()
+            logger.info("Precomputed stream ended for session %s", session_id)
+        return
+
+    if session.profile:
+        profile = UserProfile.from_dict(session.profile)
+    else:
+        profile = PERSONAS.get(session.persona) if session.persona else None
+    pipeline = CommentaryPipeline(
+        ws=ws,
+        video_path=analysis_path(session.video),
+        profile=profile,
+        sport=session.sport,
+        skip_detection=degraded,
+        session_id=session_id,
+        video_id=session.video.video_id,
+    )
+    sessions.register_pipeline("file", session_id, pipeline, degraded=degraded)
 
     try:
         await pipeline.run()
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected for session %s", session_id)
     finally:
+        progress_task.cancel()
         await pipeline.stop()
-        _active_pipelines.pop(session_id, None)
+        sessions.unregister_pipeline("file", session_id, pipeline)
         logger.info("Pipeline stopped for session %s", session_id)
 
 
+async def _send_download_progress(ws: WebSocket, video_id: str) -> None:
+    """Send download_progress events once a second while the video is still downloading."""
+    state = download_state(video_id)
+    if state is None:
+        return
+    try:
+        while True:
+            await ws.send_json(state.progress())
+            if state.done:
+                return
+            await asyncio.sleep(1.0)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+
+
 # ---- Entry point ----
 
 if __name__ == "__main__":
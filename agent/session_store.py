@@ -0,0 +1,341 @@
+"""Pluggable storage for ``/api/start`` session metadata.
+
+A session created by one uvicorn worker must be visible to whichever worker
+accepts ``/ws/{session_id}``. ``SessionStore`` is the interface; two backends:
+
+* ``InMemorySessionStore`` -- single-process default.
+* ``RedisSessionStore`` -- any server speaking the Redis protocol (RESP),
+  through the tiny asyncio client below, so several workers or nodes behind a
+  load balancer share sessions. Keys expire after the session TTL, refreshed
+  on every read.
+
+Only metadata is shared (video, sport, persona / profile); pipelines, the
+detector and downloads stay local to the worker that runs them, and the
+videos directory is expected to be shared storage.
+"""
+
+from __future__ import annotations
+
+import abc
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlparse
+
+from agent.video_download import VideoInfo
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FileSession:
+    """A /api/start session: the downloaded video plus its commentary options."""
+
+    video: VideoInfo
+    sport: str = "soccer"
+    persona: str | None = None  # key into PERSONAS
+    profile: dict | None = None  # custom UserProfile dict (overrides persona)
+    precompute: bool = False
+    degraded: bool = False  # admitted over capacity: run without detection
+
+
+def session_to_dict(session: FileSession) -> dict[str, Any]:
+    video = session.video
+    return {
+        "video": {
+            "video_id": video.video_id,
+            "title": video.title,
+            "duration": video.duration,
+            "path": str(video.path),
+            "proxy_path": str(video.proxy_path) if video.proxy_path else None,
+        },
+        "sport": session.sport,
+        "persona": session.persona,
+        "profile": session.profile,
+        "precompute": session.precompute,
+        "degraded": session.degraded,
+    }
+
+
+def session_from_dict(data: dict[str, Any]) -> FileSession:
+    v = data["video"]
+    video = VideoInfo(
+        video_id=v["video_id"],
+        title=v["title"],
+        duration=v["duration"],
+        path=Path(v["path"]),
+        proxy_path=Path(v["proxy_path"]) if v.get("proxy_path") else None,
+    )
+    return FileSession(
+        video=video,
+        sport=data.get("sport", "soccer"),
+        persona=data.get("persona"),
+        profile=data.get("profile"),
+        precompute=data.get("precompute", False),
+        degraded=data.get("degraded", False),
+    )
+
+
+class SessionStore(abc.ABC):
+    """Interface for session metadata storage (all methods are coroutines)."""
+
+    @abc.abstractmethod
+    async def put(self, session_id: str, session: FileSession) -> None: ...
+
+    @abc.abstractmethod
+    async def get(self, session_id: str) -> FileSession | None:
+        """Return the session and refresh its TTL, or None if unknown/expired."""
+
+    @abc.abstractmethod
+    async def touch(self, session_id: str) -> None:
+        """Refresh a session's TTL without reading it."""
+
+    @abc.abstractmethod
+    async def delete(self, session_id: str) -> None: ...
+
+    async def evict_expired(self) -> int:
+        """Drop expired sessions (backends with native expiry return 0)."""
+        return 0
+
+    def stats(self) -> dict[str, Any]:
+        return {}
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store with idle TTL (the single-worker default).
+
+    Args:
+        ttl_s: Seconds a session survives without being read or touched.
+    """
+
+    def __init__(self, ttl_s: float) -> None:
+        self.ttl_s = ttl_s
+        self._sessions: dict[str, tuple[FileSession, float]] = {}
+
+    async def put(self, session_id: str, session: FileSession) -> None:
+        self._sessions[session_id] = (session, time.monotonic())
+
+    async def get(self, session_id: str) -> FileSession | None:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        session, last_seen = entry
+        if time.monotonic() - last_seen > self.ttl_s:
+            del self._sessions[session_id]
+            return None
+        self._sessions[session_id] = (session, time.monotonic())
+        return session
+
+    async def touch(self, session_id: str) -> None:
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            self._sessions[session_id] = (entry[0], time.monotonic())
+
+    async def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    async def evict_expired(self) -> int:
+        cutoff = time.monotonic() - self.ttl_s
+        stale = [sid for sid, (_, seen) in self._sessions.items() if seen < cutoff]
+        for sid in stale:
+            del self._sessions[sid]
+        return len(stale)
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": "memory", "sessions": len(self._sessions)}
+
+
+# ---- Redis protocol ----
+
+
+class RespError(Exception):
+    """Error reply from a RESP server."""
+
+
+class RespClient:
+    """Minimal asyncio client for the Redis serialization protocol (RESP2).
+
+    One connection, one request in flight at a time, reconnect on failure.
+    A request abandoned mid-reply (cancelled, or a malformed reply) drops the
+    connection, since the rest of its reply would be read as the next one's.
+    Enough for GET/SET/EXPIRE/DEL; not a general Redis client.
+
+    Args:
+        url: ``redis://[:password@]host[:port][/db]``.
+        timeout_s: Connect / reply timeout.
+    """
+
+    def __init__(self, url: str, timeout_s: float = 5.0) -> None:
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout_s = timeout_s
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), timeout=self.timeout_s
+        )
+        try:
+            if self.password:
+                await self._roundtrip("AUTH", self.password)
+            if self.db:
+                await self._roundtrip("SELECT", str(self.db))
+        except BaseException:
+            # Never keep a connection that is unauthenticated or on the wrong db
+            self._drop()
+            raise
+        logger.info("Connected to session store at %s:%d/%d", self.host, self.port, self.db)
+
+    @staticmethod
+    def _encode(args: tuple[str | bytes, ...]) -> bytes:
+        out = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(out)
+
+    async def _read_reply(self) -> Any:
+        assert self._reader is not None
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Session store closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(rest)
+            if count < 0:
+                return None
+            return [await self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"Unexpected RESP reply: {line!r}")
+
+    async def _roundtrip(self, *args: str | bytes) -> Any:
+        assert self._writer is not None
+        self._writer.write(self._encode(args))
+        await self._writer.drain()
+        return await asyncio.wait_for(self._read_reply(), timeout=self.timeout_s)
+
+    async def execute(self, *args: str | bytes) -> Any:
+        """Send one command and return its decoded reply (retries once on a dropped link)."""
+        async with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._writer is None:
+                        await self._connect()
+                    return await self._roundtrip(*args)
+                except RespError:
+                    raise
+                except (
+                    ConnectionError,
+                    OSError,
+                    asyncio.TimeoutError,
+                    asyncio.IncompleteReadError,
+                ):
+                    await self._disconnect()
+                    if attempt == 2:
+                        raise
+                    logger.warning("Session store connection lost, reconnecting")
+                except BaseException:
+                    self._drop()
+                    raise
+
+    async def _disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self._reader = self._writer = None
+
+    def _drop(self) -> None:
+        """Close without waiting (safe while being cancelled); reconnects on next use."""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._disconnect()
+
+
+class RedisSessionStore(SessionStore):
+    """Sessions as JSON strings in a RESP server, expiring after ``ttl_s`` idle.
+
+    Args:
+        client: Connection to the server.
+        ttl_s: Idle TTL, applied with ``SET ... EX`` and refreshed by ``EXPIRE``.
+        prefix: Key prefix.
+    """
+
+    def __init__(self, client: RespClient, ttl_s: float, prefix: str = "commentator:session:"):
+        self.client = client
+        self.ttl_s = max(1, int(ttl_s))
+        self.prefix = prefix
+        self._errors = 0
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    async def put(self, session_id: str, session: FileSession) -> None:
+        payload = json.dumps(session_to_dict(session))
+        await self.client.execute("SET", self._key(session_id), payload, "EX", str(self.ttl_s))
+
+    async def get(self, session_id: str) -> FileSession | None:
+        try:
+            raw = await self.client.execute("GET", self._key(session_id))
+            if raw is None:
+                return None
+            await self.client.execute("EXPIRE", self._key(session_id), str(self.ttl_s))
+            return session_from_dict(json.loads(raw))
+        except (RespError, ValueError, KeyError):
+            self._errors += 1
+            logger.exception("Unreadable session %s in store", session_id)
+            return None
+
+    async def touch(self, session_id: str) -> None:
+        await self.client.execute("EXPIRE", self._key(session_id), str(self.ttl_s))
+
+    async def delete(self, session_id: str) -> None:
+        await self.client.execute("DEL", self._key(session_id))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": "redis",
+            "server": f"{self.client.host}:{self.client.port}/{self.client.db}",
+            "errors": self._errors,
+        }
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+def make_session_store(backend: str, ttl_s: float, url: str = "") -> SessionStore:
+    """Build the configured store ("memory" or "redis")."""
+    if backend == "redis":
+        return RedisSessionStore(RespClient(url or "redis://localhost:6379/0"), ttl_s)
+    if backend != "memory":
+        logger.warning("Unknown session store %r, using memory", backend)
+    return InMemorySessionStore(ttl_s)
@@ -0,0 +1,154 @@
+"""Session bookkeeping and admission control for the FastAPI server.
+
+``SessionManager`` fronts the ``/api/start`` session store (see
+``agent.session_store``) and tracks the pipelines (file and live) running in
+this worker. Sessions idle for longer than a TTL expire, and the number of
+pipelines of each kind running at once is capped. When a kind is at
+capacity, new work is either rejected with a retry hint or -- with
+``overflow="degrade"`` -- admitted in skip-detection mode (frames go straight
+to Claude), up to the same cap again.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import enum
+import logging
+from typing import Any
+
+from agent import metrics
+from agent.session_store import FileSession, InMemorySessionStore, SessionStore
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_KINDS = ("file", "live")
+
+
+class Admission(enum.Enum):
+    ADMIT = "admit"
+    DEGRADE = "degrade"
+    REJECT = "reject"
+
+
+class SessionManager:
+    """Session store front-end with idle eviction and per-kind pipeline caps.
+
+    Args:
+        ttl_s: Evict sessions without a running pipeline after this many idle seconds.
+        max_pipelines: Maximum concurrent full pipelines per kind ("file", "live").
+        overflow: "reject" or "degrade" -- what to do once a kind is at capacity.
+        retry_after_s: Retry hint returned with rejections.
+        store: Where session metadata lives (in-memory by default).
+    """
+
+    def __init__(
+        self,
+        ttl_s: float,
+        max_pipelines: dict[str, int],
+        overflow: str = "reject",
+        retry_after_s: int = 30,
+        store: SessionStore | None = None,
+    ) -> None:
+        self.ttl_s = ttl_s
+        self.max_pipelines = max_pipelines
+        self.overflow = overflow
+        self.retry_after_s = retry_after_s
+        self.store = store or InMemorySessionStore(ttl_s)
+        self._pipelines: dict[str, dict[str, Any]] = {kind: {} for kind in PIPELINE_KINDS}
+        self._degraded: dict[str, set[str]] = {kind: set() for kind in PIPELINE_KINDS}
+        self._rejected: dict[str, int] = {kind: 0 for kind in PIPELINE_KINDS}
+        self._evicted = 0
+        self._sweeper: asyncio.Task | None = None
+
+    # ---- Sessions ----
+
+    async def add_session(self, session_id: str, session: FileSession) -> None:
+        await self.store.put(session_id, session)
+
+    async def get_session(self, session_id: str) -> FileSession | None:
+        """Look up a session (from any worker) and mark it as recently used."""
+        return await self.store.get(session_id)
+
+    # ---- Admission ----
+
+    def admit(self, kind: str) -> Admission:
+        """Decide whether a new pipeline of ``kind`` may start."""
+        cap = self.max_pipelines.get(kind, 0)
+        running = len(self._pipelines[kind]) - len(self._degraded[kind])
+        if cap <= 0 or running < cap:
+            return Admission.ADMIT
+        if self.overflow == "degrade" and len(self._degraded[kind]) < cap:
+            return Admission.DEGRADE
+        self._rejected[kind] += 1
+        metrics.incr(f"sessions.rejected.{kind}")
+        logger.warning("Rejecting %s pipeline: %d running (cap %d)", kind, running, cap)
+        return Admission.REJECT
+
+    def register_pipeline(
+        self, kind: str, session_id: str, pipeline: Any, degraded: bool = False
+    ) -> Any | None:
+        """Track a running pipeline; returns the one it replaces, if any."""
+        previous = self._pipelines[kind].pop(session_id, None)
+        self._pipelines[kind][session_id] = pipeline
+        if degraded:
+            self._degraded[kind].add(session_id)
+        else:
+            self._degraded[kind].discard(session_id)
+        return previous
+
+    def unregister_pipeline(self, kind: str, session_id: str, pipeline: Any) -> None:
+        """Stop tracking ``pipeline`` (no-op if it was already replaced)."""
+        if self._pipelines[kind].get(session_id) is pipeline:
+            del self._pipelines[kind][session_id]
+            self._degraded[kind].discard(session_id)
+
+    def pop_pipeline(self, kind: str, session_id: str) -> Any | None:
+        self._degraded[kind].discard(session_id)
+        return self._pipelines[kind].pop(session_id, None)
+
+    # ---- Eviction ----
+
+    async def evict_idle(self) -> int:
+        """Expire idle sessions; sessions with a running pipeline are kept alive."""
+        for sid in list(self._pipelines["file"]):
+            await self.store.touch(sid)
+        evicted = await self.store.evict_expired()
+        if evicted:
+            self._evicted += evicted
+            logger.info("Evicted %d idle sessions", evicted)
+        return evicted
+
+    async def _sweep_loop(self) -> None:
+        interval = max(1.0, min(60.0, self.ttl_s / 4))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle()
+            except Exception:
+                logger.exception("Session sweep failed")
+
+    def start(self) -> None:
+        """Start the background idle sweeper and publish stats (call on startup)."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+        metrics.register_provider("sessions", self.stats)
+
+    # ---- Stats ----
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "store": self.store.stats(),
+            "evicted": self._evicted,
+            "ttl_s": self.ttl_s,
+            "overflow": self.overflow,
+            "pipelines": {
+                kind: {
+                    "running": len(self._pipelines[kind]),
+                    "degraded": len(self._degraded[kind]),
+                    "cap": self.max_pipelines.get(kind, 0),
+                    "rejected": self._rejected[kind],
+                }
+                for kind in PIPELINE_KINDS
+            },
+            "process_rss_mb": round(metrics.process_rss_bytes() / 1e6, 1),
+        }
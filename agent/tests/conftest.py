@@ -0,0 +1,116 @@
+"""Shared fixtures: a fake RESP server standing in for Redis."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+
+class FakeRespServer:
+    """In-process server for the RESP2 subset ``RespClient`` uses.
+
+    Supports AUTH, SELECT, GET, SET (with EX), EXPIRE and DEL. ``reply_delay_s``
+    holds every reply back, to exercise timeouts and cancellation.
+    """
+
+    def __init__(self, password: str | None = None) -> None:
+        self.password = password
+        self.data: dict[bytes, tuple[bytes, float | None]] = {}
+        self.commands: list[list[bytes]] = []
+        self.connections = 0
+        self.reply_delay_s = 0.0
+        self._server: asyncio.base_events.Server | None = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None
+        port = self._server.sockets[0].getsockname()[1]
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}127.0.0.1:{port}/0"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def expire_all(self) -> None:
+        """Make every key with a TTL expire now."""
+        for key, (value, deadline) in list(self.data.items()):
+            if deadline is not None:
+                self.data[key] = (value, 0.0)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        authed = self.password is None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                assert line[:1] == b"*", line
+                args = []
+                for _ in range(int(line[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                self.commands.append(args)
+                if args[0].upper() == b"AUTH":
+                    authed = args[1].decode() == self.password
+                    reply = b"+OK\r\n" if authed else b"-WRONGPASS invalid password\r\n"
+                elif not authed:
+                    reply = b"-NOAUTH Authentication required.\r\n"
+                else:
+                    reply = self._execute(args)
+                if self.reply_delay_s:
+                    await asyncio.sleep(self.reply_delay_s)
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _get(self, key: bytes) -> bytes | None:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, deadline = entry
+        if deadline is not None and time.monotonic() >= deadline:
+            del self.data[key]
+            return None
+        return value
+
+    def _execute(self, args: list[bytes]) -> bytes:
+        cmd = args[0].upper()
+        if cmd == b"SELECT":
+            return b"+OK\r\n"
+        if cmd == b"SET":
+            deadline = None
+            if len(args) >= 5 and args[3].upper() == b"EX":
+                deadline = time.monotonic() + int(args[4])
+            self.data[args[1]] = (args[2], deadline)
+            return b"+OK\r\n"
+        if cmd == b"GET":
+            value = self._get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if cmd == b"EXPIRE":
+            value = self._get(args[1])
+            if value is None:
+                return b":0\r\n"
+            self.data[args[1]] = (value, time.monotonic() + int(args[2]))
+            return b":1\r\n"
+        if cmd == b"DEL":
+            return b":%d\r\n" % (self.data.pop(args[1], None) is not None)
+        return b"-ERR unknown command\r\n"
+
+
+@pytest.fixture
+async def resp_server():
+    server = FakeRespServer()
+    await server.start()
+    yield server
+    await server.stop()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("vision_agents")
+
+from agent.processors.adaptive_resolution import (  # noqa: E402
+    ResolutionController,
+    parse_resolutions,
+)
+
+
+def _controller(**kwargs) -> ResolutionController:
+    args = {"budget_ms": 100.0, "window": 10, "min_samples": 5, **kwargs}
+    return ResolutionController([448, 336], **args)
+
+
+def _feed(ctl: ResolutionController, ms: float, n: int) -> list[bool]:
+    return [ctl.record(ms) for _ in range(n)]
+
+
+def test_parse_resolutions():
+    assert parse_resolutions("448, 336") == [448, 336]
+    assert parse_resolutions("") == []
+    assert parse_resolutions("560,") == [560]
+
+
+def test_steps_down_when_over_budget():
+    ctl = _controller()
+    assert ctl.levels == [None, 448, 336]
+    assert _feed(ctl, 150, 4) == [False] * 4
+    assert ctl.record(150)
+    assert (ctl.level, ctl.resolution) == (1, 448)
+
+    # Samples start fresh at the new level
+    _feed(ctl, 150, 5)
+    assert ctl.resolution == 336
+    _feed(ctl, 150, 5)
+    assert ctl.resolution == 336
+    assert ctl.stats()["level_changes"] == 2
+
+
+def test_steps_up_with_headroom_only():
+    ctl = _controller(headroom=0.6)
+    _feed(ctl, 150, 5)
+    assert ctl.level == 1
+    # Under budget but without headroom: stay
+    assert not any(_feed(ctl, 80, 5))
+    assert ctl.level == 1
+    ctl = _controller(headroom=0.6)
+    _feed(ctl, 150, 5)
+    _feed(ctl, 50, 5)
+    assert ctl.level == 0
+    assert ctl.resolution is None
+
+
+def test_percentile_ignores_rare_spikes():
+    ctl = _controller(window=20, min_samples=20, percentile=90.0)
+    assert not any(_feed(ctl, 70, 19))
+    assert not ctl.record(500)
+    assert ctl.level == 0
+
+
+def test_cap_level():
+    ctl = _controller()
+    _feed(ctl, 150, 10)
+    assert ctl.level == 2
+    ctl.cap_level(1)
+    assert ctl.level == 1
+    _feed(ctl, 150, 10)
+    assert ctl.level == 1
+
+
+def test_set_level_restarts_samples():
+    ctl = _controller()
+    _feed(ctl, 150, 10)
+    _feed(ctl, 150, 3)
+    ctl.set_level(0)
+    assert ctl.resolution is None
+    assert ctl.stats()["samples"] == 0
+    ctl.cap_level(1)
+    ctl.set_level(2)
+    assert ctl.level == 1
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+pytest.importorskip("vision_agents")
+pytest.importorskip("cartesia")
+
+from agent.cartesia_stt import CartesiaSTT, _PcmRingBuffer  # noqa: E402
+
+PACKET = 320  # 20 ms at 16 kHz
+
+
+def _ramp(start: int, n: int) -> np.ndarray:
+    return np.arange(start, start + n, dtype=np.int16)
+
+
+# ---- _PcmRingBuffer ----
+
+
+def test_ring_buffer_wraps():
+    ring = _PcmRingBuffer(8)
+    ring.write(_ramp(0, 6))
+    out = np.zeros(4, dtype=np.int16)
+    assert ring.read_into(out) == 4
+    assert out.tolist() == [0, 1, 2, 3]
+
+    ring.write(_ramp(6, 5))  # wraps past the end of the array
+    assert (ring.size, ring.free) == (7, 1)
+    assert ring.peek().tolist() == [4, 5, 6, 7, 8, 9, 10]
+    out = np.zeros(10, dtype=np.int16)
+    assert ring.read_into(out) == 7
+    assert out[:7].tolist() == [4, 5, 6, 7, 8, 9, 10]
+    assert ring.size == 0
+
+
+def test_ring_buffer_write_never_grows():
+    ring = _PcmRingBuffer(4)
+    ring.write(_ramp(0, 3))
+    with pytest.raises(ValueError):
+        ring.write(_ramp(3, 2))
+    assert ring.size == 3
+
+
+def test_ring_buffer_push_drops_oldest():
+    ring = _PcmRingBuffer(4)
+    ring.push(_ramp(0, 3))
+    ring.push(_ramp(3, 3))
+    assert ring.peek().tolist() == [2, 3, 4, 5]
+    ring.push(_ramp(10, 6))
+    assert ring.peek().tolist() == [12, 13, 14, 15]
+    ring.discard(10)
+    ring.clear()
+    assert ring.size == 0
+
+
+# ---- VAD gate ----
+
+
+class _FakeWebSocket:
+    def __init__(self) -> None:
+        self.sent: list[bytes | str] = []
+
+    async def send(self, data: bytes | str) -> None:
+        self.sent.append(data)
+
+
+def _gated_stt() -> tuple[CartesiaSTT, _FakeWebSocket]:
+    stt = CartesiaSTT(
+        api_key="test",
+        packet_ms=20,
+        vad=True,
+        vad_threshold_db=-45.0,
+        vad_hangover_ms=40,
+        vad_pre_roll_ms=40,
+    )
+    ws = _FakeWebSocket()
+    stt._ws = ws
+    return stt, ws
+
+
+def _silence() -> np.ndarray:
+    return np.zeros(PACKET, dtype=np.int16)
+
+
+def _speech() -> np.ndarray:
+    t = np.arange(PACKET) / 16000
+    return (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+
+def test_is_speech_threshold():
+    stt, _ = _gated_stt()
+    assert stt._is_speech(_speech())
+    assert not stt._is_speech(_silence())
+    assert not stt._is_speech((_speech() // 1000).astype(np.int16))
+
+
+async def test_vad_gate_sends_pre_roll_and_finalizes():
+    stt, ws = _gated_stt()
+    for _ in range(3):
+        await stt._send_gated(_silence())
+    assert ws.sent == []
+
+    # Onset sends the pre-roll (the last 40 ms of silence) before the speech
+    await stt._send_gated(_speech())
+    assert len(ws.sent) == 3
+    assert ws.sent[-1] == _speech().tobytes()
+
+    # Hangover: silence is still forwarded until the gate closes with finalize
+    await stt._send_gated(_silence())
+    assert "finalize" not in ws.sent
+    await stt._send_gated(_silence())
+    assert ws.sent[-1] == "finalize"
+    assert len(ws.sent) == 6
+
+    await stt._send_gated(_silence())
+    assert len(ws.sent) == 6
+    stats = stt.stats()
+    assert stats["vad"]["speech_segments"] == 1
+    assert stats["vad"]["gated_ms"] == 20
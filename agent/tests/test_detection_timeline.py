@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sv = pytest.importorskip("supervision")
+
+from agent.detection_timeline import DetectionTimeline, timeline_dir  # noqa: E402
+
+CLASS_NAMES = {0: "person", 32: "sports ball"}
+
+
+def _detections(*boxes: tuple[float, float, float, float, int, float]) -> sv.Detections:
+    rows = np.array(boxes, dtype=np.float32).reshape(-1, 6)
+    return sv.Detections(
+        xyxy=rows[:, :4],
+        class_id=rows[:, 4].astype(int),
+        confidence=rows[:, 5],
+    )
+
+
+def _timeline(videos_dir: Path, **kwargs) -> DetectionTimeline:
+    args = {"fps": 2.0, "model_id": "rfdetr-base", "threshold": 0.5, **kwargs}
+    return DetectionTimeline(videos_dir, "abc123", **args)
+
+
+def test_timeline_dir_keys_on_resolution():
+    assert timeline_dir(Path("/v"), "abc", 2.0, "models/rfdetr-nano.onnx", 0.5) == Path(
+        "/v/abc.det-rfdetr-nano-native-2fps-c0.5"
+    )
+    assert timeline_dir(Path("/v"), "abc", 2.0, "rfdetr-base", 0.35, 448) == Path(
+        "/v/abc.det-rfdetr-base-448px-2fps-c0.35"
+    )
+
+
+def test_record_flush_lookup(tmp_path: Path):
+    timeline = _timeline(tmp_path)
+    assert timeline.lookup(0, 640, 360) is None
+    timeline.record(0, _detections((64, 36, 128, 72, 0, 0.9)), 640, 360, CLASS_NAMES)
+    timeline.record(3, _detections(), 640, 360, CLASS_NAMES)
+    timeline.flush()
+
+    reopened = _timeline(tmp_path)
+    assert reopened.slots_covered == 2
+    assert reopened.class_names == CLASS_NAMES
+    # Boxes are stored normalized, so another analysis scale reads them back scaled
+    hit = reopened.lookup(0, 1280, 720)
+    assert hit is not None
+    np.testing.assert_allclose(hit.xyxy, [[128, 72, 256, 144]], rtol=1e-5)
+    assert hit.class_id.tolist() == [0]
+    assert hit.confidence.tolist() == pytest.approx([0.9])
+    empty = reopened.lookup(3, 640, 360)
+    assert empty is not None and len(empty) == 0
+    assert reopened.lookup(1, 640, 360) is None
+    assert reopened.lookup(99, 640, 360) is None
+    assert (reopened.hits, reopened.misses) == (2, 2)
+
+
+def test_flushes_from_two_sessions_merge(tmp_path: Path):
+    first = _timeline(tmp_path)
+    second = _timeline(tmp_path)
+    first.record(0, _detections((0, 0, 10, 10, 0, 0.8)), 100, 100, CLASS_NAMES)
+    second.record(5, _detections((0, 0, 20, 20, 32, 0.7)), 100, 100, CLASS_NAMES)
+    first.flush()
+    second.flush()
+
+    merged = _timeline(tmp_path)
+    assert merged.slots_covered == 2
+    assert merged.lookup(0, 100, 100) is not None
+    assert merged.lookup(5, 100, 100) is not None
+
+
+def test_other_key_does_not_share_slots(tmp_path: Path):
+    native = _timeline(tmp_path)
+    native.record(0, _detections((0, 0, 10, 10, 0, 0.8)), 100, 100, CLASS_NAMES)
+    native.flush()
+    assert _timeline(tmp_path, resolution=448).lookup(0, 100, 100) is None
+    assert _timeline(tmp_path, threshold=0.3).lookup(0, 100, 100) is None
+
+
+def test_incomplete_timeline_is_ignored(tmp_path: Path):
+    timeline = _timeline(tmp_path)
+    timeline.record(0, _detections((0, 0, 10, 10, 0, 0.8)), 100, 100, CLASS_NAMES)
+    timeline.flush()
+    meta_path = timeline.path / "meta.json"
+    meta = json.loads(meta_path.read_text())
+    meta["rows"] += 1
+    meta_path.write_text(json.dumps(meta))
+
+    assert _timeline(tmp_path).lookup(0, 100, 100) is None
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from agent.frame_source import FileFrameSource, PlaybackPacer
+
+
+def test_position_follows_client_sync(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("agent.frame_source.time.monotonic", lambda: now[0])
+    pacer = PlaybackPacer()
+    pacer.start()
+    now[0] += 2
+    assert pacer.position() == pytest.approx(2.0)
+
+    pacer.sync(30.0)
+    now[0] += 1.5
+    assert pacer.position() == pytest.approx(31.5)
+
+    pacer.sync(40.0, paused=True)
+    now[0] += 10
+    assert pacer.position() == pytest.approx(40.0)
+
+    # Once the client has reported a position, a late start() keeps it
+    pacer.start()
+    assert pacer.position() == pytest.approx(40.0)
+
+
+async def test_wait_until_lead():
+    pacer = PlaybackPacer(lead_s=0.5)
+    pacer.start()
+    await asyncio.wait_for(pacer.wait_until(0.5), timeout=0.05)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(pacer.wait_until(1.0), timeout=0.1)
+
+
+async def test_wait_until_wakes_on_seek_and_pause():
+    pacer = PlaybackPacer(jump_s=120.0)
+    pacer.start()
+    waiter = asyncio.create_task(pacer.wait_until(60.0))
+    await asyncio.sleep(0.01)
+    pacer.sync(59.0, paused=True)
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+
+    pacer.sync(60.0)
+    await asyncio.wait_for(waiter, timeout=0.05)
+
+
+async def test_release_unblocks_waiters():
+    pacer = PlaybackPacer()
+    pacer.sync(0.0, paused=True)
+    waiter = asyncio.create_task(pacer.wait_until(10.0))
+    await asyncio.sleep(0.01)
+    pacer.release()
+    await asyncio.wait_for(waiter, timeout=0.05)
+    await asyncio.wait_for(pacer.wait_until(99.0), timeout=0.05)
+
+
+async def test_jump_drops_pending_frame():
+    pacer = PlaybackPacer(jump_s=2.0)
+    pacer.start()
+    # Small corrections are not seeks
+    assert pacer.sync(0.5) is False
+    waiter = asyncio.create_task(pacer.wait_until(30.0))
+    await asyncio.sleep(0.01)
+    assert pacer.sync(10.0) is True
+    assert await asyncio.wait_for(waiter, timeout=0.05) is False
+    assert await asyncio.wait_for(pacer.wait_until(10.0), timeout=0.05) is True
+
+
+def _write_video(path, seconds: int, fps: int = 10) -> None:
+    av = pytest.importorskip("av")
+    with av.open(str(path), "w") as container:
+        stream = container.add_stream("mpeg4", rate=fps)
+        stream.width, stream.height = 64, 48
+        stream.pix_fmt = "yuv420p"
+        for i in range(seconds * fps):
+            image = np.full((48, 64, 3), i % 256, dtype=np.uint8)
+            frame = av.VideoFrame.from_ndarray(image, format="rgb24")
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+
+
+async def test_seek_discards_buffered_frames(tmp_path):
+    path = tmp_path / "clip.mp4"
+    _write_video(path, seconds=20)
+    source = FileFrameSource(path, fps=1.0, buffer_size=2)
+    source.start()
+    try:
+        first = await asyncio.wait_for(source.get(), timeout=5)
+        assert first.index == 0
+        # Let the decoder fill the buffer with frames from the old position
+        await asyncio.sleep(0.2)
+        source.seek(12.3)
+        frame = await asyncio.wait_for(source.get(), timeout=5)
+        assert frame.index == 13
+        assert frame.pts == pytest.approx(13.0)
+        assert source.seeks == 1
+    finally:
+        source.stop()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from agent.outbound import OutboundLimiter, Priority
+
+
+async def _hold(limiter: OutboundLimiter, priority: Priority, order: list[str], name: str):
+    async with limiter.slot(priority):
+        order.append(name)
+        await asyncio.sleep(0.01)
+
+
+def test_priority_for_task():
+    assert Priority.for_task("question") is Priority.QUESTION
+    assert Priority.for_task("commentary.coach_kay") is Priority.COMMENTARY
+    assert Priority.for_task("extraction") is Priority.ONBOARDING
+
+
+# ---- Token bucket ----
+
+
+async def test_burst_then_rate():
+    limiter = OutboundLimiter("test", rate_per_s=20, burst=2, max_concurrency=0)
+    granted: list[float] = []
+    start = time.monotonic()
+
+    async def call():
+        async with limiter.slot(Priority.COMMENTARY):
+            granted.append(time.monotonic() - start)
+
+    await asyncio.gather(*(call() for _ in range(4)))
+    granted.sort()
+    # Two back to back from the burst, then one token every 50 ms
+    assert granted[1] < 0.02
+    assert granted[2] == pytest.approx(0.05, abs=0.03)
+    assert granted[3] == pytest.approx(0.10, abs=0.03)
+
+
+async def test_rate_limited_empties_bucket():
+    limiter = OutboundLimiter("test", rate_per_s=20, burst=5, max_concurrency=0)
+    limiter.note_rate_limited()
+    start = time.monotonic()
+    async with limiter.slot(Priority.QUESTION):
+        waited = time.monotonic() - start
+    assert waited == pytest.approx(0.05, abs=0.03)
+    assert limiter.stats()["rate_limited"] == 1
+
+
+# ---- Concurrency and priority ----
+
+
+async def test_queue_grants_most_urgent_first():
+    limiter = OutboundLimiter("test", rate_per_s=0, burst=1, max_concurrency=1)
+    order: list[str] = []
+    async with limiter.slot(Priority.COMMENTARY):
+        tasks = [
+            asyncio.create_task(_hold(limiter, Priority.BACKGROUND, order, "background")),
+            asyncio.create_task(_hold(limiter, Priority.COMMENTARY, order, "commentary")),
+            asyncio.create_task(_hold(limiter, Priority.QUESTION, order, "question")),
+        ]
+        await asyncio.sleep(0.01)
+        assert order == []
+        assert limiter.stats()["queued"] == 3
+    await asyncio.gather(*tasks)
+    assert order == ["question", "commentary", "background"]
+    assert limiter.stats()["in_flight"] == 0
+
+
+async def test_cancelled_waiter_does_not_leak_slot():
+    limiter = OutboundLimiter("test", rate_per_s=0, burst=1, max_concurrency=1)
+    order: list[str] = []
+    async with limiter.slot(Priority.COMMENTARY):
+        waiter = asyncio.create_task(_hold(limiter, Priority.QUESTION, order, "cancelled"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+    await _hold(limiter, Priority.BACKGROUND, order, "next")
+    assert order == ["next"]
+    assert limiter.stats()["in_flight"] == 0
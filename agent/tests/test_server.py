@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("anthropic")
+
+from agent.server import _ProfileBlockFilter  # noqa: E402
+
+PROFILE_BLOCK = '[PROFILE_COMPLETE]\n{"name": "Sam"}\n[/PROFILE_COMPLETE]'
+
+
+def _stream(deltas: list[str]) -> str:
+    text_filter = _ProfileBlockFilter()
+    return "".join(text_filter.feed(d) for d in deltas) + text_filter.finish()
+
+
+def test_passes_plain_text():
+    text_filter = _ProfileBlockFilter()
+    assert text_filter.feed("Great pick, ") == "Great pick, "
+    assert text_filter.feed("Sam!") == "Sam!"
+    assert text_filter.finish() == ""
+
+
+def test_withholds_profile_block():
+    reply = "You're all set. " + PROFILE_BLOCK
+    assert _stream([reply]) == "You're all set. "
+
+
+@pytest.mark.parametrize("split", [17, 18, 20, 25, 33])
+def test_withholds_tag_split_across_deltas(split: int):
+    reply = "You're all set. " + PROFILE_BLOCK
+    assert _stream([reply[:split], reply[split:]]) == "You're all set. "
+
+
+def test_holds_possible_tag_prefix_until_decided():
+    text_filter = _ProfileBlockFilter()
+    assert text_filter.feed("Pick one [PRO") == "Pick one "
+    assert text_filter.feed("S or CONS]") == "[PROS or CONS]"
+
+
+def test_finish_releases_unfinished_prefix():
+    assert _stream(["Ends with [PROFILE"]) == "Ends with [PROFILE"
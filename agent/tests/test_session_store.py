@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from agent.session_store import (
+    FileSession,
+    InMemorySessionStore,
+    RedisSessionStore,
+    RespClient,
+    RespError,
+    SessionStore,
+    make_session_store,
+    session_from_dict,
+    session_to_dict,
+)
+from agent.tests.conftest import FakeRespServer
+from agent.video_download import VideoInfo
+
+
+def _session(video_id: str = "abc123", **kwargs) -> FileSession:
+    video = VideoInfo(
+        video_id=video_id,
+        title="Cup final",
+        duration=90,
+        path=Path(f"/videos/{video_id}.mp4"),
+        proxy_path=Path(f"/videos/{video_id}.proxy.mp4"),
+    )
+    return FileSession(video=video, **kwargs)
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_session_dict_round_trip():
+    session = _session(sport="football", persona="stats_nerd", precompute=True, degraded=True)
+    assert session_from_dict(session_to_dict(session)) == session
+
+
+def test_make_session_store_falls_back_to_memory():
+    assert isinstance(make_session_store("nope", 60), InMemorySessionStore)
+    assert isinstance(make_session_store("redis", 60, "redis://h:1/2"), RedisSessionStore)
+
+
+# ---- InMemorySessionStore ----
+
+
+async def test_memory_put_get_delete():
+    store = InMemorySessionStore(ttl_s=60)
+    session = _session()
+    await store.put("s1", session)
+    assert await store.get("s1") is session
+    assert await store.get("missing") is None
+    await store.delete("s1")
+    assert await store.get("s1") is None
+    assert store.stats() == {"backend": "memory", "sessions": 0}
+
+
+async def test_memory_idle_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("agent.session_store.time.monotonic", lambda: now[0])
+    store = InMemorySessionStore(ttl_s=10)
+    await store.put("read", _session())
+    await store.put("touched", _session())
+    await store.put("idle", _session())
+
+    now[0] += 8
+    assert await store.get("read") is not None
+    await store.touch("touched")
+
+    now[0] += 8
+    assert await store.evict_expired() == 1
+    assert await store.get("idle") is None
+    assert await store.get("read") is not None
+    assert await store.get("touched") is not None
+
+    now[0] += 11
+    assert await store.get("read") is None
+
+
+# ---- RedisSessionStore over a fake RESP server ----
+
+
+async def test_redis_put_get_delete(resp_server: FakeRespServer):
+    store = RedisSessionStore(RespClient(resp_server.url), ttl_s=30)
+    session = _session(persona="hype")
+    try:
+        await store.put("s1", session)
+        assert await store.get("s1") == session
+        assert await store.get("missing") is None
+        await store.delete("s1")
+        assert await store.get("s1") is None
+    finally:
+        await store.close()
+    assert [b"SET", b"commentator:session:s1"] == resp_server.commands[0][:2]
+    assert resp_server.commands[0][3:] == [b"EX", b"30"]
+
+
+async def test_redis_get_refreshes_ttl(resp_server: FakeRespServer):
+    store = RedisSessionStore(RespClient(resp_server.url), ttl_s=30)
+    try:
+        await store.put("s1", _session())
+        assert await store.get("s1") is not None
+        await store.touch("s1")
+        assert [c[0] for c in resp_server.commands] == [b"SET", b"GET", b"EXPIRE", b"EXPIRE"]
+        resp_server.expire_all()
+        assert await store.get("s1") is None
+    finally:
+        await store.close()
+
+
+async def test_redis_unreadable_session_counts_error(resp_server: FakeRespServer):
+    store = RedisSessionStore(RespClient(resp_server.url), ttl_s=30)
+    try:
+        await store.client.execute("SET", "commentator:session:bad", "not json")
+        assert await store.get("bad") is None
+        assert store.stats()["errors"] == 1
+    finally:
+        await store.close()
+
+
+async def test_resp_client_auth():
+    server = FakeRespServer(password="hunter2")
+    await server.start()
+    client = RespClient(server.url)
+    try:
+        assert await client.execute("SET", "k", "v") == "OK"
+        assert await client.execute("GET", "k") == b"v"
+        assert server.commands[0] == [b"AUTH", b"hunter2"]
+    finally:
+        await client.close()
+        await server.stop()
+
+
+async def test_resp_client_rejected_auth_drops_connection():
+    server = FakeRespServer(password="hunter2")
+    await server.start()
+    client = RespClient(server.url.replace("hunter2", "wrong"))
+    try:
+        for _ in range(2):
+            with pytest.raises(RespError):
+                await client.execute("SET", "k", "v")
+        assert client._writer is None
+        # Each attempt re-authenticates on a fresh connection; SET is never sent
+        assert [c[0] for c in server.commands] == [b"AUTH", b"AUTH"]
+        assert server.connections == 2
+        assert server.data == {}
+    finally:
+        await client.close()
+        await server.stop()
+
+
+async def test_resp_client_error_reply_keeps_connection(resp_server: FakeRespServer):
+    client = RespClient(resp_server.url)
+    try:
+        with pytest.raises(RespError):
+            await client.execute("FLUSHALL")
+        assert await client.execute("SET", "k", "v") == "OK"
+        assert resp_server.connections == 1
+    finally:
+        await client.close()
+
+
+async def test_resp_client_reconnects_after_drop(resp_server: FakeRespServer):
+    client = RespClient(resp_server.url)
+    try:
+        await client.execute("SET", "k", "v")
+        assert client._writer is not None
+        client._writer.close()
+        assert await client.execute("GET", "k") == b"v"
+        assert resp_server.connections == 2
+    finally:
+        await client.close()
+
+
+async def test_resp_client_cancelled_mid_reply_does_not_desync(resp_server: FakeRespServer):
+    client = RespClient(resp_server.url)
+    try:
+        await client.execute("SET", "a", "1")
+        await client.execute("SET", "b", "2")
+
+        resp_server.reply_delay_s = 0.2
+        pending = asyncio.create_task(client.execute("GET", "a"))
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+
+        # The late reply to GET a must not be taken as the reply to GET b
+        resp_server.reply_delay_s = 0.0
+        assert await client.execute("GET", "b") == b"2"
+        assert resp_server.connections == 2
+    finally:
+        await client.close()
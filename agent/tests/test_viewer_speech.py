@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("vision_agents")
+pytest.importorskip("getstream")
+
+from agent.config import config  # noqa: E402
+from agent.viewer_speech import ViewerSpeech, normalize_question  # noqa: E402
+
+
+def test_normalize_question():
+    assert normalize_question("Who's  winning?") == "who's winning"
+    assert normalize_question("WHO'S WINNING") == normalize_question("who's winning...")
+    assert normalize_question("Is that a foul, ref?!") == "is that a foul ref"
+    assert normalize_question("  ") == ""
+
+
+class _FakeSTT:
+    def __init__(self, connect_s: float = 0.05, fail: bool = False) -> None:
+        self.connect_s = connect_s
+        self.fail = fail
+        self.received = 0
+        self.cleared = 0
+        self.events = SimpleNamespace(stop=lambda: None)
+
+    async def start(self) -> None:
+        await asyncio.sleep(self.connect_s)
+        if self.fail:
+            raise ConnectionError("no route to Ink")
+
+    async def process_audio(self, pcm, participant) -> None:
+        self.received += 1
+
+    async def clear(self) -> None:
+        self.cleared += 1
+
+    async def close(self) -> None:
+        pass
+
+
+async def _noop(text: str) -> None:
+    pass
+
+
+def _speech(stt: _FakeSTT, monkeypatch) -> ViewerSpeech:
+    monkeypatch.setattr(config, "cartesia_api_key", "test")
+    speech = ViewerSpeech("s1", on_stable=_noop, on_final=_noop)
+    speech._stt = stt
+    return speech
+
+
+def _packet() -> np.ndarray:
+    return np.zeros(320, dtype=np.int16)  # 20 ms at 16 kHz
+
+
+async def test_audio_is_buffered_while_connecting(monkeypatch):
+    stt = _FakeSTT()
+    speech = _speech(stt, monkeypatch)
+    speech.start()
+    for _ in range(5):
+        await speech.feed(_packet(), 16000)
+    await speech.end_of_speech()
+    assert (stt.received, stt.cleared) == (0, 0)
+
+    await asyncio.sleep(0.1)
+    assert (stt.received, stt.cleared) == (5, 1)
+    await speech.feed(_packet(), 16000)
+    assert stt.received == 6
+    await speech.close()
+
+
+async def test_connect_buffer_is_bounded(monkeypatch):
+    monkeypatch.setattr(config, "stt_replay_ms", 100)
+    stt = _FakeSTT()
+    speech = _speech(stt, monkeypatch)
+    speech.start()
+    for _ in range(20):
+        await speech.feed(_packet(), 16000)
+    await asyncio.sleep(0.1)
+    assert stt.received == 5
+    await speech.close()
+
+
+async def test_failed_connect_drops_audio(monkeypatch):
+    stt = _FakeSTT(fail=True)
+    speech = _speech(stt, monkeypatch)
+    speech.start()
+    await speech.feed(_packet(), 16000)
+    await asyncio.sleep(0.1)
+    assert speech.failed
+    await speech.feed(_packet(), 16000)
+    assert stt.received == 0
+    await speech.close()
@@ -0,0 +1,285 @@
+"""Persistent Cartesia TTS WebSocket, one per session.
+
+``_synthesize_speech`` otherwise opens a fresh HTTPS request per utterance.
+``CartesiaTTSWebSocket`` keeps one WebSocket to Cartesia open for the life of
+a pipeline and multiplexes utterances over it by ``context_id`` -- each
+utterance (from any of the three analyst voices) gets its own context, so
+several can be in flight at once and chunks are routed back to the right
+caller.
+
+The WebSocket returns raw PCM (``pcm_s16le``); ``pcm_to_wav`` wraps it so the
+clients can play it like the MP3 clips of the HTTP path. A dropped connection
+is re-established on the next utterance, with exponential backoff between
+failed attempts; callers fall back to HTTP whenever ``synthesize`` raises.
+
+Time-to-first-byte for both paths is recorded in ``tts_latency`` (served as
+the ``tts`` metrics provider).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import io
+import itertools
+import json
+import logging
+import time
+import wave
+from collections import deque
+from typing import Any
+from urllib.parse import urlencode
+
+from websockets.asyncio.client import ClientConnection, connect
+from websockets.exceptions import WebSocketException
+
+from agent import metrics
+
+logger = logging.getLogger(__name__)
+
+CARTESIA_TTS_WS_URL = "wss://api.cartesia.ai/tts/websocket"
+CARTESIA_VERSION = "2025-04-16"
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int, channels: int = 1) -> bytes:
+    """Wrap 16-bit little-endian PCM in a WAV container."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buf.getvalue()
+
+
+# ---- Latency stats ----
+
+
+class TTSLatencyStats:
+    """Rolling time-to-first-byte per synthesis path ("websocket", "http")."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._ttfb: dict[str, deque[float]] = {}
+        self._counts: dict[str, int] = {}
+        self.window = window
+
+    def record(self, path: str, ttfb_ms: float) -> None:
+        self._ttfb.setdefault(path, deque(maxlen=self.window)).append(ttfb_ms)
+        self._counts[path] = self._counts.get(path, 0) + 1
+
+    def stats(self) -> dict[str, Any]:
+        out: dict[str, Any] = {}
+        for path, samples in self._ttfb.items():
+            ordered = sorted(samples)
+            out[path] = {
+                "requests": self._counts[path],
+                "ttfb_p50_ms": round(ordered[len(ordered) // 2], 1),
+                "ttfb_p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 1),
+            }
+        return out
+
+
+tts_latency = TTSLatencyStats()
+metrics.register_provider("tts", tts_latency.stats)
+
+
+# ---- WebSocket client ----
+
+
+class CartesiaTTSWebSocket:
+    """One persistent Cartesia TTS WebSocket, utterances multiplexed by context id.
+
+    Args:
+        api_key: Cartesia API key.
+        model_id: TTS model.
+        sample_rate: PCM sample rate requested from Cartesia.
+        session_id: Used in context ids and logs.
+        connect_timeout_s: Give up connecting after this long (callers fall back).
+        max_backoff_s: Cap on the wait between failed connection attempts.
+        reply_timeout_s: Give up on an utterance when Cartesia sends nothing
+            for it (no chunk, no ``done``) for this long.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model_id: str = "sonic-3",
+        sample_rate: int = 24000,
+        session_id: str = "",
+        connect_timeout_s: float = 5.0,
+        max_backoff_s: float = 30.0,
+        reply_timeout_s: float = 10.0,
+    ) -> None:
+        self.api_key = api_key
+        self.model_id = model_id
+        self.sample_rate = sample_rate
+        self.session_id = session_id
+        self.connect_timeout_s = connect_timeout_s
+        self.max_backoff_s = max_backoff_s
+        self.reply_timeout_s = reply_timeout_s
+        self._ws: ClientConnection | None = None
+        self._reader: asyncio.Task | None = None
+        self._connect_lock = asyncio.Lock()
+        self._contexts: dict[str, asyncio.Queue[bytes | Exception | None]] = {}
+        self._ids = itertools.count()
+        self._failures = 0
+        self._retry_at = 0.0
+        self._connects = 0
+        self._closed = False
+
+    # ---- Connection ----
+
+    async def _ensure_connected(self) -> ClientConnection:
+        if self._ws is not None:
+            return self._ws
+        async with self._connect_lock:
+            if self._ws is not None:
+                return self._ws
+            if self._closed:
+                raise ConnectionError("TTS websocket closed")
+            if time.monotonic() < self._retry_at:
+                raise ConnectionError("TTS websocket backing off after failed connect")
+
+            query = urlencode({"api_key": self.api_key, "cartesia_version": CARTESIA_VERSION})
+            try:
+                self._ws = await asyncio.wait_for(
+                    connect(f"{CARTESIA_TTS_WS_URL}?{query}", max_size=None),
+                    timeout=self.connect_timeout_s,
+                )
+            except (OSError, asyncio.TimeoutError, WebSocketException) as e:
+                self._failures += 1
+                backoff = min(self.max_backoff_s, 0.5 * 2**self._failures)
+                self._retry_at = time.monotonic() + backoff
+                metrics.incr("tts.ws_connect_failures")
+                logger.warning(
+                    "[%s] Cartesia TTS websocket connect failed (%s), retry in %.1fs",
+                    self.session_id,
+                    e,
+                    backoff,
+                )
+                raise ConnectionError(f"TTS websocket connect failed: {e}") from e
+
+            self._failures = 0
+            self._connects += 1
+            self._reader = asyncio.create_task(self._read_loop(self._ws))
+            logger.info("[%s] Cartesia TTS websocket connected", self.session_id)
+            return self._ws
+
+    async def _read_loop(self, ws: ClientConnection) -> None:
+        """Route incoming chunks to their context queues until the socket drops."""
+        error: Exception = ConnectionError("TTS websocket closed")
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                queue = self._contexts.get(message.get("context_id", ""))
+                if queue is None:
+                    continue
+                kind = message.get("type")
+                if kind == "chunk" and message.get("data"):
+                    queue.put_nowait(base64.b64decode(message["data"]))
+                elif kind == "done" or message.get("done"):
+                    queue.put_nowait(None)
+                elif kind == "error":
+                    queue.put_nowait(RuntimeError(message.get("error") or message.get("message")))
+        except (WebSocketException, OSError, ValueError) as e:
+            error = ConnectionError(f"TTS websocket lost: {e}")
+            logger.warning("[%s] Cartesia TTS websocket lost: %s", self.session_id, e)
+        finally:
+            if self._ws is ws:
+                self._ws = None
+            for queue in self._contexts.values():
+                queue.put_nowait(error)
+
+    # ---- Synthesis ----
+
+    async def synthesize(
+        self,
+        text: str,
+        voice_id: str,
+        speed: float = 1.0,
+        language: str = "en",
+        voice_key: str = "voice",
+        sample_rate: int | None = None,
+    ) -> bytes:
+        """Synthesize one utterance and return its 16-bit PCM.
+
+        ``sample_rate`` overrides the connection default for this utterance.
+
+        Raises:
+            ConnectionError: The socket could not be (re)established, dropped
+                mid-utterance or went silent for ``reply_timeout_s`` -- callers
+                fall back to HTTP.
+            RuntimeError: Cartesia reported an error for this context.
+        """
+        ws = await self._ensure_connected()
+        context_id = f"{self.session_id}-{voice_key}-{next(self._ids)}"
+        queue: asyncio.Queue[bytes | Exception | None] = asyncio.Queue()
+        self._contexts[context_id] = queue
+        start = time.perf_counter()
+        chunks: list[bytes] = []
+        try:
+            await ws.send(
+                json.dumps(
+                    {
+                        "model_id": self.model_id,
+                        "transcript": text,
+                        "voice": {"mode": "id", "id": voice_id},
+                        "output_format": {
+                            "container": "raw",
+                            "encoding": "pcm_s16le",
+                            "sample_rate": sample_rate or self.sample_rate,
+                        },
+                        "language": language,
+                        "generation_config": {"speed": speed},
+                        "context_id": context_id,
+                        "continue": False,
+                    }
+                )
+            )
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=self.reply_timeout_s)
+                except asyncio.TimeoutError:
+                    metrics.incr("tts.ws_reply_timeouts")
+                    asyncio.create_task(self._cancel_context(ws, context_id))
+                    raise ConnectionError(
+                        f"No TTS websocket reply for {self.reply_timeout_s:g}s"
+                    ) from None
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                if not chunks:
+                    tts_latency.record("websocket", (time.perf_counter() - start) * 1000)
+                chunks.append(item)
+        except WebSocketException as e:
+            raise ConnectionError(f"TTS websocket send failed: {e}") from e
+        except asyncio.CancelledError:
+            # Preempted: tell Cartesia to stop generating this context
+            asyncio.create_task(self._cancel_context(ws, context_id))
+            raise
+        finally:
+            del self._contexts[context_id]
+        return b"".join(chunks)
+
+    @staticmethod
+    async def _cancel_context(ws: ClientConnection, context_id: str) -> None:
+        try:
+            await ws.send(json.dumps({"context_id": context_id, "cancel": True}))
+        except WebSocketException:
+            pass
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "connected": self._ws is not None,
+            "connects": self._connects,
+            "in_flight": len(self._contexts),
+        }
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+        if self._reader is not None:
+            self._reader.cancel()
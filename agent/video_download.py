@@ -1,11 +1,39 @@
-"""YouTube video download utility using yt-dlp."""
+"""YouTube video download utility using yt-dlp.
+
+Downloads are cached in ``output_dir`` as ``<video_id>.mp4`` with a JSON
+sidecar (``<video_id>.info.json``) holding title, duration, size and last
+access time, so cache hits need no network round-trip. Concurrent requests
+for the same URL share one download (single-flight), and the directory is
+kept under a byte quota by evicting the least recently used videos together
+with everything derived from them (``<video_id>.*``: scripts, detection
+timelines, ...). Videos pinned with ``pin_video`` (open sessions, precompute
+jobs) are never evicted.
+
+Both guarantees hold across server workers sharing ``output_dir``: a download
+holds an exclusive ``flock`` on ``<video_id>.lock``, a pin holds a shared one
+on ``<video_id>.pin``, and eviction skips any video whose two lock files it
+cannot lock exclusively.
+
+Progressive downloads write a fragmented MP4 in place and return once the
+first fragments exist; ``download_state`` reports progress and
+``is_downloading`` tells readers the file is still growing.
+
+Alongside the playback video, a small video-only proxy rendition
+(``<video_id>.proxy.mp4``) can be fetched for analysis, so decoding for the
+detector and Claude does not pay for the 720p playback stream.
+"""
 
 from __future__ import annotations
 
 import asyncio
+import fcntl
 import hashlib
+import json
 import logging
-from dataclasses import dataclass
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 
 from yt_dlp import YoutubeDL
@@ -21,6 +49,23 @@ class VideoInfo:
     title: str
     duration: int  # seconds
     path: Path
+    # Low-res, <=30 fps video-only rendition for analysis (set once downloaded)
+    proxy_path: Path | None = None
+
+
+# Per-video_id locks so concurrent requests for one URL share a single download,
+# with the number of callers holding or waiting on each (dropped at zero)
+_download_locks: dict[str, asyncio.Lock] = {}
+_download_lock_users: dict[str, int] = {}
+
+# Pin file -> (fd holding a shared flock on it, sessions / jobs in this process using it)
+_pins: dict[Path, tuple[int, int]] = {}
+
+# How often a download waiting on another worker's lock checks again
+_LOCK_POLL_S = 0.2
+
+# video_id -> background proxy download
+_proxy_tasks: dict[str, asyncio.Task] = {}
 
 
 def _make_video_id(url: str) -> str:
@@ -28,10 +73,314 @@ def _make_video_id(url: str) -> str:
     return hashlib.sha256(url.encode()).hexdigest()[:12]
 
 
+# ---- Metadata index ----
+
+
+def _sidecar_path(out_path: Path, video_id: str) -> Path:
+    return out_path / f"{video_id}.info.json"
+
+
+def _read_sidecar(out_path: Path, video_id: str) -> dict | None:
+    try:
+        return json.loads(_sidecar_path(out_path, video_id).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_sidecar(out_path: Path, video_id: str, meta: dict) -> None:
+    path = _sidecar_path(out_path, video_id)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(meta, indent=2))
+    os.replace(tmp, path)
+
+
+def _touch(out_path: Path, video: VideoInfo, url: str, complete: bool = True) -> None:
+    """Record a cache hit (or new download) in the sidecar for LRU eviction."""
+    meta = {
+        **asdict(video),
+        "path": video.path.name,
+        "proxy_path": video.proxy_path.name if video.proxy_path else None,
+        "url": url,
+        "size": video.path.stat().st_size if video.path.exists() else 0,
+        "complete": complete,
+        "last_access": time.time(),
+    }
+    _write_sidecar(out_path, video.video_id, meta)
+
+
+# ---- Disk quota ----
+
+
+def _pin_path(out_path: Path, video_id: str) -> Path:
+    return out_path / f"{video_id}.pin"
+
+
+def _download_lock_path(out_path: Path, video_id: str) -> Path:
+    return out_path / f"{video_id}.lock"
+
+
+def _open_lock(path: Path) -> int:
+    return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+def _try_lock_exclusive(path: Path) -> int | None:
+    """Open ``path`` and take an exclusive flock without blocking (None if held)."""
+    fd = _open_lock(path)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def pin_video(video: VideoInfo) -> None:
+    """Protect a video's files from eviction (by any worker) until ``unpin_video``."""
+    path = _pin_path(video.path.parent, video.video_id)
+    entry = _pins.get(path)
+    if entry is not None:
+        _pins[path] = (entry[0], entry[1] + 1)
+        return
+    fd = _open_lock(path)
+    # Only waits while an eviction of this very video is deleting its files
+    fcntl.flock(fd, fcntl.LOCK_SH)
+    _pins[path] = (fd, 1)
+
+
+def unpin_video(video: VideoInfo) -> None:
+    path = _pin_path(video.path.parent, video.video_id)
+    entry = _pins.get(path)
+    if entry is None:
+        return
+    fd, count = entry
+    if count > 1:
+        _pins[path] = (fd, count - 1)
+    else:
+        del _pins[path]
+        os.close(fd)  # releases the shared lock
+
+
+def is_pinned(video: VideoInfo) -> bool:
+    """Whether this process has the video pinned."""
+    return _pin_path(video.path.parent, video.video_id) in _pins
+
+
+def _artifacts(out_path: Path, video_id: str) -> list[Path]:
+    """The MP4 plus every file/directory derived from it (not its lock files)."""
+    locks = {_pin_path(out_path, video_id), _download_lock_path(out_path, video_id)}
+    return [p for p in out_path.glob(f"{video_id}.*") if p not in locks]
+
+
+def _artifact_bytes(path: Path) -> int:
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    return path.stat().st_size
+
+
+def _enforce_quota(out_path: Path, quota_bytes: int, keep: str) -> None:
+    """Evict least recently used videos until ``out_path`` fits in ``quota_bytes``."""
+    usage: dict[str, int] = {}
+    last_access: dict[str, float] = {}
+    for mp4 in out_path.glob("*.mp4"):
+        video_id = mp4.name.split(".", 1)[0]
+        if video_id in usage:
+            continue
+        try:
+            usage[video_id] = sum(_artifact_bytes(p) for p in _artifacts(out_path, video_id))
+        except OSError:
+            continue
+        meta = _read_sidecar(out_path, video_id) or {}
+        last_access[video_id] = meta.get("last_access", mp4.stat().st_mtime)
+
+    total = sum(usage.values())
+    if total <= quota_bytes:
+        return
+
+    for video_id in sorted(usage, key=last_access.__getitem__):
+        if total <= quota_bytes:
+            break
+        if video_id == keep:
+            continue
+        # Pinned or downloading in any worker: its lock file is held
+        pin_fd = _try_lock_exclusive(_pin_path(out_path, video_id))
+        if pin_fd is None:
+            continue
+        try:
+            download_fd = _try_lock_exclusive(_download_lock_path(out_path, video_id))
+            if download_fd is None:
+                continue
+            try:
+                for path in _artifacts(out_path, video_id):
+                    if path.is_dir():
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        path.unlink(missing_ok=True)
+            finally:
+                os.close(download_fd)
+        finally:
+            os.close(pin_fd)
+        total -= usage[video_id]
+        logger.info("Evicted cached video %s (%.1f MB)", video_id, usage[video_id] / 1e6)
+
+    if total > quota_bytes:
+        logger.warning(
+            "Videos dir still over quota: %.1f MB > %.1f MB", total / 1e6, quota_bytes / 1e6
+        )
+
+
+# ---- Progressive downloads ----
+
+
+@dataclass
+class DownloadState:
+    """A download still being written to ``path`` (fragmented MP4, readable as it grows)."""
+
+    video: VideoInfo
+    total_bytes: int | None = None  # estimate from yt-dlp metadata, if known
+    done: bool = False
+    error: str | None = None
+    task: asyncio.Task | None = field(default=None, repr=False)
+    # Exclusive flock on <video_id>.lock, held until the download finishes
+    lock_fd: int | None = field(default=None, repr=False)
+
+    @property
+    def downloaded_bytes(self) -> int:
+        try:
+            return self.video.path.stat().st_size
+        except OSError:
+            return 0
+
+    def progress(self) -> dict:
+        downloaded = self.downloaded_bytes
+        fraction = None
+        if self.done:
+            fraction = 1.0
+        elif self.total_bytes:
+            fraction = round(min(downloaded / self.total_bytes, 0.99), 3)
+        return {
+            "type": "download_progress",
+            "bytes": downloaded,
+            "total_bytes": self.total_bytes,
+            "fraction": fraction,
+            "done": self.done,
+            "error": self.error,
+        }
+
+
+# video_id -> in-flight progressive download
+_active_downloads: dict[str, DownloadState] = {}
+
+
+def download_state(video_id: str) -> DownloadState | None:
+    """The in-flight progressive download for a video, if any."""
+    return _active_downloads.get(video_id)
+
+
+def is_downloading(video_id: str, output_dir: str | Path | None = None) -> bool:
+    """True while a progressive download is still appending to the video file.
+
+    With ``output_dir``, downloads running in another worker are detected too
+    (their sidecar stays marked incomplete until they finish).
+    """
+    state = _active_downloads.get(video_id)
+    if state is not None:
+        return not state.done
+    if output_dir is None:
+        return False
+    meta = _read_sidecar(Path(output_dir), video_id)
+    return meta is not None and not meta.get("complete", True)
+
+
+def analysis_path(video: VideoInfo) -> Path:
+    """The file to decode for analysis: the proxy once it exists, else the video."""
+    if video.proxy_path is None:
+        proxy = proxy_path_for(video.path)
+        if proxy.exists():
+            video.proxy_path = proxy
+    return video.proxy_path or video.path
+
+
+async def _run_progressive(state: DownloadState, url: str, quota_bytes: int) -> None:
+    video = state.video
+    out_path = video.path.parent
+    try:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _download, url, str(video.path), True)
+        await asyncio.to_thread(_touch, out_path, video, url)
+        logger.info(
+            "Progressive download complete: %s (%.1f MB)", video.path, state.downloaded_bytes / 1e6
+        )
+    except Exception as e:
+        logger.exception("Progressive download failed: %s", video.path)
+        state.error = str(e)
+        video.path.unlink(missing_ok=True)
+        _sidecar_path(out_path, video.video_id).unlink(missing_ok=True)
+    finally:
+        state.done = True
+        _active_downloads.pop(video.video_id, None)
+        if state.lock_fd is not None:
+            os.close(state.lock_fd)
+            state.lock_fd = None
+
+    if quota_bytes > 0 and state.error is None:
+        await asyncio.to_thread(_enforce_quota, out_path, quota_bytes, video.video_id)
+
+
+async def _wait_until_playable(state: DownloadState, min_bytes: int) -> None:
+    """Return once the first fragments are on disk (or the download ended)."""
+    while not state.done and state.downloaded_bytes < min_bytes:
+        await asyncio.sleep(0.2)
+    if state.error is not None:
+        raise RuntimeError(f"Download failed: {state.error}")
+
+
+# ---- Analysis proxy ----
+
+
+def proxy_path_for(video_path: Path) -> Path:
+    return video_path.with_name(f"{video_path.stem}.proxy.mp4")
+
+
+async def _run_proxy(video: VideoInfo, url: str, max_height: int, fragments: int) -> None:
+    proxy = proxy_path_for(video.path)
+    try:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _download_proxy, url, str(proxy), max_height, fragments)
+        if not proxy.exists():
+            raise RuntimeError(f"Proxy download completed but file not found: {proxy}")
+        video.proxy_path = proxy
+        logger.info("Analysis proxy ready: %s (%.1f MB)", proxy, proxy.stat().st_size / 1e6)
+    except Exception:
+        logger.exception("Proxy download failed for %s; analysis uses the main video", video.path)
+    finally:
+        _proxy_tasks.pop(video.video_id, None)
+
+
+def _start_proxy(video: VideoInfo, url: str, max_height: int, fragments: int) -> None:
+    """Fetch the analysis proxy in the background (once per video)."""
+    proxy = proxy_path_for(video.path)
+    if proxy.exists():
+        video.proxy_path = proxy
+        return
+    if video.video_id in _proxy_tasks:
+        return
+    _proxy_tasks[video.video_id] = asyncio.create_task(
+        _run_proxy(video, url, max_height, fragments)
+    )
+
+
+# ---- Download ----
+
+
 async def download_video(
     url: str,
     output_dir: str = "./videos",
     max_duration: int = 600,
+    quota_bytes: int = 0,
+    progressive: bool = False,
+    progressive_min_bytes: int = 2_000_000,
+    proxy_max_height: int = 0,
+    proxy_fragments: int = 4,
 ) -> VideoInfo:
     """Download a YouTube video to MP4 (720p max).
 
@@ -39,6 +388,16 @@ async def download_video(
         url: YouTube URL.
         output_dir: Directory to save the MP4 file.
         max_duration: Maximum allowed duration in seconds (default 10 min).
+        quota_bytes: Evict least recently used videos to keep ``output_dir``
+            under this size after a download (0 disables the quota).
+        progressive: Write a fragmented MP4 in the background and return as
+            soon as ``progressive_min_bytes`` are on disk. Track the rest via
+            ``download_state`` / ``is_downloading``.
+        progressive_min_bytes: How much must be downloaded before returning.
+        proxy_max_height: Also fetch a video-only analysis proxy at most this
+            tall (<=30 fps, avc1 preferred) in the background; it appears as
+            ``VideoInfo.proxy_path`` once complete. 0 disables the proxy.
+        proxy_fragments: Parallel fragment downloads for the proxy.
 
     Returns:
         VideoInfo with metadata and local file path.
@@ -51,18 +410,125 @@ async def download_video(
     out_path.mkdir(parents=True, exist_ok=True)
 
     video_id = _make_video_id(url)
+    lock = _download_locks.setdefault(video_id, asyncio.Lock())
+    _download_lock_users[video_id] = _download_lock_users.get(video_id, 0) + 1
+    elsewhere = False
+    try:
+        async with lock:
+            state = _active_downloads.get(video_id)
+            if state is not None:
+                video = state.video
+            else:
+                # Cross-worker single flight: wait for another worker's download,
+                # or follow its progressive download once it is playable
+                fd = await _lock_download(
+                    out_path, video_id, progressive_min_bytes if progressive else None
+                )
+                if fd is None:
+                    video = _video_from_sidecar(out_path, video_id)
+                    elsewhere = True
+                else:
+                    try:
+                        video = await _download_locked(
+                            url, out_path, video_id, max_duration, progressive, quota_bytes, fd
+                        )
+                    finally:
+                        state = _active_downloads.get(video_id)
+                        if state is None or state.lock_fd != fd:
+                            os.close(fd)
+    finally:
+        _download_lock_users[video_id] -= 1
+        if _download_lock_users[video_id] == 0:
+            del _download_lock_users[video_id]
+            del _download_locks[video_id]
+
+    if proxy_max_height > 0:
+        _start_proxy(video, url, proxy_max_height, proxy_fragments)
+
+    if state is not None:
+        # Progressive: quota is enforced once the background download finishes
+        await _wait_until_playable(state, progressive_min_bytes)
+    elif quota_bytes > 0 and not elsewhere:
+        await asyncio.to_thread(_enforce_quota, out_path, quota_bytes, video_id)
+    return video
+
+
+async def _lock_download(out_path: Path, video_id: str, follow_min_bytes: int | None) -> int | None:
+    """Take the exclusive download lock on ``<video_id>.lock`` (polling, cancel-safe).
+
+    With ``follow_min_bytes``, returns None instead once another worker's
+    progressive download of the video has that many bytes on disk.
+    """
+    path = _download_lock_path(out_path, video_id)
+    while True:
+        fd = await asyncio.to_thread(_try_lock_exclusive, path)
+        if fd is not None:
+            return fd
+        if follow_min_bytes is not None and _playable_elsewhere(
+            out_path, video_id, follow_min_bytes
+        ):
+            return None
+        await asyncio.sleep(_LOCK_POLL_S)
+
+
+def _playable_elsewhere(out_path: Path, video_id: str, min_bytes: int) -> bool:
+    meta = _read_sidecar(out_path, video_id)
+    if meta is None or meta.get("complete", True):
+        return False
+    try:
+        return (out_path / meta["path"]).stat().st_size >= min_bytes
+    except (OSError, KeyError):
+        return False
+
+
+def _video_from_sidecar(out_path: Path, video_id: str) -> VideoInfo:
+    """VideoInfo for a video another worker is downloading progressively."""
+    meta = _read_sidecar(out_path, video_id) or {}
+    path = out_path / meta.get("path", f"{video_id}.mp4")
+    proxy = proxy_path_for(path)
+    return VideoInfo(
+        video_id=video_id,
+        title=meta.get("title", "Unknown"),
+        duration=meta.get("duration", 0),
+        path=path,
+        proxy_path=proxy if proxy.exists() else None,
+    )
+
+
+async def _download_locked(
+    url: str,
+    out_path: Path,
+    video_id: str,
+    max_duration: int,
+    progressive: bool,
+    quota_bytes: int,
+    lock_fd: int,
+) -> VideoInfo:
     file_path = out_path / f"{video_id}.mp4"
+    meta = _read_sidecar(out_path, video_id)
+
+    if file_path.exists() and meta is not None and not meta.get("complete", True):
+        # Left over from an interrupted progressive download
+        logger.info("Discarding incomplete download: %s", file_path)
+        file_path.unlink()
 
     # If already downloaded, return cached info
     if file_path.exists():
         logger.info("Video already downloaded: %s", file_path)
-        info = await _extract_info(url)
-        return VideoInfo(
+        if meta is None:
+            # Downloaded before the index existed: fetch metadata once
+            info = await _extract_info(url)
+            meta = {"title": info.get("title", "Unknown"), "duration": info.get("duration", 0)}
+        video = VideoInfo(
             video_id=video_id,
-            title=info.get("title", "Unknown"),
-            duration=info.get("duration", 0),
+            title=meta.get("title", "Unknown"),
+            duration=meta.get("duration", 0),
             path=file_path,
         )
+        if proxy_path_for(file_path).exists():
+            video.proxy_path = proxy_path_for(file_path)
+        await asyncio.to_thread(_touch, out_path, video, url)
+        return video
 
     # Extract info first to check duration
     info = await _extract_info(url)
@@ -74,6 +540,29 @@ async def download_video(
             f"Video is {duration}s, exceeds max of {max_duration}s. Use a shorter clip."
         )
 
+    video = VideoInfo(
+        video_id=video_id,
+        title=title,
+        duration=duration,
+        path=file_path,
+    )
+
+    if progressive and shutil.which("ffmpeg") is None:
+        logger.warning("ffmpeg not found; falling back to a blocking download")
+        progressive = False
+
+    if progressive:
+        logger.info("Downloading progressively: %s (%ds) → %s", title, duration, file_path)
+        await asyncio.to_thread(_touch, out_path, video, url, False)
+        state = DownloadState(
+            video=video,
+            total_bytes=info.get("filesize") or info.get("filesize_approx"),
+            lock_fd=lock_fd,
+        )
+        _active_downloads[video_id] = state
+        state.task = asyncio.create_task(_run_progressive(state, url, quota_bytes))
+        return video
+
     logger.info("Downloading: %s (%ds) → %s", title, duration, file_path)
 
     # Download in a thread to avoid blocking the event loop
@@ -85,12 +574,8 @@ async def download_video(
 
     logger.info("Download complete: %s (%.1f MB)", file_path, file_path.stat().st_size / 1e6)
 
-    return VideoInfo(
-        video_id=video_id,
-        title=title,
-        duration=duration,
-        path=file_path,
-    )
+    await asyncio.to_thread(_touch, out_path, video, url)
+    return video
 
 
 async def _extract_info(url: str) -> dict:
@@ -104,8 +589,35 @@ async def _extract_info(url: str) -> dict:
     return await loop.run_in_executor(None, _extract)
 
 
-def _download(url: str, output_path: str) -> None:
-    """Download the video to a specific path (blocking)."""
+def _download_proxy(url: str, output_path: str, max_height: int, fragments: int) -> None:
+    """Download a small video-only rendition for analysis (blocking).
+
+    Prefers H.264 at <=30 fps (cheap to decode, and NONREF skipping works);
+    DASH fragments are fetched ``fragments`` at a time.
+    """
+    opts = {
+        "format": (
+            f"bv*[height<={max_height}][fps<=30][vcodec^=avc1]"
+            f"/bv*[height<={max_height}][fps<=30]"
+            f"/bv*[height<={max_height}]"
+            f"/wv*"
+        ),
+        "outtmpl": output_path,
+        "concurrent_fragment_downloads": fragments,
+        "quiet": True,
+        "no_warnings": True,
+    }
+    with YoutubeDL(opts) as ydl:
+        ydl.download([url])
+
+
+def _download(url: str, output_path: str, progressive: bool = False) -> None:
+    """Download the video to a specific path (blocking).
+
+    With ``progressive``, ffmpeg writes a fragmented MP4 straight to
+    ``output_path`` (no ``.part`` file, no post-download merge), so players
+    and decoders can read the file while it grows.
+    """
     opts = {
         # Prefer single pre-merged MP4 first (no ffmpeg needed), fall back to merge
         "format": "best[height<=720][ext=mp4]/bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
@@ -114,5 +626,20 @@ def _download(url: str, output_path: str) -> None:
         "quiet": False,
         "no_warnings": True,
     }
+    if progressive:
+        opts.update(
+            {
+                "external_downloader": {"default": "ffmpeg"},
+                "external_downloader_args": {
+                    "ffmpeg_o": [
+                        "-movflags",
+                        "frag_keyframe+empty_moov+default_base_moof",
+                        "-f",
+                        "mp4",
+                    ]
+                },
+                "nopart": True,
+            }
+        )
     with YoutubeDL(opts) as ydl:
         ydl.download([url])
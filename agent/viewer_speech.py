@@ -0,0 +1,182 @@
+"""Server-side transcription of a viewer's microphone for one live session.
+
+The extension can stream microphone audio over ``/ws/live`` instead of using
+the browser's speech recognition. ``ViewerSpeech`` feeds it to ``CartesiaSTT``
+and reports two things to the pipeline:
+
+* ``on_stable(text)`` -- a partial transcript has stopped changing for
+  ``stable_ms``; the pipeline may start answering it speculatively;
+* ``on_final(text)``  -- the final transcript, which confirms the speculative
+  answer (same question) or replaces it.
+
+``on_partial(text)`` is called for every new partial, for live display.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+import numpy as np
+from getstream.video.rtc.track_util import PcmData
+from vision_agents.core.edge.types import Participant
+from vision_agents.core.stt.events import STTPartialTranscriptEvent, STTTranscriptEvent
+
+from agent.cartesia_stt import CartesiaSTT
+from agent.config import config
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD_RE = re.compile(r"[^\w\s']+")
+
+
+def normalize_question(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form used to compare transcripts."""
+    return " ".join(_NON_WORD_RE.sub(" ", text.lower()).split())
+
+
+class ViewerSpeech:
+    """``CartesiaSTT`` for one viewer, with partial-stability tracking.
+
+    Args:
+        session_id: Live session (used for the STT metrics provider name).
+        on_stable: Called with a partial that stayed unchanged for ``stable_ms``.
+        on_final: Called with each final transcript.
+        on_partial: Called with each new partial transcript.
+        stable_ms: How long a partial must stay unchanged to count as stable.
+        min_words: Shorter partials never count as stable.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        on_stable: Callable[[str], Awaitable[None]],
+        on_final: Callable[[str], Awaitable[None]],
+        on_partial: Callable[[str], Awaitable[None]] | None = None,
+        stable_ms: float = 400.0,
+        min_words: int = 3,
+    ) -> None:
+        self.session_id = session_id
+        self.on_stable = on_stable
+        self.on_final = on_final
+        self.on_partial = on_partial
+        self.stable_s = stable_ms / 1000
+        self.min_words = min_words
+        self._participant = Participant(original=None, user_id=f"viewer-{session_id}")
+        self._stt = CartesiaSTT(
+            api_key=config.cartesia_api_key or None,
+            model="ink-whisper",
+            language="en",
+            max_silence_duration_secs=1.0,
+            packet_ms=config.stt_packet_ms,
+            max_buffer_ms=config.stt_max_buffer_ms,
+            metrics_name=f"stt.{session_id}",
+            vad=config.stt_vad,
+            vad_threshold_db=config.stt_vad_threshold_db,
+            vad_hangover_ms=config.stt_vad_hangover_ms,
+            vad_pre_roll_ms=config.stt_vad_pre_roll_ms,
+            replay_ms=config.stt_replay_ms,
+        )
+        self._stt.events.subscribe(self._on_partial_event)
+        self._stt.events.subscribe(self._on_transcript_event)
+        self._last_partial = ""
+        self._stable_timer: asyncio.TimerHandle | None = None
+        self._callbacks: set[asyncio.Task] = set()
+
+        # Audio captured while STT connects (up to stt_replay_ms), sent once it is up
+        self._starting: asyncio.Task | None = None
+        self._started = False
+        self._failed = False
+        self._pending: deque[tuple[PcmData, float]] = deque()
+        self._pending_ms = 0.0
+        self._end_pending = False
+
+    @property
+    def failed(self) -> bool:
+        """True if the STT connection could not be started."""
+        return self._failed
+
+    def start(self) -> None:
+        """Connect STT in the background; audio fed meanwhile is buffered."""
+        if self._starting is None:
+            self._starting = asyncio.create_task(self._start())
+
+    async def _start(self) -> None:
+        try:
+            await self._stt.start()
+            while self._pending:
+                await self._stt.process_audio(self._pending.popleft()[0], self._participant)
+            self._started = True
+            if self._end_pending:
+                await self._stt.clear()
+        except Exception:
+            logger.exception("[%s] Viewer speech recognition failed to start", self.session_id)
+            self._failed = True
+            self._pending.clear()
+            return
+        logger.info("[%s] Viewer speech recognition started", self.session_id)
+
+    async def feed(self, samples: np.ndarray, sample_rate: int) -> None:
+        """Queue mono int16 ``samples`` captured at ``sample_rate``."""
+        pcm = PcmData(samples=samples, sample_rate=sample_rate, format="s16", channels=1)
+        if self._started:
+            await self._stt.process_audio(pcm, self._participant)
+            return
+        if self.failed:
+            return
+        duration_ms = len(samples) * 1000 / sample_rate
+        self._pending.append((pcm, duration_ms))
+        self._pending_ms += duration_ms
+        while self._pending_ms > config.stt_replay_ms and len(self._pending) > 1:
+            self._pending_ms -= self._pending.popleft()[1]
+
+    async def end_of_speech(self) -> None:
+        """The viewer released the mic: flush audio and ask for the final transcript."""
+        if self._started:
+            await self._stt.clear()
+        else:
+            self._end_pending = True
+
+    # ---- Transcript events ----
+
+    async def _on_partial_event(self, event: STTPartialTranscriptEvent) -> None:
+        text = event.text.strip()
+        if not text or text == self._last_partial:
+            return
+        self._last_partial = text
+        if self.on_partial is not None:
+            self._spawn(self.on_partial(text))
+
+        # (Re)start the stability clock: fires unless another partial arrives first
+        if self._stable_timer is not None:
+            self._stable_timer.cancel()
+        self._stable_timer = None
+        if len(normalize_question(text).split()) >= self.min_words:
+            self._stable_timer = asyncio.get_running_loop().call_later(
+                self.stable_s, lambda: self._spawn(self.on_stable(text))
+            )
+
+    async def _on_transcript_event(self, event: STTTranscriptEvent) -> None:
+        if self._stable_timer is not None:
+            self._stable_timer.cancel()
+            self._stable_timer = None
+        self._last_partial = ""
+        self._spawn(self.on_final(event.text.strip()))
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
+
+    async def close(self) -> None:
+        if self._starting is not None and not self._starting.done():
+            self._starting.cancel()
+        if self._stable_timer is not None:
+            self._stable_timer.cancel()
+        for task in self._callbacks:
+            task.cancel()
+        await self._stt.close()
+        self._stt.events.stop()
@@ -6,12 +6,37 @@
  */
 
 import { useRef, useState } from 'react';
-import { BACKEND_WS_URL } from '../../lib/constants';
+import {
+  AUDIO_PROFILE,
+  BACKEND_WS_URL,
+  MIC_SAMPLE_RATE,
+  PIPELINE_DELAY_MS,
+  SERVER_STT,
+} from '../../lib/constants';
 import { ProfileSetup, UserProfileData } from './ProfileSetup';
 
 /** Send every Nth frame to backend (15 FPS / 5 = 3 FPS to Claude). */
 const BACKEND_SEND_EVERY = 5;
 
+/** Mime type per commentary ``audio_format`` (set by the negotiated audio profile). */
+const AUDIO_MIME: Record<string, string> = { mp3: 'audio/mpeg', wav: 'audio/wav', ogg: 'audio/ogg' };
+
+/** Prefix of binary viewer-audio messages on /ws/live (JPEG frames start FF D8). */
+const VIEWER_AUDIO_MAGIC = [0x50, 0x43, 0x4d, 0x31]; // "PCM1"
+
+/** Build one viewer-audio message: magic, uint32 LE sample rate, 16-bit LE mono PCM. */
+function viewerAudioFrame(samples: Float32Array, sampleRate: number): ArrayBuffer {
+  const buf = new ArrayBuffer(8 + samples.length * 2);
+  const view = new DataView(buf);
+  VIEWER_AUDIO_MAGIC.forEach((b, i) => view.setUint8(i, b));
+  view.setUint32(4, sampleRate, true);
+  for (let i = 0; i < samples.length; i++) {
+    const s = Math.max(-1, Math.min(1, samples[i]));
+    view.setInt16(8 + i * 2, s < 0 ? s * 0x8000 : s * 0x7fff, true);
+  }
+  return buf;
+}
+
 /** Convert a base64 string to a Blob for WebSocket binary send. */
 function base64ToBlob(b64: string, mime = 'image/jpeg'): Blob {
   const binary = atob(b64);
@@ -46,12 +71,19 @@ export function App() {
   const frameCountRef = useRef(0);
   const pausedRef = useRef(false);
   const recognitionRef = useRef<SpeechRecognition | null>(null);
+  const micStopRef = useRef<(() => void) | null>(null);
 
   // ---- Voice input (ask the commentator) ----
 
   function toggleListening() {
     if (listening) {
       recognitionRef.current?.stop();
+      micStopRef.current?.();
+      return;
+    }
+
+    if (SERVER_STT) {
+      startMicStream();
       return;
     }
 
@@ -124,6 +156,50 @@ export function App() {
     recognition.start();
   }
 
+  /** Stream mic audio to the backend, which transcribes it and answers the question. */
+  async function startMicStream() {
+    const ws = wsRef.current;
+    if (!ws || ws.readyState !== WebSocket.OPEN) {
+      setStatus('Start the stream before asking a question.');
+      return;
+    }
+    if (currentAudioRef.current && !currentAudioRef.current.paused) {
+      currentAudioRef.current.pause();
+    }
+    playingAudioRef.current = false;
+
+    let stream: MediaStream;
+    try {
+      stream = await navigator.mediaDevices.getUserMedia({ audio: { echoCancellation: true } });
+    } catch (err) {
+      console.error('[AI Commentator] Mic error:', err);
+      setStatus('Mic permission denied.');
+      return;
+    }
+    const ctx = new AudioContext({ sampleRate: MIC_SAMPLE_RATE });
+    const source = ctx.createMediaStreamSource(stream);
+    const processor = ctx.createScriptProcessor(1024, 1, 1);
+    processor.onaudioprocess = (e) => {
+      if (ws.readyState === WebSocket.OPEN) {
+        ws.send(viewerAudioFrame(e.inputBuffer.getChannelData(0), ctx.sampleRate));
+      }
+    };
+    source.connect(processor);
+    processor.connect(ctx.destination);
+
+    micStopRef.current = () => {
+      micStopRef.current = null;
+      processor.disconnect();
+      source.disconnect();
+      stream.getTracks().forEach((t) => t.stop());
+      ctx.close();
+      if (ws.readyState === WebSocket.OPEN) ws.send(JSON.stringify({ type: 'audio_end' }));
+      setListening(false);
+    };
+    setTranscript('');
+    setListening(true);
+  }
+
   // ---- Stream lifecycle ----
 
   async function startStream() {
@@ -215,6 +291,8 @@ export function App() {
     ws.onopen = () => {
       setStatus('Connected — waiting for first commentary...');
       ws.send(JSON.stringify({ type: 'set_sport', sport }));
+      ws.send(JSON.stringify({ type: 'set_delay', ms: PIPELINE_DELAY_MS }));
+      ws.send(JSON.stringify({ type: 'set_audio_profile', profile: AUDIO_PROFILE }));
       if (userProfile) {
         ws.send(JSON.stringify({ type: 'set_profile', profile: userProfile }));
       }
@@ -229,6 +307,17 @@ export function App() {
           if (commentary.length > 0 || msg.message.includes('Ready')) {
             setStatus(msg.message);
           }
+        } else if (msg.type === 'viewer_transcript') {
+          // Server-side transcription of the viewer's question (SERVER_STT)
+          if (msg.final) {
+            setTranscript('');
+            setCommentary((c) => [
+              { text: msg.text, emotion: 'neutral', analyst: 'You', timestamp: Date.now() },
+              ...c.slice(0, 29),
+            ]);
+          } else {
+            setTranscript(msg.text);
+          }
         } else if (msg.type === 'commentary') {
           const emotion = msg.emotion || 'neutral';
           const analyst = msg.analyst || 'Danny';
@@ -241,7 +330,9 @@ export function App() {
           setStatus('Live');
 
           if (audio) {
-            audioQueueRef.current.push(audio);
+            // Clip format follows the negotiated audio profile
+            const mime = AUDIO_MIME[msg.audio_format] || 'audio/mpeg';
+            audioQueueRef.current.push(`data:${mime};base64,${audio}`);
             playNextAudio();
           }
         }
@@ -276,11 +367,11 @@ export function App() {
       }
     }
 
-    const base64 = audioQueueRef.current.shift();
-    if (!base64) { playingAudioRef.current = false; return; }
+    const src = audioQueueRef.current.shift();
+    if (!src) { playingAudioRef.current = false; return; }
 
     playingAudioRef.current = true;
-    const audio = new Audio(`data:audio/mp3;base64,${base64}`);
+    const audio = new Audio(src);
     currentAudioRef.current = audio;
     audio.onended = () => { playingAudioRef.current = false; currentAudioRef.current = null; playNextAudio(); };
     audio.onerror = () => { playingAudioRef.current = false; currentAudioRef.current = null; playNextAudio(); };
@@ -311,6 +402,7 @@ export function App() {
   // ---- Stop ----
 
   function stopStream() {
+    micStopRef.current?.();
     if (capturePortRef.current) {
       try { capturePortRef.current.postMessage({ type: 'STOP_CAPTURE' }); } catch {}
       capturePortRef.current.disconnect();
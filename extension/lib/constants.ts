@@ -3,3 +3,12 @@ export const CAPTURE_FPS = 5;
 export const JPEG_QUALITY = 0.7;
 export const MAX_CANVAS_WIDTH = 1280;
 export const PIPELINE_DELAY_MS = 5000;
+// Audio profile negotiated with the backend on connect: 'mp3', 'mp3_low', 'pcm' (WAV,
+// lowest latency) or 'opus' (smallest clips). Live commentary is latency-bound and the
+// backend runs on localhost, so pcm skips the server-side encode; switch to 'opus' when
+// the backend is remote and bandwidth matters more than the encode time
+export const AUDIO_PROFILE = 'pcm';
+// Stream the viewer's mic to the backend for server-side transcription (enables
+// speculative answers from partial transcripts) instead of browser speech recognition
+export const SERVER_STT = false;
+export const MIC_SAMPLE_RATE = 16000;
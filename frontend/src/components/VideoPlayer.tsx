@@ -2,12 +2,17 @@
  * VideoPlayer - Plays the downloaded video with commentary overlay and TTS audio.
  *
  * Connects to the backend WebSocket to receive commentary text and audio.
- * Plays the video from the backend's static file server.
+ * Plays the video from the backend's static file server and reports the
+ * playback position (play / pause / seek / buffering) so the backend paces
+ * commentary with what is on screen.
  */
 
 import { useCallback, useEffect, useRef, useState } from "react";
 import { CommentaryOverlay } from "./CommentaryOverlay";
 
+// Position re-syncs while playing; play/pause/seek/buffering are sent immediately
+const PLAYBACK_SYNC_INTERVAL_MS = 1000;
+
 interface VideoPlayerProps {
   sessionId: string;
   title: string;
@@ -34,6 +39,37 @@ export function VideoPlayer({
   const wsRef = useRef<WebSocket | null>(null);
   const audioContextRef = useRef<AudioContext | null>(null);
   const nextIdRef = useRef(0);
+  const videoRef = useRef<HTMLVideoElement | null>(null);
+  const bufferingRef = useRef(false);
+  const lastPlaybackSentRef = useRef(0);
+
+  const sendPlayback = useCallback(() => {
+    const ws = wsRef.current;
+    const video = videoRef.current;
+    if (!ws || ws.readyState !== WebSocket.OPEN || !video) return;
+    ws.send(
+      JSON.stringify({
+        type: "playback",
+        position: video.currentTime,
+        paused: video.paused || video.ended || bufferingRef.current,
+      })
+    );
+    lastPlaybackSentRef.current = Date.now();
+  }, []);
+
+  const onTimeUpdate = useCallback(() => {
+    if (Date.now() - lastPlaybackSentRef.current >= PLAYBACK_SYNC_INTERVAL_MS) {
+      sendPlayback();
+    }
+  }, [sendPlayback]);
+
+  const setBuffering = useCallback(
+    (buffering: boolean) => {
+      bufferingRef.current = buffering;
+      sendPlayback();
+    },
+    [sendPlayback]
+  );
 
   const playAudio = useCallback(async (base64Audio: string) => {
     try {
@@ -72,6 +108,8 @@ export function VideoPlayer({
     ws.onopen = () => {
       setConnected(true);
       setStatus("Connected");
+      // The video may already be playing (autoplay) or blocked and paused
+      sendPlayback();
     };
 
     ws.onmessage = (event) => {
@@ -79,6 +117,15 @@ export function VideoPlayer({
 
       if (msg.type === "status") {
         setStatus(msg.message);
+      } else if (msg.type === "precompute_progress") {
+        // Precomputed sessions: the script is generated ahead of playback
+        if (msg.error) {
+          setStatus("Commentary generation failed");
+        } else if (msg.done) {
+          setStatus("Commentary ready");
+        } else {
+          setStatus(`Precomputing commentary... ${Math.round(msg.progress * 100)}%`);
+        }
       } else if (msg.type === "commentary") {
         const item: CommentaryItem = {
           id: nextIdRef.current++,
@@ -106,10 +153,13 @@ export function VideoPlayer({
     };
 
     return () => {
+      if (ws.readyState === WebSocket.OPEN) {
+        ws.send(JSON.stringify({ type: "stop" }));
+      }
       ws.close();
       wsRef.current = null;
     };
-  }, [sessionId, playAudio]);
+  }, [sessionId, playAudio, sendPlayback]);
 
   // Clean up audio context on unmount
   useEffect(() => {
@@ -140,10 +190,18 @@ export function VideoPlayer({
       {/* Video + Commentary */}
       <div className="relative flex-1">
         <video
+          ref={videoRef}
           src={videoUrl}
           controls
           autoPlay
           className="h-full w-full object-contain bg-black"
+          onPlay={sendPlayback}
+          onPause={sendPlayback}
+          onSeeked={sendPlayback}
+          onEnded={sendPlayback}
+          onTimeUpdate={onTimeUpdate}
+          onWaiting={() => setBuffering(true)}
+          onPlaying={() => setBuffering(false)}
           onClick={() => {
             // Ensure audio context is resumed on user interaction
             if (audioContextRef.current?.state === "suspended") {